@@ -0,0 +1,367 @@
+"""
+Versioned JSON API (`/api/v1`) for the mobile client and partners.
+
+Resources: trips, skill swaps, the current user's interactions, and their
+dashboard summary. /availability searches trips by destination and date
+overlap (see availability.py). Every collection supports:
+
+  * keyset pagination: `limit` (API_PAGE_SIZE, at most API_MAX_PAGE_SIZE)
+    and the `after` cursor returned as `next`, newest first, as on /trips;
+  * sparse fieldsets: `fields=id,destination,start_date` selects only those
+    columns, and only the joins they need (no swap or user join unless a
+    swap or username field is asked for);
+  * batch GET: `ids=3,14,15` (at most API_MAX_IDS) returns those items in
+    the order given, plus the ids that don't exist (or aren't visible) as
+    `missing`.
+
+Rows are read as plain column tuples and turned into dicts directly: no ORM
+objects are built, and nothing is loaded that the response won't contain.
+Authentication is the session cookie of the site. Without it the
+interaction and dashboard endpoints answer 401 (JSON, not a redirect to
+the login form).
+"""
+from collections import namedtuple
+from datetime import datetime
+
+from flask import Blueprint, abort, current_app, jsonify, request
+from flask_login import current_user, login_required
+from sqlalchemy import Date, DateTime, func, or_
+from sqlalchemy.orm import aliased
+from werkzeug.exceptions import HTTPException
+
+from conditional import conditional
+from counters import STATUS_COLUMNS
+from extensions import db, dashboard_counters, listing_availability
+from models import User, Trip, SkillSwap, Interaction
+from pagination import keyset_page
+from views import filter_listings, listing_filters, listings_watermark
+
+bp = Blueprint("api", __name__, url_prefix="/api/v1")
+
+# column: what to select; join: the name of the join it needs (None: the resource's own table)
+Field = namedtuple("Field", "column join")
+
+
+class Resource:
+    """A model exposed as JSON: its fields and the outer joins some of them need."""
+
+    def __init__(self, model, fields, joins=None):
+        self.model = model
+        self.fields = fields
+        self.joins = joins or {}  # name -> (target, onclause), in join order
+        self.dates = {name for name, field in fields.items() if isinstance(field.column.type, (Date, DateTime))}
+
+    def parse_fields(self, value):
+        """The field names asked for by `fields=` (all of them by default). Aborts with 400 on an unknown one."""
+        if not value:
+            return list(self.fields)
+        names = list(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            abort(400, f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(self.fields)}.")
+        return names
+
+    def query(self, names):
+        """A query of just these columns (labelled with their names), plus the id and created_at pagination needs."""
+        columns = [self.fields[name].column.label(name) for name in names]
+        # Not returned unless asked for, but keyset_page reads them off the last row
+        for name in ("id", "created_at"):
+            if name not in names:
+                columns.append(getattr(self.model, name).label(name))
+        query = db.session.query(*columns).select_from(self.model)
+        needed = {self.fields[name].join for name in names}
+        for join, (target, onclause) in self.joins.items():
+            if join in needed:
+                query = query.outerjoin(target, onclause)
+        return query
+
+    def serialize(self, rows, names):
+        """Dicts of the requested fields, dates as ISO 8601 strings."""
+        count = len(names)
+        dates = [i for i, name in enumerate(names) if name in self.dates]
+        items = []
+        for row in rows:
+            values = list(row[:count])
+            for i in dates:
+                if values[i] is not None:
+                    values[i] = values[i].isoformat()
+            items.append(dict(zip(names, values)))
+        return items
+
+
+Poster = aliased(User, name="poster")
+Sender = aliased(User, name="sender")
+Recipient = aliased(User, name="recipient")
+
+TRIPS = Resource(
+    Trip,
+    {
+        "id": Field(Trip.id, None),
+        "user_id": Field(Trip.user_id, None),
+        "destination": Field(Trip.destination, None),
+        "start_date": Field(Trip.start_date, None),
+        "end_date": Field(Trip.end_date, None),
+        "description": Field(Trip.description, None),
+        "is_accommodation_offer": Field(Trip.is_accommodation_offer, None),
+        "interaction_count": Field(Trip.interaction_count, None),
+        "skill_offered": Field(SkillSwap.skill_offered, "swap"),
+        "skill_wanted": Field(SkillSwap.skill_wanted, "swap"),
+        "posted_by": Field(Poster.username, "poster"),
+        "created_at": Field(Trip.created_at, None),
+        "updated_at": Field(Trip.updated_at, None),
+    },
+    {
+        "swap": (SkillSwap, SkillSwap.trip_id == Trip.id),
+        "poster": (Poster, Poster.id == Trip.user_id),
+    },
+)
+
+SKILLSWAPS = Resource(
+    SkillSwap,
+    {
+        "id": Field(SkillSwap.id, None),
+        "trip_id": Field(SkillSwap.trip_id, None),
+        "user_id": Field(SkillSwap.user_id, None),
+        "skill_offered": Field(SkillSwap.skill_offered, None),
+        "skill_wanted": Field(SkillSwap.skill_wanted, None),
+        "posted_by": Field(Poster.username, "poster"),
+        "created_at": Field(SkillSwap.created_at, None),
+        "updated_at": Field(SkillSwap.updated_at, None),
+    },
+    {
+        "poster": (Poster, Poster.id == SkillSwap.user_id),
+    },
+)
+
+INTERACTIONS = Resource(
+    Interaction,
+    {
+        "id": Field(Interaction.id, None),
+        "trip_id": Field(Interaction.trip_id, None),
+        "destination": Field(Trip.destination, "trip"),
+        "sender_id": Field(Interaction.sender_id, None),
+        "sender": Field(Sender.username, "sender"),
+        "recipient_id": Field(Interaction.recipient_id, None),
+        "recipient": Field(Recipient.username, "recipient"),
+        "message": Field(Interaction.message, None),
+        "status": Field(Interaction.status, None),
+        "created_at": Field(Interaction.created_at, None),
+        "updated_at": Field(Interaction.updated_at, None),
+    },
+    {
+        "trip": (Trip, Trip.id == Interaction.trip_id),
+        "sender": (Sender, Sender.id == Interaction.sender_id),
+        "recipient": (Recipient, Recipient.id == Interaction.recipient_id),
+    },
+)
+
+
+# Code-specific app handlers (the HTML 404 page) win over a class handler: list the codes
+@bp.errorhandler(400)
+@bp.errorhandler(401)
+@bp.errorhandler(404)
+@bp.errorhandler(HTTPException)
+def api_error(error):
+    """API errors are JSON, like the rest of the API (including login_required's 401)."""
+    return jsonify(error=error.description), error.code
+
+
+def parse_ids(value):
+    """The ids of a batch GET, in the order given, without duplicates."""
+    try:
+        ids = list(dict.fromkeys(int(part) for part in value.split(",") if part.strip()))
+    except ValueError:
+        abort(400, "ids must be a comma-separated list of integers.")
+    limit = current_app.config["API_MAX_IDS"]
+    if not ids or len(ids) > limit:
+        abort(400, f"Pass between 1 and {limit} ids.")
+    return ids
+
+
+def parse_limit(value):
+    if value is None:
+        return current_app.config["API_PAGE_SIZE"]
+    maximum = current_app.config["API_MAX_PAGE_SIZE"]
+    if not value.isdigit() or not 1 <= int(value) <= maximum:
+        abort(400, f"limit must be between 1 and {maximum}.")
+    return int(value)
+
+
+def collection(resource, query_filter=None):
+    """
+    The response to a collection GET: a batch by `ids`, or a keyset page.
+    `query_filter(query)` narrows what the caller may see (and applies filters).
+    """
+    names = resource.parse_fields(request.args.get("fields"))
+    query = resource.query(names)
+    if query_filter is not None:
+        query = query_filter(query)
+
+    ids = request.args.get("ids")
+    if ids is not None:
+        ids = parse_ids(ids)
+        rows = {row.id: row for row in query.filter(resource.model.id.in_(ids))}
+        found = [rows[item_id] for item_id in ids if item_id in rows]
+        missing = [item_id for item_id in ids if item_id not in rows]
+        return jsonify(items=resource.serialize(found, names), missing=missing)
+
+    rows, next_cursor = keyset_page(
+        query, resource.model.created_at, resource.model.id, request.args.get("after"),
+        parse_limit(request.args.get("limit"))
+    )
+    return jsonify(items=resource.serialize(rows, names), next=next_cursor)
+
+
+def single(resource, item_id, query_filter=None):
+    """The response to an item GET, honouring `fields`."""
+    names = resource.parse_fields(request.args.get("fields"))
+    query = resource.query(names).filter(resource.model.id == item_id)
+    if query_filter is not None:
+        query = query_filter(query)
+    row = query.first()
+    if row is None:
+        abort(404, "Not found.")
+    return jsonify(resource.serialize([row], names)[0])
+
+
+# --- Listings ---
+
+def trip_filter(query):
+    """The marketplace filters of /trips: destination, date_from, date_to and type (offers/requests)."""
+    filters = listing_filters(request.args)
+    try:
+        query = filter_listings(query, filters)
+    except ValueError:
+        abort(400, "Invalid date filter. Please use YYYY-MM-DD.")
+    if filters["type"] in ("offers", "requests"):
+        query = query.filter(Trip.is_accommodation_offer == (filters["type"] == "offers"))
+    return query
+
+def trips_watermark(*args, **kwargs):
+    """
+    listings_watermark plus the newest trip.counted_at: request counters
+    change without touching updated_at. Every part is read from an index.
+    No Last-Modified: the counters are not edits of the listings.
+    """
+    count, trips_changed, swaps_changed, counted = db.session.query(
+        func.count(Trip.id),
+        func.max(Trip.updated_at),
+        db.session.query(func.max(SkillSwap.updated_at)).scalar_subquery(),
+        func.max(Trip.counted_at)
+    ).one()
+    return f"{count}|{trips_changed}|{swaps_changed}|{counted}", None
+
+@bp.route("/trips")
+@conditional(trips_watermark)
+def trips():
+    """Listings, newest first, with the /trips filters."""
+    return collection(TRIPS, trip_filter)
+
+def trip_watermark(trip_id):
+    """Version of one listing: its updated_at, its swap's and when its request count last changed."""
+    row = db.session.query(Trip.updated_at, SkillSwap.updated_at, Trip.counted_at).outerjoin(
+        SkillSwap, SkillSwap.trip_id == Trip.id
+    ).filter(Trip.id == trip_id).first()
+    if row is None:
+        return None
+    return "|".join(map(str, row)), max(filter(None, row), default=None)
+
+@bp.route("/trips/<int:trip_id>")
+@conditional(trip_watermark)
+def trip(trip_id):
+    return single(TRIPS, trip_id)
+
+@bp.route("/availability")
+def availability():
+    """
+    Listings in `destination` (exact, case-insensitive) whose dates overlap
+    `start`..`end` (YYYY-MM-DD), newest first. `type=offers` for hosts,
+    `type=requests` for travelers. Answered from the availability index,
+    which costs less than the listings watermark: no conditional GET here.
+    """
+    destination = request.args.get("destination", "").strip()
+    if not destination:
+        abort(400, "destination is required.")
+    try:
+        start = datetime.strptime(request.args.get("start", ""), "%Y-%m-%d").date()
+        end = datetime.strptime(request.args.get("end", ""), "%Y-%m-%d").date()
+    except ValueError:
+        abort(400, "start and end are required, as YYYY-MM-DD.")
+    if end < start:
+        abort(400, "end must not be before start.")
+    kind = request.args.get("type")
+    if kind not in (None, "offers", "requests"):
+        abort(400, "type must be offers or requests.")
+    is_offer = None if kind is None else kind == "offers"
+    return collection(TRIPS, lambda query: listing_availability.filter(query, destination, start, end, is_offer))
+
+@bp.route("/skillswaps")
+@conditional(listings_watermark)
+def skillswaps():
+    """Skill swaps, newest first."""
+    return collection(SKILLSWAPS)
+
+def skillswap_watermark(swap_id):
+    """Version of one skill swap, or None if it doesn't exist."""
+    updated_at = db.session.query(SkillSwap.updated_at).filter(SkillSwap.id == swap_id).scalar()
+    if updated_at is None:
+        return None
+    return str(updated_at), updated_at
+
+@bp.route("/skillswaps/<int:swap_id>")
+@conditional(skillswap_watermark)
+def skillswap(swap_id):
+    return single(SKILLSWAPS, swap_id)
+
+
+# --- The current user's requests ---
+
+def interaction_filter(query):
+    """
+    Only the current user's interactions: `role=received` (on their
+    listings), `role=sent` (made by them) or both; `status` narrows them.
+    """
+    role = request.args.get("role")
+    if role == "received":
+        query = query.filter(Interaction.recipient_id == current_user.id)
+    elif role == "sent":
+        query = query.filter(Interaction.sender_id == current_user.id)
+    elif role is None:
+        query = query.filter(or_(Interaction.recipient_id == current_user.id, Interaction.sender_id == current_user.id))
+    else:
+        abort(400, "role must be received or sent.")
+    status = request.args.get("status")
+    if status is not None:
+        if status not in STATUS_COLUMNS:
+            abort(400, f"Invalid status. Use one of: {', '.join(STATUS_COLUMNS)}.")
+        query = query.filter(Interaction.status == status)
+    return query
+
+@bp.route("/interactions")
+@login_required
+def interactions():
+    """The current user's received and/or sent requests, newest first."""
+    return collection(INTERACTIONS, interaction_filter)
+
+@bp.route("/interactions/<int:interaction_id>")
+@login_required
+def interaction(interaction_id):
+    return single(INTERACTIONS, interaction_id, interaction_filter)
+
+@bp.route("/dashboard")
+@login_required
+def dashboard():
+    """The dashboard counters of the current user, read from their summary row."""
+    summary = dashboard_counters.for_user(current_user.id)
+
+    def counts(direction):
+        found = {column: getattr(summary, f"{direction}_{column}") for column in STATUS_COLUMNS.values()}
+        found["total"] = getattr(summary, f"{direction}_total")
+        return found
+
+    return jsonify(
+        user={"id": current_user.id, "username": current_user.username},
+        listings=summary.listing_count,
+        received=counts("received"),
+        sent=counts("sent"),
+    )
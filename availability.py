@@ -0,0 +1,161 @@
+"""
+Availability search: listings in a destination whose dates overlap a window.
+
+"Hosts in Lisbon available between 2026-11-01 and 2026-11-10" is a range
+overlap (start_date <= :end AND end_date >= :start), which a B-tree index
+can only half answer: it narrows one bound and scans the rest. The default
+backend on SQLite keeps an R*Tree, `trip_availability`, with one box per
+Trip (id = trip.id) over three dimensions:
+
+  * days: julian day of start_date .. end_date;
+  * destination key: the first four characters of the lower-cased
+    destination, as a base-128 number (non-ASCII characters count as 127);
+  * offer: is_accommodation_offer (0 or 1), so hosts and travelers are
+    searched separately.
+
+An overlap query reads only the boxes that intersect the window, whatever
+the size of the table. Destinations sharing their first four characters
+share a key, so the matches are checked against the full destination when
+joined back to `trip`. Triggers on `trip` keep the index in sync, as they
+do for the search index (search.py).
+
+Non-SQLite databases fall back to the plain range predicate.
+"""
+from sqlalchemy import DDL, event, func, text
+
+AVAILABILITY_TABLE = "trip_availability"
+
+
+def destination_key(expression):
+    """SQL for the destination key of `expression` (a column or a bound parameter)."""
+    name = f"lower(trim({expression}))"
+    return " + ".join(
+        f"min(coalesce(unicode(substr({name}, {i}, 1)), 0), 127) * {128 ** (4 - i)}" for i in range(1, 5)
+    )
+
+
+def _julian_day(expression):
+    return f"CAST(julianday({expression}) AS INTEGER)"
+
+
+def _box(row):
+    """The R*Tree columns of a trip row (`new.` in a trigger, `trip.` in a query)."""
+    start, end = _julian_day(f"{row}.start_date"), _julian_day(f"{row}.end_date")
+    key = destination_key(f"{row}.destination")
+    # min/max: a box with its bounds the wrong way round would make the insert fail
+    return (
+        f"min({start}, {end}), max({start}, {end}), {key}, {key}, "
+        f"{row}.is_accommodation_offer, {row}.is_accommodation_offer"
+    )
+
+
+RTREE_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {AVAILABILITY_TABLE} USING rtree_i32(
+        id, first_day, last_day, destination_min, destination_max, offer_min, offer_max
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS trip_availability_insert AFTER INSERT ON trip BEGIN
+        INSERT INTO {AVAILABILITY_TABLE} VALUES (new.id, {_box("new")});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trip_availability_update
+        AFTER UPDATE OF destination, start_date, end_date, is_accommodation_offer ON trip BEGIN
+        INSERT OR REPLACE INTO {AVAILABILITY_TABLE} VALUES (new.id, {_box("new")});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trip_availability_delete AFTER DELETE ON trip BEGIN
+        DELETE FROM {AVAILABILITY_TABLE} WHERE id = old.id;
+    END""",
+]
+
+REBUILD_SQL = [
+    f"DELETE FROM {AVAILABILITY_TABLE}",
+    f"INSERT INTO {AVAILABILITY_TABLE} SELECT trip.id, {_box('trip')} FROM trip",
+]
+
+# Boxes intersecting the window; the offer bounds are widened to 0..1 to search both sides
+OVERLAP_SQL = f"""SELECT id FROM {AVAILABILITY_TABLE}
+    WHERE first_day <= {_julian_day(":end")} AND last_day >= {_julian_day(":start")}
+      AND destination_min <= ({destination_key(":destination")})
+      AND destination_max >= ({destination_key(":destination")})
+      AND offer_min <= :offer_high AND offer_max >= :offer_low"""
+
+
+class RTreeAvailabilityBackend:
+    """Overlap search through the trip_availability R*Tree."""
+
+    def install(self, connection):
+        for statement in RTREE_SCHEMA:
+            connection.exec_driver_sql(statement)
+
+    def rebuild(self, connection):
+        for statement in REBUILD_SQL:
+            connection.exec_driver_sql(statement)
+
+    def filter(self, query, trip_model, destination, start, end, is_offer=None):
+        offer_low, offer_high = (0, 1) if is_offer is None else (int(is_offer),) * 2
+        boxes = text(OVERLAP_SQL).bindparams(
+            destination=destination, start=start.isoformat(), end=end.isoformat(),
+            offer_low=offer_low, offer_high=offer_high,
+        ).columns(id=trip_model.id.type)
+        return query.filter(
+            trip_model.id.in_(boxes),
+            # The key only covers the first four characters
+            func.lower(func.trim(trip_model.destination)) == func.lower(func.trim(destination)),
+        )
+
+
+class RangeAvailabilityBackend:
+    """Portable fallback: the overlap predicate on the trip table itself."""
+
+    def install(self, connection):
+        pass
+
+    def rebuild(self, connection):
+        pass
+
+    def filter(self, query, trip_model, destination, start, end, is_offer=None):
+        query = query.filter(
+            func.lower(func.trim(trip_model.destination)) == func.lower(func.trim(destination)),
+            trip_model.start_date <= end,
+            trip_model.end_date >= start,
+        )
+        if is_offer is not None:
+            query = query.filter(trip_model.is_accommodation_offer == is_offer)
+        return query
+
+
+class ListingAvailability:
+    """Picks a backend for the app's database and wires up schema creation."""
+
+    def __init__(self, app=None, db=None, trip_model=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app, db, trip_model)
+
+    def init_app(self, app, db, trip_model):
+        uri = app.config["SQLALCHEMY_DATABASE_URI"]
+        app.config.setdefault("AVAILABILITY_BACKEND", "rtree" if uri.startswith("sqlite") else "range")
+        self.Trip = trip_model
+
+        if app.config["AVAILABILITY_BACKEND"] == "rtree":
+            self.backend = RTreeAvailabilityBackend()
+            # Let `db.create_all()` (the init-db command) create the index too
+            for statement in RTREE_SCHEMA:
+                event.listen(db.metadata, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+        else:
+            self.backend = RangeAvailabilityBackend()
+        app.extensions["listing_availability"] = self
+
+    def filter(self, query, destination, start, end, is_offer=None):
+        """
+        Narrows a query on Trip to the listings in `destination` (case-insensitive)
+        whose dates overlap [start, end]; `is_offer` picks hosts (True) or travelers (False).
+        """
+        return self.backend.filter(query, self.Trip, destination, start, end, is_offer)
+
+    def rebuild(self, connection):
+        self.backend.install(connection)
+        self.backend.rebuild(connection)
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Alembic autogenerate filter: the R*Tree and its shadow tables are not models."""
+    return not (type_ == "table" and reflected and compare_to is None and name.startswith(AVAILABILITY_TABLE))
@@ -0,0 +1,346 @@
+"""
+Benchmark helpers behind the `flask bench-*` commands.
+"""
+import contextvars
+import http.cookiejar
+import json
+import multiprocessing
+import os
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.engine import Engine
+
+from sqlite_profile import DEFAULT_PRAGMAS, configure_engine
+
+# What create_listing and trips() do, minus the ORM
+_READ_SQL = text(
+    "SELECT id, destination, start_date, end_date FROM trip "
+    "WHERE is_accommodation_offer = :offer ORDER BY created_at DESC, id DESC LIMIT 24"
+)
+_USER_SQL = text("SELECT id FROM user WHERE id = :id")
+_TRIP_SQL = text(
+    "INSERT INTO trip (destination, start_date, end_date, created_at, updated_at, is_accommodation_offer, user_id) "
+    "VALUES ('Lisbon', '2026-11-01', '2026-11-10', :now, :now, :offer, 1)"
+)
+_SWAP_SQL = text(
+    "INSERT INTO skillswap (skill_offered, skill_wanted, created_at, updated_at, user_id, trip_id) "
+    "VALUES ('cooking', 'guitar', :now, :now, 1, :trip_id)"
+)
+
+
+def _sqlite_worker(role, path, profile, deadline, results):
+    engine = create_engine(f"sqlite:///{path}")
+    if profile == "production":
+        configure_engine(engine, DEFAULT_PRAGMAS)
+    done = failed = 0
+    while time.time() < deadline:
+        try:
+            with engine.begin() as conn:
+                offer = done % 2 == 0
+                if role == "writer":
+                    conn.execute(_USER_SQL, {"id": 1})
+                    now = time.strftime("%Y-%m-%d %H:%M:%S")
+                    trip_id = conn.execute(_TRIP_SQL, {"now": now, "offer": offer}).lastrowid
+                    conn.execute(_SWAP_SQL, {"now": now, "trip_id": trip_id})
+                else:
+                    conn.execute(_READ_SQL, {"offer": offer}).all()
+            done += 1
+        except exc.OperationalError:
+            failed += 1
+    engine.dispose()
+    results.put((role, done, failed))
+
+
+def sqlite_concurrency(metadata, path, profile, writers, readers, seconds):
+    """
+    Runs `writers` + `readers` processes against a fresh SQLite file for
+    `seconds`. Returns throughput and the number of failed transactions.
+    """
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    setup = create_engine(f"sqlite:///{path}")
+    metadata.create_all(setup)
+    with setup.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO user (id, username, email, created_at) VALUES (1, 'bench', 'bench@example.com', CURRENT_TIMESTAMP)"
+        )
+    setup.dispose()
+
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    deadline = time.time() + seconds
+    processes = [
+        context.Process(target=_sqlite_worker, args=(role, path, profile, deadline, results))
+        for role in ["writer"] * writers + ["reader"] * readers
+    ]
+    for process in processes:
+        process.start()
+    totals = {"writer": [0, 0], "reader": [0, 0]}
+    for _ in processes:
+        role, done, failed = results.get()
+        totals[role][0] += done
+        totals[role][1] += failed
+    for process in processes:
+        process.join()
+
+    return {
+        "profile": profile,
+        "writes_per_sec": totals["writer"][0] / seconds,
+        "write_errors": totals["writer"][1],
+        "reads_per_sec": totals["reader"][0] / seconds,
+        "read_errors": totals["reader"][1],
+    }
+
+
+# --- Route load tests (`flask bench-routes`) ---
+
+class Scenario:
+    """
+    One benchmarked route. `user` is the username to log in as (None for
+    anonymous). `data` makes it a POST; `fresh_client` gives every request a
+    new client (a login must not find an already logged-in session).
+    """
+
+    def __init__(self, name, path, user=None, data=None, fresh_client=False):
+        self.name = name
+        self.path = path
+        self.user = user
+        self.data = data
+        self.fresh_client = fresh_client
+
+
+_statements = threading.local()
+_CSRF_RE = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if not statement.startswith("BEGIN"):  # Same rule as the query budget
+        _statements.count = getattr(_statements, "count", 0) + 1
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def peak_rss_mb():
+    """High-water resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _summary(latencies, queries, errors, sizes=(), cpu=()):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "mean_ms": statistics.fmean(latencies) if latencies else None,
+        "queries_per_request": statistics.fmean(queries) if queries else None,
+        "max_queries": max(queries) if queries else None,
+        # Response body as sent, i.e. compressed when an encoding was negotiated
+        "bytes_per_request": statistics.fmean(sizes) if sizes else None,
+        "cpu_ms_per_request": statistics.fmean(cpu) if cpu else None,
+    }
+
+
+class TestClientDriver:
+    """
+    Runs requests in-process: latency, SQL statements, response bytes and
+    CPU time per request, and peak RSS. `accept_encoding` is sent as the
+    Accept-Encoding header (None: identity, as before compression existed).
+    """
+
+    def __init__(self, app, password, accept_encoding=None):
+        self.app = app
+        self.password = password
+        self.headers = {"Accept-Encoding": accept_encoding} if accept_encoding else {}
+        self._clients = {}
+        if not event.contains(Engine, "before_cursor_execute", _count_statement):
+            event.listen(Engine, "before_cursor_execute", _count_statement)
+
+    def _client(self, scenario):
+        if scenario.user is None:
+            return self.app.test_client()
+        if scenario.fresh_client or scenario.user not in self._clients:
+            client = self.app.test_client()
+            client.post("/login", data={"username": scenario.user, "password": self.password})
+            if scenario.fresh_client:
+                return client
+            self._clients[scenario.user] = client
+        return self._clients[scenario.user]
+
+    def run(self, scenario, requests, warmup):
+        # A CLI command runs inside an app context, which test requests would reuse
+        # (one g and one db.session for all of them). An empty context gives each
+        # request its own, like in a real worker.
+        return contextvars.Context().run(self._run, scenario, requests, warmup)
+
+    def _run(self, scenario, requests, warmup):
+        latencies, queries, sizes, cpu, errors = [], [], [], [], 0
+        for n in range(warmup + requests):
+            client = self._client(scenario)
+            _statements.count = 0
+            started, cpu_started = time.perf_counter(), time.process_time()
+            if scenario.data is None:
+                response = client.get(scenario.path, headers=self.headers)
+            else:
+                response = client.post(scenario.path, data=scenario.data, headers=self.headers)
+            body = response.get_data()
+            elapsed = (time.perf_counter() - started) * 1000
+            cpu_elapsed = (time.process_time() - cpu_started) * 1000
+            if n < warmup:
+                continue
+            latencies.append(elapsed)
+            cpu.append(cpu_elapsed)
+            sizes.append(len(body))
+            queries.append(_statements.count)
+            errors += response.status_code >= 500
+        result = _summary(latencies, queries, errors, sizes, cpu)
+        result["peak_rss_mb"] = peak_rss_mb()
+        return result
+
+
+class HTTPDriver:
+    """
+    Runs requests against a server that is already listening (e.g. a local
+    gunicorn). Only latency and response bytes are measured: queries, CPU
+    and memory live in the server processes.
+    """
+
+    def __init__(self, base_url, password, accept_encoding=None):
+        self.base_url = base_url.rstrip("/")
+        self.password = password
+        self.headers = {"Accept-Encoding": accept_encoding} if accept_encoding else {}
+        self._openers = {}
+
+    def _form(self, opener, path, data):
+        """Encodes a POST body, with the CSRF token of the form served at `path`."""
+        page = opener.open(self.base_url + path).read().decode()
+        found = _CSRF_RE.search(page)
+        if found:
+            data = {**data, "csrf_token": found.group(1)}
+        return urllib.parse.urlencode(data).encode()
+
+    def _opener(self, scenario):
+        if scenario.user is not None and not scenario.fresh_client and scenario.user in self._openers:
+            return self._openers[scenario.user]
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        if scenario.user is not None:
+            login = self._form(opener, "/login", {"username": scenario.user, "password": self.password})
+            opener.open(self.base_url + "/login", login).read()
+            if not scenario.fresh_client:
+                self._openers[scenario.user] = opener
+        return opener
+
+    def run(self, scenario, requests, warmup):
+        latencies, sizes, errors = [], [], 0
+        for n in range(warmup + requests):
+            opener = self._opener(scenario)
+            data = self._form(opener, scenario.path, scenario.data) if scenario.data is not None else None
+            request = urllib.request.Request(self.base_url + scenario.path, data, headers=self.headers)
+            started = time.perf_counter()
+            try:
+                # urllib does not decode Content-Encoding: this is the size on the wire
+                size = len(opener.open(request).read())
+                failed = False
+            except urllib.error.HTTPError as e:
+                size = len(e.read())
+                failed = e.code >= 500
+            elapsed = (time.perf_counter() - started) * 1000
+            if n < warmup:
+                continue
+            latencies.append(elapsed)
+            sizes.append(size)
+            errors += failed
+        result = _summary(latencies, [], errors, sizes)
+        result["peak_rss_mb"] = None
+        return result
+
+
+def route_benchmark(driver, scenarios, requests, warmup=5):
+    """Runs every scenario in order and returns {name: metrics}."""
+    return {scenario.name: driver.run(scenario, requests, warmup) for scenario in scenarios}
+
+
+def compare_baselines(old, new, metrics=("p50_ms", "p95_ms", "p99_ms", "queries_per_request", "peak_rss_mb",
+                                         "bytes_per_request", "cpu_ms_per_request")):
+    """Yields (route, metric, old, new, relative change) for routes present in both runs."""
+    for name, current in new["routes"].items():
+        previous = old.get("routes", {}).get(name)
+        if previous is None:
+            continue
+        for metric in metrics:
+            before, after = previous.get(metric), current.get(metric)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before if before else None
+            yield name, metric, before, after, change
+
+
+# --- Process start-up (`flask bench-startup`) ---
+
+# Runs in a fresh interpreter; argv: path, parent's time.time() at spawn
+_STARTUP_SCRIPT = """
+import json, sys, time
+started = time.time()
+import app
+imported = time.time()
+application = app.create_app()
+created = time.time()
+client = application.test_client()
+status = client.get(sys.argv[1]).status_code
+first = time.time()
+client.get(sys.argv[1])
+second = time.time()
+spawned = float(sys.argv[2])
+print(json.dumps({
+    "interpreter_ms": (started - spawned) * 1000,
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_response_ms": (first - created) * 1000,
+    "second_response_ms": (second - first) * 1000,
+    "to_first_response_ms": (first - spawned) * 1000,
+    "status": status,
+    "alembic_loaded": "alembic" in sys.modules,
+}))
+"""
+
+
+def startup_benchmark(root, path, runs, env=None, warmup=1):
+    """
+    Starts `warmup` + `runs` fresh interpreters in `root` that import the
+    app, build it and serve `path` twice. Returns the median of each phase
+    over the measured runs. The warm-up runs fill on-disk caches.
+    """
+    env = {**os.environ, **(env or {})}
+    samples = []
+    for n in range(warmup + runs):
+        completed = subprocess.run(
+            [sys.executable, "-c", _STARTUP_SCRIPT, path, repr(time.time())],
+            cwd=root, env=env, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"start-up run failed:\n{completed.stderr}")
+        if n >= warmup:
+            samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    result = {key: statistics.median(sample[key] for sample in samples) for key in samples[0] if key.endswith("_ms")}
+    result["status"] = samples[-1]["status"]
+    result["alembic_loaded"] = any(sample["alembic_loaded"] for sample in samples)
+    return result
@@ -0,0 +1,606 @@
+"""
+`flask` commands, on a blueprint without a CLI group so they stay top-level
+(`flask seed`, not `flask commands seed`). They run inside an app context.
+
+The benchmark helpers pull in multiprocessing, urllib and friends. Only the
+bench-* commands use them, so they import them when they run: a web worker
+never loads them.
+"""
+from datetime import datetime, date
+import json
+import logging
+import os
+import platform
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import click
+from flask import Blueprint, current_app
+from sqlalchemy import create_engine, func, insert, text, tuple_
+from sqlalchemy.orm import joinedload
+from urllib.parse import urlencode
+
+import compression
+import static_assets
+from exports import EXPORT_FORMATS
+from imports import ListingImporter, read_records
+from passwords import HashingBusy
+from query_plans import explain_query_plan, plan_problems
+from seeding import DataSeeder, SEED_PASSWORD
+from extensions import db, password_hasher, listing_search, listing_availability, bulk_exporter, jobs, dashboard_counters
+from models import User, Trip, SkillSwap, Interaction, Job
+from routing import use_primary
+from views import parse_since
+from api import SKILLSWAPS, TRIPS
+
+bp = Blueprint("commands", __name__, cli_group=None)
+
+
+@bp.cli.command('init-db')
+def init_db_command():
+    """Initializes a new database or updates the schema."""
+    db.create_all()
+    print("Initialized the database with all tables.")
+
+@bp.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Creates the full-text search index if needed and refills it from all listings."""
+    with db.engine.begin() as conn:
+        listing_search.rebuild(conn)
+    print("Rebuilt the listing search index.")
+
+@bp.cli.command('rebuild-availability-index')
+def rebuild_availability_index_command():
+    """Creates the availability (destination x dates) index if needed and refills it from all listings."""
+    with db.engine.begin() as conn:
+        listing_availability.rebuild(conn)
+    print("Rebuilt the listing availability index.")
+
+@bp.cli.command('vendor-assets')
+def vendor_assets_command():
+    """Downloads the pinned third-party CSS/JS into static/vendor/ and checks their hashes."""
+    fetched = static_assets.vendor(current_app.static_folder)
+    print(f"Vendored {len(fetched)} files." if fetched else "All vendor files are present.")
+
+@bp.cli.command('build-assets')
+def build_assets_command():
+    """
+    Purges, fingerprints and pre-compresses the static assets into static/dist/,
+    vendoring any missing third-party file first. Fails rather than leave a page on the CDN.
+    """
+    try:
+        fetched = static_assets.vendor(current_app.static_folder)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Could not vendor the third-party assets: {e}")
+    if fetched:
+        print(f"Vendored {len(fetched)} files.")
+    manifest = static_assets.build(current_app.static_folder, os.path.join(current_app.root_path, current_app.template_folder))
+    for name, built in sorted(manifest.items()):
+        size = os.path.getsize(os.path.join(current_app.static_folder, static_assets.DIST, built))
+        print(f"  {name:18} -> {built} ({size / 1024:.1f} KiB)")
+    missing = sorted(set(static_assets.ASSETS) - set(manifest))
+    if missing:
+        raise SystemExit(f"Not built: {', '.join(missing)}")
+
+@bp.cli.command('compile-templates')
+def compile_templates_command():
+    """Compiles every template into TEMPLATE_CACHE_DIR, so new workers load bytecode instead of compiling."""
+    env = current_app.jinja_env
+    if env.bytecode_cache is None:
+        raise click.ClickException("TEMPLATE_CACHE_DIR is empty: there is no template cache to fill.")
+    started = time.perf_counter()
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    print(f"Cached {len(names)} templates in {current_app.config['TEMPLATE_CACHE_DIR']} "
+          f"({time.perf_counter() - started:.2f}s).")
+
+@bp.cli.command('rebuild-counters')
+def rebuild_counters_command():
+    """Recomputes the dashboard counters (user summaries, per-listing request counts) from scratch."""
+    with db.engine.begin() as conn:
+        dashboard_counters.rebuild(conn)
+    print("Rebuilt the dashboard counters.")
+
+@bp.cli.command('jobs-worker')
+@click.option('--batch-size', default=10, help='Jobs claimed per round trip.')
+@click.option('--idle-sleep', default=1.0, help='Seconds to wait when no job is due.')
+@click.option('--once', is_flag=True, help='Exit once no job is due instead of polling.')
+def jobs_worker_command(batch_size, idle_sleep, once):
+    """Runs queued background jobs (audit log, ...) with retries and backoff."""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    try:
+        done, failed = jobs.work(batch_size, idle_sleep, once, should_stop=lambda: bool(stopping))
+    except KeyboardInterrupt:
+        return
+    print(f"Ran {done} jobs, {failed} failed attempts.")
+
+@bp.cli.command('export')
+@click.argument('dataset', type=click.Choice(['listings', 'interactions']))
+@click.option('--format', 'fmt', type=click.Choice(list(EXPORT_FORMATS)), default='csv', help='Output format.')
+@click.option('--since', default=None, help='Only rows created after this ISO date/datetime.')
+@click.option('--output', '-o', type=click.File('w'), default='-', help='Output file (default: stdout).')
+def export_command(dataset, fmt, since, output):
+    """Streams all listings or interactions as CSV or JSONL."""
+    try:
+        since = parse_since(since)
+    except ValueError:
+        raise click.BadParameter("use an ISO date or datetime", param_hint="--since")
+    stats = {}
+    for chunk in bulk_exporter.stream(db.session, dataset, fmt, since, stats):
+        output.write(chunk)
+    last = stats["last_created_at"]
+    print(f"Exported {stats['rows']} {dataset}." + (f" Next run: --since {last.isoformat()}" if last else ""), file=sys.stderr)
+
+@bp.cli.command('import-listings')
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None, help='Input format (default: from the file extension).')
+@click.option('--batch-size', default=5000, help='Listings per transaction.')
+@click.option('--checkpoint', default=None, help='Checkpoint file (default: SOURCE.checkpoint).')
+@click.option('--errors', 'errors_path', default=None, help='Error report CSV (default: SOURCE.errors.csv).')
+@click.option('--create-users', is_flag=True, help='Create unknown usernames that come with an email (no password).')
+def import_listings_command(source, fmt, batch_size, checkpoint, errors_path, create_users):
+    """Bulk-loads trips and skill swaps from CSV or JSONL, resuming from the last checkpoint."""
+    if fmt is None:
+        fmt = "jsonl" if source.endswith((".jsonl", ".ndjson")) else "csv"
+    importer = ListingImporter(
+        db.engine, User.__table__, Trip.__table__, SkillSwap.__table__, listing_search,
+        batch_size=batch_size, create_users=create_users
+    )
+    started = time.perf_counter()
+    with open(source, newline="", encoding="utf-8") as f:
+        state = importer.run(
+            read_records(f, fmt),
+            checkpoint or source + ".checkpoint",
+            errors_path or source + ".errors.csv",
+            progress=lambda state: print(f"  {state['done']} records, {state['imported']} imported, {state['errors']} rejected", file=sys.stderr)
+        )
+    # Core inserts skip the ORM events that keep the dashboard counters current
+    with db.engine.begin() as conn:
+        dashboard_counters.rebuild(conn)
+    elapsed = time.perf_counter() - started
+    imported = importer.imported_this_run
+    print(f"Imported {imported} listings in {elapsed:.1f}s ({imported / max(elapsed, 1e-9):.0f}/s). "
+          f"Totals for {source}: {state['imported']} imported, {state['errors']} rejected.")
+
+@bp.cli.command('seed')
+@click.option('--users', default=1000, help='Users to create.')
+@click.option('--trips', default=10000, help='Trips (each with a skill swap) to create.')
+@click.option('--interactions', default=20000, help='Interactions to create.')
+@click.option('--seed', default=42, help='Random seed; the same seed gives the same data.')
+@click.option('--destination-skew', default=1.1, help='Zipf exponent of destination popularity (0 = uniform).')
+@click.option('--hot-users', default=10, help='Users whose listings attract --hot-share of all interactions.')
+@click.option('--hot-share', default=0.3, help='Share of interactions sent to the hot users.')
+def seed_command(users, trips, interactions, seed, destination_skew, hot_users, hot_share):
+    """Fills the database with reproducible synthetic users, listings and interactions."""
+    db.create_all()
+    seeder = DataSeeder(
+        db.engine, User.__table__, Trip.__table__, SkillSwap.__table__, Interaction.__table__,
+        listing_search, seed=seed
+    )
+    started = time.perf_counter()
+    ranges = seeder.run(
+        users, trips, interactions,
+        # One hash for everybody: hashing 100k passwords would take longer than the rest
+        password_hash=password_hasher.hash(SEED_PASSWORD),
+        destination_skew=destination_skew, hot_users=hot_users, hot_share=hot_share,
+        progress=lambda kind, done, total: print(f"  {kind}: {done}/{total}", file=sys.stderr)
+    )
+    with db.engine.begin() as conn:
+        dashboard_counters.rebuild(conn)
+    print(f"Seeded {users} users, {trips} trips and {interactions} interactions in {time.perf_counter() - started:.1f}s.")
+    first, last = ranges["hot_users"]
+    if last >= first:
+        print(f"Hot users: user{first}..user{last}. Every seeded user logs in with '{SEED_PASSWORD}'.")
+    password_hasher.shutdown()
+
+def bench_scenarios(password):
+    """The routes `bench-routes` measures, against whatever data is in the database."""
+    import benchmarks
+    hot_recipient = db.session.execute(
+        db.select(Interaction.recipient_id).group_by(Interaction.recipient_id)
+        .order_by(func.count().desc()).limit(1)
+    ).scalar()
+    hot_destination = db.session.execute(
+        db.select(Trip.destination).group_by(Trip.destination).order_by(func.count().desc()).limit(1)
+    ).scalar()
+    middle_id = db.session.execute(db.select(func.max(User.id))).scalar() // 2
+    typical = db.session.execute(db.select(User).where(User.id >= middle_id).order_by(User.id).limit(1)).scalar()
+    target = db.session.execute(
+        db.select(Trip.id).where(Trip.user_id != typical.id).order_by(Trip.id.desc()).limit(1)
+    ).scalar()
+    hot = db.session.get(User, hot_recipient) if hot_recipient else typical
+
+    return [
+        benchmarks.Scenario("trips", "/trips"),
+        benchmarks.Scenario("trips_hot_destination", "/trips?" + urlencode({"destination": hot_destination})),
+        benchmarks.Scenario("trips_json", "/trips.json"),
+        # Same page size as /trips.json: ORM objects vs column rows, all fields vs a few
+        benchmarks.Scenario("api_trips", "/api/v1/trips?limit=24"),
+        benchmarks.Scenario("api_trips_sparse", "/api/v1/trips?limit=24&fields=id,destination,start_date,end_date"),
+        # Hosts in the busiest destination over ten days: overlap predicate vs the R*Tree
+        benchmarks.Scenario("trips_json_window", "/trips.json?" + urlencode(
+            {"destination": hot_destination, "date_from": "2026-06-01", "date_to": "2026-06-10", "type": "offers"}
+        )),
+        benchmarks.Scenario("api_availability", "/api/v1/availability?" + urlencode(
+            {"destination": hot_destination, "start": "2026-06-01", "end": "2026-06-10", "type": "offers", "limit": 24}
+        )),
+        benchmarks.Scenario("search", "/search?" + urlencode({"q": hot_destination})),
+        benchmarks.Scenario("login", "/login", data={"username": typical.username, "password": password}, fresh_client=True),
+        benchmarks.Scenario("dashboard", "/dashboard", user=typical.username),
+        benchmarks.Scenario("dashboard_hot_recipient", "/dashboard", user=hot.username),
+        benchmarks.Scenario("api_interactions", "/api/v1/interactions?role=received", user=hot.username),
+        benchmarks.Scenario("interact_get", f"/interact/{target}", user=typical.username),
+        benchmarks.Scenario("interact_post", f"/interact/{target}", user=typical.username,
+                            data={"message": "Hi! Is this still available?"}),
+    ]
+
+@bp.cli.command('bench-routes')
+@click.option('--requests', 'count', default=100, help='Measured requests per route (after warm-up).')
+@click.option('--warmup', default=5, help='Unmeasured requests per route first.')
+@click.option('--url', default=None, help='Drive a running server (e.g. http://127.0.0.1:8000) instead of the test client.')
+@click.option('--route', 'only', multiple=True, help='Only run these scenarios (repeatable).')
+@click.option('--password', default=SEED_PASSWORD, help='Password of the benchmark users.')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), default=None, help='Save the results as a JSON baseline.')
+@click.option('--compare', type=click.Path(exists=True, dir_okay=False), default=None, help='Baseline JSON to diff against.')
+@click.option('--accept-encoding', default=None, help='Accept-Encoding header to send (e.g. "gzip, br"; default: none).')
+def bench_routes_command(count, warmup, url, only, password, output, compare, accept_encoding):
+    """Measures p50/p95/p99 latency, SQL statements, bytes, CPU and peak RSS per route on seeded data."""
+    import benchmarks
+    if db.session.execute(db.select(func.count(User.id))).scalar() == 0:
+        raise click.ClickException("The database is empty: run `flask seed` first.")
+    scenarios = [scenario for scenario in bench_scenarios(password) if not only or scenario.name in only]
+    db.session.remove()
+
+    if url:
+        driver = benchmarks.HTTPDriver(url, password, accept_encoding)
+    else:
+        # Benchmark clients post forms without fetching a CSRF token first
+        current_app.config["WTF_CSRF_ENABLED"] = False
+        driver = benchmarks.TestClientDriver(current_app._get_current_object(), password, accept_encoding)
+    routes = benchmarks.route_benchmark(driver, scenarios, count, warmup)
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=current_app.root_path
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    result = {
+        "meta": {
+            "commit": commit,
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "driver": url or "test-client",
+            "database": db.engine.dialect.name,
+            "python": platform.python_version(),
+            "requests_per_route": count,
+            "accept_encoding": accept_encoding,
+            "rows": {
+                model.__tablename__: db.session.execute(db.select(func.count()).select_from(model)).scalar()
+                for model in (User, Trip, SkillSwap, Interaction)
+            },
+        },
+        "routes": routes,
+    }
+
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else format("-", ">9")
+
+    print(f"{'route':<26}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'KiB':>9}{'cpu ms':>9}"
+          f"{'rss MB':>9}{'errors':>8}")
+    for name, row in routes.items():
+        kib = row['bytes_per_request'] / 1024 if row['bytes_per_request'] is not None else None
+        print(f"{name:<26}{fmt(row['p50_ms'], '9.1f')}{fmt(row['p95_ms'], '9.1f')}{fmt(row['p99_ms'], '9.1f')}"
+              f"{fmt(row['queries_per_request'], '9.1f')}{fmt(kib, '9.1f')}{fmt(row['cpu_ms_per_request'], '9.1f')}"
+              f"{fmt(row['peak_rss_mb'], '9.0f')}{row['errors']:>8}")
+
+    if compare:
+        with open(compare) as f:
+            baseline = json.load(f)
+        print(f"\nChanges against {compare} ({baseline['meta'].get('commit')}):")
+        for name, metric, before, after, change in benchmarks.compare_baselines(baseline, result):
+            print(f"  {name:<26}{metric:<21}{before:>10.1f} -> {after:>10.1f}  "
+                  + (f"{change:+.0%}" if change is not None else ""))
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved baseline to {output}.")
+
+@bp.cli.command('bench-compression')
+@click.option('--requests', 'count', default=50, help='Measured requests per route and encoding (after warm-up).')
+@click.option('--warmup', default=3, help='Unmeasured requests per route and encoding first.')
+@click.option('--route', 'only', multiple=True, help='Only run these scenarios (repeatable).')
+@click.option('--password', default=SEED_PASSWORD, help='Password of the benchmark users.')
+def bench_compression_command(count, warmup, only, password):
+    """Compares bytes on the wire and CPU per request for identity, gzip and brotli on every route."""
+    import benchmarks
+    if db.session.execute(db.select(func.count(User.id))).scalar() == 0:
+        raise click.ClickException("The database is empty: run `flask seed` first.")
+    scenarios = [scenario for scenario in bench_scenarios(password) if not only or scenario.name in only]
+    db.session.remove()
+    current_app.config["WTF_CSRF_ENABLED"] = False
+    encodings = ["identity", "gzip"] + (["br"] if compression.brotli is not None else [])
+
+    runs = {}
+    for encoding in encodings:
+        driver = benchmarks.TestClientDriver(current_app._get_current_object(), password, None if encoding == "identity" else encoding)
+        runs[encoding] = benchmarks.route_benchmark(driver, scenarios, count, warmup)
+
+    minify = "on" if current_app.config["TEMPLATE_MINIFY"] else "off"
+    print(f"Template minification: {minify}. CPU is this process's time per request, compression included.")
+    print(f"{'route':<26}{'encoding':<10}{'KiB':>9}{'saved':>8}{'cpu ms':>9}{'+cpu ms':>9}{'p50 ms':>9}")
+    for scenario in scenarios:
+        identity = runs["identity"][scenario.name]
+        for encoding in encodings:
+            row = runs[encoding][scenario.name]
+            saved = 1 - row["bytes_per_request"] / identity["bytes_per_request"] if identity["bytes_per_request"] else 0
+            extra_cpu = row["cpu_ms_per_request"] - identity["cpu_ms_per_request"]
+            print(f"{scenario.name:<26}{encoding:<10}{row['bytes_per_request'] / 1024:>9.1f}{saved:>8.0%}"
+                  f"{row['cpu_ms_per_request']:>9.2f}{extra_cpu:>+9.2f}{row['p50_ms']:>9.1f}")
+
+@bp.cli.command('bench-startup')
+@click.option('--runs', default=5, help='Measured fresh processes per scenario.')
+@click.option('--path', default='/trips', help='Page each process serves (twice).')
+def bench_startup_command(runs, path):
+    """Measures import time and time to first response of fresh processes, with and without the template cache."""
+    import benchmarks
+    with tempfile.TemporaryDirectory() as cache_dir:
+        scenarios = {
+            "no template cache": {"TEMPLATE_CACHE_DIR": ""},
+            # The unmeasured warm-up run fills the cache, like `flask compile-templates` at deploy time
+            "template cache": {"TEMPLATE_CACHE_DIR": cache_dir},
+        }
+        results = {
+            name: benchmarks.startup_benchmark(current_app.root_path, path, runs, env)
+            for name, env in scenarios.items()
+        }
+
+    print(f"Median of {runs} processes serving {path} (ms):")
+    print(f"{'scenario':<20}{'python':>9}{'import':>9}{'factory':>9}{'1st resp':>10}{'2nd resp':>10}"
+          f"{'to 1st':>9}  alembic")
+    for name, row in results.items():
+        print(f"{name:<20}{row['interpreter_ms']:>9.1f}{row['import_ms']:>9.1f}{row['create_app_ms']:>9.1f}"
+              f"{row['first_response_ms']:>10.1f}{row['second_response_ms']:>10.1f}{row['to_first_response_ms']:>9.1f}"
+              f"  {'loaded' if row['alembic_loaded'] else 'not loaded'}")
+
+@bp.cli.command('bench-password-hashing')
+@click.option('--seconds', default=5.0, help='How long to run the benchmark.')
+@click.option('--concurrency', default=None, type=int, help='Parallel login attempts (default: 2x hash workers).')
+def bench_password_hashing_command(seconds, concurrency):
+    """Measures password checks (logins) per second through the hashing pool."""
+    workers = password_hasher.workers or 1
+    concurrency = concurrency or 2 * workers
+    stored = password_hasher.hash("benchmark-password")
+    counts = [0] * concurrency
+    rejected = [0] * concurrency
+    deadline = time.perf_counter() + seconds
+
+    def attempt_logins(slot):
+        while time.perf_counter() < deadline:
+            try:
+                password_hasher.verify(stored, "benchmark-password")
+                counts[slot] += 1
+            except HashingBusy:
+                rejected[slot] += 1
+
+    threads = [threading.Thread(target=attempt_logins, args=(slot,)) for slot in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    rate = sum(counts) / elapsed
+    print(f"method:          {password_hasher.method}")
+    print(f"hash workers:    {password_hasher.workers} (concurrency {concurrency})")
+    print(f"logins/sec:      {rate:.1f}")
+    print(f"logins/sec/core: {rate / workers:.1f}")
+    print(f"rejected (503):  {sum(rejected)}")
+    password_hasher.shutdown()
+
+@bp.cli.command('bench-sqlite')
+@click.option('--writers', default=4, help='Writer processes (create_listing-style transactions).')
+@click.option('--readers', default=4, help='Reader processes (marketplace page queries).')
+@click.option('--seconds', default=5.0, help='Duration of each run.')
+def bench_sqlite_command(writers, readers, seconds):
+    """Compares read/write throughput of the default and production SQLite profiles."""
+    import benchmarks
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    print(f"{'profile':<12}{'writes/s':>10}{'write errors':>14}{'reads/s':>10}{'read errors':>13}")
+    for profile in ("default", "production"):
+        result = benchmarks.sqlite_concurrency(db.metadata, path, profile, writers, readers, seconds)
+        print(f"{profile:<12}{result['writes_per_sec']:>10.1f}{result['write_errors']:>14}"
+              f"{result['reads_per_sec']:>10.1f}{result['read_errors']:>13}")
+
+@bp.cli.command('check-query-plans')
+def check_query_plans_command():
+    """
+    Seeds a scratch SQLite database and runs EXPLAIN QUERY PLAN on the
+    marketplace, dashboard, API and export queries. Exits non-zero if any of them
+    scans a whole table or sorts without an index.
+    """
+    engine = create_engine("sqlite://")
+    db.metadata.create_all(engine)
+
+    with engine.begin() as conn:
+        now = datetime.utcnow()
+        conn.execute(insert(User), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "created_at": now}
+            for i in range(1, 201)
+        ])
+        conn.execute(insert(Trip), [
+            {"id": i, "destination": f"City {i % 50}", "start_date": date(2026, 1, 1),
+             "end_date": date(2026, 1, 10), "created_at": now, "is_accommodation_offer": i % 2 == 0,
+             "user_id": i % 200 + 1}
+            for i in range(1, 5001)
+        ])
+        conn.execute(insert(SkillSwap), [
+            {"skill_offered": "cooking", "skill_wanted": "guitar", "created_at": now,
+             "user_id": i % 200 + 1, "trip_id": i}
+            for i in range(1, 5001)
+        ])
+        conn.execute(insert(Interaction), [
+            {"trip_id": i % 5000 + 1, "sender_id": i % 199 + 1, "recipient_id": i % 200 + 1,
+             "message": "Hello!", "status": "Pending", "created_at": now}
+            for i in range(1, 10001)
+        ])
+        conn.exec_driver_sql("ANALYZE")
+
+    # Mirrors the queries issued by trips() and dashboard()
+    offers = db.session.query(Trip.id, Trip.user_id, Trip.created_at).filter(Trip.is_accommodation_offer == True)
+    def page(query):
+        return query.order_by(Trip.created_at.desc(), Trip.id.desc()).limit(current_app.config["MARKETPLACE_PAGE_SIZE"] + 1)
+    interactions = Interaction.query.options(
+        joinedload(Interaction.trip), joinedload(Interaction.sender), joinedload(Interaction.recipient)
+    )
+    def api_page(resource):
+        model = resource.model
+        return resource.query(list(resource.fields)).order_by(model.created_at.desc(), model.id.desc()).limit(
+            current_app.config["API_PAGE_SIZE"] + 1
+        )
+    hot_queries = {
+        "trips: first page": page(offers),
+        "trips: next page": page(offers.filter(tuple_(Trip.created_at, Trip.id) < tuple_(now, 1))),
+        "trips: filtered": page(offers.filter(
+            Trip.destination.ilike("City%"), Trip.end_date >= date(2026, 1, 1), Trip.start_date <= date(2026, 2, 1)
+        )),
+        "trips: card fill": Trip.query.options(joinedload(Trip.skillswap), joinedload(Trip.user)).filter(Trip.id.in_([1, 2, 3])),
+        "dashboard: listings": Trip.query.options(joinedload(Trip.skillswap)).filter_by(user_id=1).order_by(Trip.created_at.desc()),
+        "dashboard: received": interactions.filter_by(recipient_id=1).order_by(Interaction.created_at.desc()),
+        "dashboard: received by status": interactions.filter_by(recipient_id=1, status="Pending").order_by(
+            Interaction.created_at.desc(), Interaction.id.desc()
+        ),
+        "dashboard: sent": interactions.filter_by(sender_id=1).order_by(Interaction.created_at.desc()),
+        "skill swaps by user": SkillSwap.query.filter_by(user_id=1),
+        # /api/v1 pages with every field (so every join)
+        "api: trips": api_page(TRIPS),
+        "api: skill swaps": api_page(SKILLSWAPS),
+        # Streaming exports must not sort the whole table before the first chunk
+        "export: listings": bulk_exporter.statement("listings"),
+        "export: interactions": bulk_exporter.statement("interactions"),
+        "export: interactions since": bulk_exporter.statement("interactions", now),
+    }
+
+    failed = False
+    with engine.connect() as conn:
+        for name, query in hot_queries.items():
+            plan = explain_query_plan(conn, getattr(query, "statement", query))
+            problems = plan_problems(plan)
+            print(f"{'FAIL' if problems else 'ok':4}  {name}")
+            for step in plan:
+                print(f"        {step}")
+            failed = failed or bool(problems)
+
+    if failed:
+        raise SystemExit("One or more hot queries scan a full table or sort without an index.")
+
+@bp.cli.command('check-routing')
+def check_routing_command():
+    """
+    Builds a scratch app on two SQLite files, a primary and a replica that
+    lags behind it, and checks where requests read from: replica for plain
+    reads, primary for writes, @use_primary views, reads after a flush in a
+    GET, reads within the read-your-writes window (_db_primary_until) and
+    when no replica is configured. Exits non-zero if any case reads the
+    wrong file.
+    """
+    from app import create_app
+
+    with tempfile.TemporaryDirectory() as directory:
+        primary_path = os.path.join(directory, "primary.db")
+        replica_path = os.path.join(directory, "replica.db")
+
+        def scratch_app(replicas):
+            binds = {"replica0": f"sqlite:///{replica_path}"} if replicas else {}
+            app = create_app({
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{primary_path}",
+                "SQLALCHEMY_BINDS": binds,
+                "DATABASE_REPLICAS": list(binds),
+                "DATABASE_READ_YOUR_WRITES_SECONDS": 60,
+                "TEMPLATE_CACHE_DIR": "",
+                "WTF_CSRF_ENABLED": False,
+            })
+
+            # Probe views: the name of the database file that answered
+            def answered():
+                files = {row[1]: row[2] for row in db.session.execute(text("PRAGMA database_list"))}
+                return os.path.basename(files["main"])
+
+            def write():
+                db.session.add(Job(name="check-routing"))
+                db.session.flush()
+                answer = answered()
+                db.session.commit()
+                return answer
+
+            def flush_then_read():
+                before = answered()
+                db.session.add(Job(name="check-routing"))
+                db.session.flush()
+                after = answered()
+                db.session.rollback()
+                return f"{before} then {after}"
+
+            app.add_url_rule("/_routing/read", "routing_read", answered, methods=["GET", "POST"])
+            app.add_url_rule("/_routing/primary", "routing_primary", use_primary(lambda: answered()))
+            app.add_url_rule("/_routing/write", "routing_write", write, methods=["POST"])
+            app.add_url_rule("/_routing/flush", "routing_flush", flush_then_read)
+            return app
+
+        app = scratch_app(replicas=True)
+        with app.app_context():
+            for engine in db.engines.values():
+                db.metadata.create_all(engine)
+            # A listing the replica hasn't received yet
+            with db.engines[None].begin() as conn:
+                conn.execute(insert(User), [{"id": 1, "username": "routing", "email": "routing@example.com"}])
+                conn.execute(insert(Trip), [{
+                    "id": 1, "destination": "Lisbon", "start_date": date(2026, 1, 1), "end_date": date(2026, 1, 10),
+                    "is_accommodation_offer": True, "user_id": 1, "created_at": datetime.utcnow(),
+                }])
+
+        client = app.test_client()
+        checks = [
+            ("GET reads from the replica", client.get("/_routing/read").text, "replica.db"),
+            ("a page reads the lagging replica", client.get("/listing/1").status_code, 404),
+            ("POST reads from the primary", client.post("/_routing/read").text, "primary.db"),
+            ("@use_primary GET reads from the primary", client.get("/_routing/primary").text, "primary.db"),
+            ("a read after a write in the same request uses the primary", client.post("/_routing/write").text, "primary.db"),
+            ("GET within the read-your-writes window uses the primary", client.get("/_routing/read").text, "primary.db"),
+            ("... and sees the write", client.get("/listing/1").status_code, 200),
+            ("a GET is pinned to the primary after it flushes", app.test_client().get("/_routing/flush").text,
+             "replica.db then primary.db"),
+        ]
+        with client.session_transaction() as browser_session:
+            window = browser_session.get("_db_primary_until", 0) - time.time()
+        checks.append(("the write set a 60s read-your-writes window", 55 < window <= 60, True))
+        with client.session_transaction() as browser_session:
+            browser_session["_db_primary_until"] = 0  # The window has passed
+        checks += [
+            ("GET after the window reads from the replica again", client.get("/_routing/read").text, "replica.db"),
+            ("another browser never wrote: replica", app.test_client().get("/_routing/read").text, "replica.db"),
+        ]
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+        app = scratch_app(replicas=False)
+        checks.append(("no replica configured: GET reads from the primary", app.test_client().get("/_routing/read").text, "primary.db"))
+        with app.app_context():
+            db.engines[None].dispose()
+
+    failed = False
+    for name, actual, expected in checks:
+        ok = actual == expected
+        print(f"{'ok' if ok else 'FAIL':4}  {name}" + ("" if ok else f" (got {actual!r}, expected {expected!r})"))
+        failed = failed or not ok
+    if failed:
+        raise SystemExit("Requests read from the wrong database.")
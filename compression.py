@@ -0,0 +1,259 @@
+"""
+On-the-fly response compression and compile-time HTML minification.
+
+`ResponseCompression` wraps `app.wsgi_app` in a WSGI middleware. It
+compresses text responses (HTML, JSON, CSS, CSV exports, ...) with the
+best encoding the client accepts: brotli when the optional `brotli`
+package is installed, then gzip. It leaves a response alone when:
+
+  * it already has a Content-Encoding (the pre-compressed files from
+    `flask build-assets`), or Cache-Control: no-transform;
+  * its Content-Length is below COMPRESSION_MIN_SIZE: a few hundred
+    bytes gain nothing once the encoding overhead is counted;
+  * its type is not in COMPRESSION_MIMETYPES (images, archives, and
+    text/event-stream, whose events must not wait in a compressor);
+  * it is a HEAD, 204, 206 or 304 response.
+
+A response with a Content-Length is compressed in one go and sent with its
+new length. A streamed response (no Content-Length, e.g. the admin exports)
+is compressed chunk by chunk with a sync flush after each chunk, so the
+client still receives data as the app produces it. A compressed response
+gets Vary: Accept-Encoding, and a strong ETag becomes weak: the bytes
+differ, the content does not.
+
+`TemplateMinifier` is a Jinja extension that strips indentation, blank
+lines and HTML comments from .html templates when they are compiled.
+Templates are compiled once per process, so rendering costs nothing
+extra. Line breaks are kept: they are whitespace to HTML, and inline
+scripts may rely on them. <pre> and <textarea> blocks are left as they are.
+"""
+import re
+import zlib
+
+from jinja2.ext import Extension
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # Optional: without it responses are only gzipped
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = (
+    "text/html", "text/css", "text/plain", "text/csv", "text/xml", "text/javascript",
+    "application/json", "application/javascript", "application/xml", "application/x-ndjson",
+    "image/svg+xml",
+)
+SKIPPED_STATUSES = ("204", "206", "304")
+
+_PRESERVED = re.compile(r"<(pre|textarea)\b.*?</\1\s*>", re.S | re.I)
+# Conditional comments (<!--[if IE]>) are markup, not comments
+_HTML_COMMENT = re.compile(r"<!--(?!\[if).*?-->", re.S)
+_INDENTATION = re.compile(r"\n\s+")
+
+
+# --- Template minification ---
+
+def _squeeze(text):
+    text = _HTML_COMMENT.sub("", text)
+    # \s matches newlines too, so this also drops blank lines
+    return _INDENTATION.sub("\n", text)
+
+
+def minify_html(source):
+    """The template source without indentation, blank lines and comments, outside <pre>/<textarea>."""
+    out, last = [], 0
+    for block in _PRESERVED.finditer(source):
+        out.append(_squeeze(source[last:block.start()]))
+        out.append(block.group(0))
+        last = block.end()
+    out.append(_squeeze(source[last:]))
+    return "".join(out).strip() + "\n"
+
+
+class TemplateMinifier(Extension):
+    """Minifies .html templates as Jinja loads them (before compiling, so once per template)."""
+
+    def preprocess(self, source, name, filename=None):
+        if name is None or not name.endswith(".html"):
+            return source
+        return minify_html(source)
+
+
+# --- Response compression ---
+
+def _weak(etag):
+    return etag if etag.startswith("W/") else "W/" + etag
+
+
+class _Gzip:
+    def __init__(self, level):
+        # wbits 16 + MAX_WBITS: gzip header and trailer, not raw zlib
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def chunk(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def compress(data, encoding, level):
+    """One-shot compression of a complete body."""
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return zlib.compress(data, level, wbits=16 + zlib.MAX_WBITS)
+
+
+class CompressionMiddleware:
+    def __init__(self, wsgi_app, min_size=500, gzip_level=6, brotli_quality=4, mimetypes=COMPRESSIBLE_MIMETYPES):
+        self.wsgi_app = wsgi_app
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.mimetypes = frozenset(mimetypes)
+        self.encodings = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    def negotiate(self, accept_encoding):
+        """The encoding to use for an Accept-Encoding header, or None for identity."""
+        if not accept_encoding:
+            return None
+        accepted = parse_accept_header(accept_encoding)
+        for encoding in self.encodings:
+            if accepted.quality(encoding) > 0:
+                return encoding
+        return None
+
+    def _should_compress(self, status, headers):
+        if status[:3] in SKIPPED_STATUSES:
+            return False
+        values = {name.lower(): value for name, value in headers}
+        if "content-encoding" in values or "no-transform" in values.get("cache-control", "").lower():
+            return False
+        mimetype = values.get("content-type", "").split(";", 1)[0].strip().lower()
+        if mimetype not in self.mimetypes:
+            return False
+        length = values.get("content-length")
+        return length is None or not length.isdigit() or int(length) >= self.min_size
+
+    def __call__(self, environ, start_response):
+        encoding = self.negotiate(environ.get("HTTP_ACCEPT_ENCODING"))
+        if encoding is None or environ.get("REQUEST_METHOD") == "HEAD":
+            return self.wsgi_app(environ, start_response)
+
+        state = {}
+
+        def deferred_start_response(status, headers, exc_info=None):
+            if exc_info is not None and state.get("started"):
+                raise exc_info[1].with_traceback(exc_info[2])
+            state.update(status=status, headers=headers, exc_info=exc_info,
+                         compress=self._should_compress(status, headers))
+            if status[:3] == "304":
+                # Same validator as the compressed 200 it confirms
+                headers = [(name, _weak(value) if name.lower() == "etag" else value) for name, value in headers]
+            if not state["compress"]:
+                state["started"] = True
+                return start_response(status, headers, exc_info)
+            return self._legacy_write
+
+        app_iter = self.wsgi_app(environ, deferred_start_response)
+        if "compress" in state and not state["compress"]:
+            # Untouched: keeps wsgi.file_wrapper (sendfile) for static files
+            return app_iter
+        return self._compressed(app_iter, encoding, state, start_response)
+
+    @staticmethod
+    def _legacy_write(data):
+        raise RuntimeError("the write() callable is not supported by CompressionMiddleware")
+
+    def _start(self, state, start_response, encoding, length=None):
+        headers = []
+        vary = []
+        for name, value in state["headers"]:
+            lowered = name.lower()
+            if lowered == "content-length":
+                continue
+            if lowered == "vary":
+                vary.extend(v.strip() for v in value.split(",") if v.strip())
+                continue
+            if lowered == "etag":
+                value = _weak(value)
+            headers.append((name, value))
+        if "accept-encoding" not in {v.lower() for v in vary}:
+            vary.append("Accept-Encoding")
+        headers.append(("Vary", ", ".join(vary)))
+        headers.append(("Content-Encoding", encoding))
+        if length is not None:
+            headers.append(("Content-Length", str(length)))
+        state["started"] = True
+        start_response(state["status"], headers, state["exc_info"])
+
+    def _compressed(self, app_iter, encoding, state, start_response):
+        level = self.brotli_quality if encoding == "br" else self.gzip_level
+        try:
+            iterator = iter(app_iter)
+            first = next(iterator, None)
+            if not state.get("compress"):
+                # start_response was only called once iteration began, and said no
+                if first is not None:
+                    yield first
+                yield from iterator
+                return
+
+            streamed = not any(name.lower() == "content-length" for name, _value in state["headers"])
+            if not streamed:
+                body = b"".join([first or b"", *iterator])
+                body = compress(body, encoding, level)
+                self._start(state, start_response, encoding, len(body))
+                yield body
+                return
+
+            compressor = _Brotli(level) if encoding == "br" else _Gzip(level)
+            self._start(state, start_response, encoding)
+            if first:
+                yield compressor.chunk(first)
+            for data in iterator:
+                if data:
+                    yield compressor.chunk(data)
+            yield compressor.finish()
+        finally:
+            close = getattr(app_iter, "close", None)
+            if close is not None:
+                close()
+
+
+class ResponseCompression:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("COMPRESSION_ENABLED", True)
+        app.config.setdefault("COMPRESSION_MIN_SIZE", 500)       # bytes
+        app.config.setdefault("COMPRESSION_GZIP_LEVEL", 6)
+        # 4-5 is about gzip's speed at a better ratio; 11 is for build-time assets only
+        app.config.setdefault("COMPRESSION_BROTLI_QUALITY", 4)
+        app.config.setdefault("COMPRESSION_MIMETYPES", COMPRESSIBLE_MIMETYPES)
+        app.config.setdefault("TEMPLATE_MINIFY", False)
+
+        if app.config["TEMPLATE_MINIFY"]:
+            app.jinja_env.add_extension(TemplateMinifier)
+        if app.config["COMPRESSION_ENABLED"]:
+            app.wsgi_app = CompressionMiddleware(
+                app.wsgi_app,
+                min_size=app.config["COMPRESSION_MIN_SIZE"],
+                gzip_level=app.config["COMPRESSION_GZIP_LEVEL"],
+                brotli_quality=app.config["COMPRESSION_BROTLI_QUALITY"],
+                mimetypes=app.config["COMPRESSION_MIMETYPES"],
+            )
+        app.extensions["compression"] = self
@@ -0,0 +1,84 @@
+"""
+Conditional GET (ETag / Last-Modified) for read-heavy pages.
+
+A view decorated with @conditional(watermark) first asks `watermark` for a
+cheap version of the data it renders - typically a row count plus the
+newest updated_at, which indexes answer without touching the rows - and
+answers 304 Not Modified before any template work when the client's copy
+is still current.
+
+The ETag is strong and derived from the watermark, the URL and the viewer
+(pages differ for the listing owner), never from the rendered body. The
+compression middleware sends it weak (W/"...") on compressed responses, so
+If-None-Match uses the weak comparison, as RFC 9110 requires. It also wins
+over If-Modified-Since. Deletions only
+change the row count, so clients that send If-Modified-Since alone may keep a
+removed listing until something else changes.
+"""
+import hashlib
+from datetime import timezone
+from functools import wraps
+
+from flask import make_response, request, session
+from flask_login import current_user
+
+# Bump when templates change in a way the watermark can't see
+CONDITIONAL_VERSION = 1
+
+
+def _as_utc(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def _is_fresh(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def conditional(watermark):
+    """
+    `watermark(*view_args)` returns (version, last_modified), or None to
+    skip conditional handling (e.g. the object doesn't exist).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            # Pending flash messages are one-off content: always render them
+            if request.method not in ("GET", "HEAD") or session.get("_flashes"):
+                return view(*args, **kwargs)
+
+            mark = watermark(*args, **kwargs)
+            if mark is None:
+                return view(*args, **kwargs)
+            version, last_modified = mark
+            last_modified = _as_utc(last_modified)
+
+            viewer = current_user.get_id() if current_user.is_authenticated else ""
+            seed = f"{CONDITIONAL_VERSION}|{version}|{viewer}|{request.full_path}"
+            etag = hashlib.sha1(seed.encode()).hexdigest()
+
+            if _is_fresh(etag, last_modified):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # Stored copies must be revalidated; per-user variants stay out of shared caches
+            response.cache_control.no_cache = True
+            if viewer:
+                response.cache_control.private = True
+            response.vary.add("Cookie")
+            return response
+        return wrapped
+    return decorator
@@ -0,0 +1,186 @@
+"""
+Denormalized counters behind the dashboard badges.
+
+`user_summary` holds one row per user: their listing count and the number
+of received and sent requests in each status. `trip.interaction_count`
+counts the requests on each listing, and `trip.counted_at` records when
+that count last changed. ORM flush events keep both in sync,
+in the same transaction as the change, with relative updates
+(SET n = n + 1). Concurrent requests therefore never lose an increment,
+and a rolled-back request leaves no trace. Covered: new requests, status
+changes, requests deleted on their own or in cascade with their trip or
+user, and listings created or deleted.
+
+Core bulk writers (`flask seed`, `flask import-listings`) bypass the ORM
+and call `rebuild` when they finish. Set-based status updates report
+their changes to `record_status_changes`. `flask rebuild-counters` does the
+same after manual SQL. A user without a summary row gets one computed on
+first read.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from sqlalchemy import case, delete, event, exc, func, insert, inspect, select, update
+
+# Interaction.status -> the suffix of its summary columns
+STATUS_COLUMNS = {"Pending": "pending", "Accepted": "accepted", "Rejected": "rejected"}
+
+
+class DashboardCounters:
+    def __init__(self, app=None, db=None, user_model=None, trip_model=None,
+                 interaction_model=None, summary_model=None):
+        if app is not None:
+            self.init_app(app, db, user_model, trip_model, interaction_model, summary_model)
+
+    def init_app(self, app, db, user_model, trip_model, interaction_model, summary_model):
+        self.db = db
+        self.Summary = summary_model
+        self.users = user_model.__table__
+        self.trips = trip_model.__table__
+        self.interactions = interaction_model.__table__
+        self.summary = summary_model.__table__
+
+        # Mapper events are global: a second app (tests, create_app() twice) must not count twice
+        if not event.contains(user_model, "after_insert", self._user_created):
+            event.listen(user_model, "after_insert", self._user_created)
+            # Before, not after: the summary row references the user
+            event.listen(user_model, "before_delete", self._user_deleted)
+            event.listen(trip_model, "after_insert", self._trip_created)
+            event.listen(trip_model, "after_delete", self._trip_deleted)
+            event.listen(interaction_model, "after_insert", self._interaction_created)
+            event.listen(interaction_model, "after_update", self._interaction_updated)
+            event.listen(interaction_model, "after_delete", self._interaction_deleted)
+        app.extensions["dashboard_counters"] = self
+
+    # --- Reading ---
+
+    def for_user(self, user_id):
+        """The summary of a user, computed from the base tables if the row is missing."""
+        summary = self.db.session.get(self.Summary, user_id)
+        if summary is not None:
+            return summary
+        try:
+            with self.db.engine.begin() as conn:
+                self.rebuild(conn, [user_id])
+        except exc.IntegrityError:
+            pass  # A concurrent request inserted it first
+        with self.db.engine.connect() as conn:
+            row = conn.execute(select(self.summary).where(self.summary.c.user_id == user_id)).one()
+        # Detached copy: a lagging replica may not have the new row yet
+        return self.Summary(**row._mapping)
+
+    # --- Rebuilding ---
+
+    def rebuild(self, connection, user_ids=None):
+        """Recomputes the summary rows and per-trip counts of `user_ids` (default: everybody)."""
+        users, trips, interactions, summary = self.users, self.trips, self.interactions, self.summary
+
+        def count(table, *where):
+            return select(func.count()).select_from(table).where(*where).scalar_subquery()
+
+        columns = {"listing_count": count(trips, trips.c.user_id == users.c.id)}
+        for status, suffix in STATUS_COLUMNS.items():
+            columns[f"received_{suffix}"] = count(
+                interactions, interactions.c.recipient_id == users.c.id, interactions.c.status == status
+            )
+            columns[f"sent_{suffix}"] = count(
+                interactions, interactions.c.sender_id == users.c.id, interactions.c.status == status
+            )
+        source = select(users.c.id, *columns.values())
+        stale = delete(summary)
+        # Keep updated_at: a new count is not an edit of the listing (conditional GETs, card cache)
+        trip_counts = update(trips).values(
+            interaction_count=count(interactions, interactions.c.trip_id == trips.c.id),
+            counted_at=datetime.utcnow(),
+            updated_at=trips.c.updated_at,
+        )
+        if user_ids is not None:
+            source = source.where(users.c.id.in_(user_ids))
+            stale = stale.where(summary.c.user_id.in_(user_ids))
+            trip_counts = trip_counts.where(trips.c.user_id.in_(user_ids))
+
+        connection.execute(stale)
+        connection.execute(insert(summary).from_select(["user_id", *columns], source))
+        connection.execute(trip_counts)
+
+    def record_status_changes(self, session, changes):
+        """
+        Counter updates for interactions whose status was changed by a Core
+        UPDATE, which fires no flush events. `changes` holds (sender_id,
+        recipient_id, old_status, new_status) tuples. Issues one UPDATE per
+        affected column, however many rows changed.
+        """
+        deltas = defaultdict(Counter)  # column -> {user_id: delta}
+        for sender_id, recipient_id, old_status, new_status in changes:
+            for status, delta in ((old_status, -1), (new_status, 1)):
+                suffix = STATUS_COLUMNS.get(status)
+                if suffix is not None:
+                    deltas[f"received_{suffix}"][recipient_id] += delta
+                    deltas[f"sent_{suffix}"][sender_id] += delta
+        for column, by_user in deltas.items():
+            by_user = {user_id: delta for user_id, delta in by_user.items() if delta}
+            if by_user:
+                session.execute(
+                    update(self.summary)
+                    .where(self.summary.c.user_id.in_(by_user))
+                    .values({column: self.summary.c[column] + case(by_user, value=self.summary.c.user_id, else_=0)})
+                )
+
+    # --- Flush events ---
+
+    def _bump(self, connection, user_id, column, delta):
+        # A missing row is left alone; for_user computes it from scratch when read
+        connection.execute(
+            update(self.summary)
+            .where(self.summary.c.user_id == user_id)
+            .values({column: self.summary.c[column] + delta})
+        )
+
+    def _bump_trip(self, connection, trip_id, delta):
+        connection.execute(
+            update(self.trips)
+            .where(self.trips.c.id == trip_id)
+            .values(
+                interaction_count=self.trips.c.interaction_count + delta,
+                counted_at=datetime.utcnow(),
+                updated_at=self.trips.c.updated_at,
+            )
+        )
+
+    def _count_interaction(self, connection, interaction, status, delta):
+        suffix = STATUS_COLUMNS.get(status)
+        if suffix is not None:
+            self._bump(connection, interaction.recipient_id, f"received_{suffix}", delta)
+            self._bump(connection, interaction.sender_id, f"sent_{suffix}", delta)
+
+    def _user_created(self, mapper, connection, user):
+        connection.execute(insert(self.summary).values(user_id=user.id))
+
+    def _user_deleted(self, mapper, connection, user):
+        connection.execute(delete(self.summary).where(self.summary.c.user_id == user.id))
+
+    def _trip_created(self, mapper, connection, trip):
+        self._bump(connection, trip.user_id, "listing_count", 1)
+
+    def _trip_deleted(self, mapper, connection, trip):
+        self._bump(connection, trip.user_id, "listing_count", -1)
+
+    def _interaction_created(self, mapper, connection, interaction):
+        self._count_interaction(connection, interaction, interaction.status, 1)
+        self._bump_trip(connection, interaction.trip_id, 1)
+
+    def _interaction_updated(self, mapper, connection, interaction):
+        history = inspect(interaction).attrs.status.history
+        if not history.has_changes():
+            return
+        if not history.deleted:
+            # Set while expired: the old status is unknown, recount both users
+            self.rebuild(connection, [interaction.sender_id, interaction.recipient_id])
+            return
+        for old_status in history.deleted:
+            self._count_interaction(connection, interaction, old_status, -1)
+        self._count_interaction(connection, interaction, interaction.status, 1)
+
+    def _interaction_deleted(self, mapper, connection, interaction):
+        self._count_interaction(connection, interaction, interaction.status, -1)
+        self._bump_trip(connection, interaction.trip_id, -1)
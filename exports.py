@@ -0,0 +1,122 @@
+"""
+Streaming bulk export of listings and interactions as CSV or JSONL.
+
+Rows are selected as plain columns (no ORM objects, so the identity map
+never grows) with `yield_per`, which makes SQLAlchemy use a server-side
+cursor where the driver has one and fetch EXPORT_BATCH_SIZE rows at a time.
+Each batch is serialized into one text chunk, so memory stays flat no matter
+how many rows there are, and the same generator feeds both the CLI command
+and a chunked HTTP response.
+
+Exports are ordered by (created_at, id). Passing the last created_at of one
+run as `since` to the next exports only rows created after it.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from sqlalchemy import select
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+
+def _plain(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunk(rows, header=None):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header is not None:
+        writer.writerow(header)
+    writer.writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+def _jsonl_chunk(rows, keys):
+    return "".join(
+        json.dumps(dict(zip(keys, map(_plain, row)))) + "\n" for row in rows
+    )
+
+
+class BulkExporter:
+    def __init__(self, app=None, db=None, trip_model=None, swap_model=None, interaction_model=None):
+        self.datasets = {}  # name -> (select, created_at column)
+        self.batch_size = 1000
+        if app is not None:
+            self.init_app(app, db, trip_model, swap_model, interaction_model)
+
+    def init_app(self, app, db, trip_model, swap_model, interaction_model):
+        app.config.setdefault("EXPORT_BATCH_SIZE", 1000)
+        self.batch_size = app.config["EXPORT_BATCH_SIZE"]
+
+        Trip, SkillSwap, Interaction = trip_model, swap_model, interaction_model
+        self.datasets = {
+            # One row per trip, with its skill swap (if any) alongside
+            "listings": (
+                select(
+                    Trip.id.label("trip_id"),
+                    Trip.user_id,
+                    Trip.is_accommodation_offer,
+                    Trip.destination,
+                    Trip.start_date,
+                    Trip.end_date,
+                    Trip.description,
+                    SkillSwap.skill_offered,
+                    SkillSwap.skill_wanted,
+                    Trip.created_at,
+                    Trip.updated_at,
+                ).outerjoin(SkillSwap, SkillSwap.trip_id == Trip.id),
+                Trip,
+            ),
+            "interactions": (
+                select(
+                    Interaction.id.label("interaction_id"),
+                    Interaction.trip_id,
+                    Interaction.sender_id,
+                    Interaction.recipient_id,
+                    Interaction.status,
+                    Interaction.message,
+                    Interaction.created_at,
+                    Interaction.updated_at,
+                ),
+                Interaction,
+            ),
+        }
+        app.extensions["bulk_exporter"] = self
+
+    def statement(self, dataset, since=None):
+        """The rows of `dataset` created after `since`, oldest first (walks the (created_at, id) index)."""
+        statement, model = self.datasets[dataset]
+        if since is not None:
+            statement = statement.where(model.created_at > since)
+        return statement.order_by(model.created_at, model.id)
+
+    def stream(self, session, dataset, fmt, since=None, stats=None):
+        """
+        Yields the export as text chunks, one per batch. `stats`, if given, is
+        filled with the row count and the last created_at seen (the next `since`).
+        """
+        statement = self.statement(dataset, since).execution_options(yield_per=self.batch_size)
+        if stats is None:
+            stats = {}
+        stats.update(rows=0, last_created_at=since)
+
+        result = session.execute(statement)
+        keys = list(result.keys())
+        try:
+            if fmt == "csv":
+                yield _csv_chunk([], header=keys)
+            created_index = keys.index("created_at")
+            for rows in result.partitions():
+                yield _csv_chunk(rows) if fmt == "csv" else _jsonl_chunk(rows, keys)
+                stats["rows"] += len(rows)
+                stats["last_created_at"] = rows[-1][created_index]
+        finally:
+            result.close()
@@ -0,0 +1,50 @@
+"""
+Extension instances shared by the models, views and CLI commands.
+
+They are created unbound here and set up by `create_app()` in app.py.
+Modules import them from here, never from app.py, so importing a model or
+a view does not build an application.
+"""
+from flask_login import LoginManager
+from flask_sqlalchemy import SQLAlchemy
+
+from availability import ListingAvailability
+from counters import DashboardCounters
+from exports import BulkExporter
+from fragment_cache import FragmentCache
+from identity import IdentityCache
+from jobs import JobQueue
+from matching import SkillMatcher
+from notifications import Notifications
+from passwords import PasswordHasher
+from profiling import RequestProfiler
+from routing import RoutingSession
+from search import ListingSearch
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+login_manager = LoginManager()
+login_manager.login_view = 'main.login' # Set the view function for logging in
+# API clients get a 401 instead of a redirect to the login form
+login_manager.blueprint_login_views = {"api": None}
+# Password hashing runs in a bounded process pool (PASSWORD_HASH_* settings)
+password_hasher = PasswordHasher()
+request_profiler = RequestProfiler()
+# Short-TTL cache of logged-in users (IDENTITY_CACHE_* settings)
+identity_cache = IdentityCache()
+
+# Full-text index over listings (FTS5 on SQLite), kept in sync by DB triggers
+listing_search = ListingSearch()
+# Destination + date-overlap index of listings (R*Tree on SQLite), kept in sync by DB triggers
+listing_availability = ListingAvailability()
+# In-memory host/traveler matching index, updated by the listing routes
+skill_matcher = SkillMatcher()
+# Rendered marketplace cards (FRAGMENT_CACHE_BACKEND: lru, sqlite, redis or null)
+fragment_cache = FragmentCache()
+# Streaming CSV/JSONL export for analytics (EXPORT_BATCH_SIZE rows per chunk)
+bulk_exporter = BulkExporter()
+# Live request/status updates over SSE (NOTIFICATIONS_BACKEND: local or redis)
+notifications = Notifications()
+# Side effects run in `flask jobs-worker`, enqueued in the same commit (JOBS_* settings)
+jobs = JobQueue()
+# Listing/request counts for the dashboard, updated on every flush (see counters.py)
+dashboard_counters = DashboardCounters()
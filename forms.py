@@ -0,0 +1,72 @@
+"""
+Forms of the HTML pages (CSRF-protected through Flask-WTF).
+"""
+from flask_wtf import FlaskForm
+from sqlalchemy import or_
+from wtforms import StringField, PasswordField, SubmitField, TextAreaField, BooleanField, IntegerField, SelectMultipleField
+from wtforms.validators import DataRequired, Email, EqualTo, ValidationError, Length, AnyOf, Optional
+
+from extensions import db
+from models import User
+
+
+# --- AUTHENTICATION FORMS ---
+
+class RegistrationForm(FlaskForm):
+    username = StringField('Username', validators=[DataRequired(), Length(min=4, max=25)])
+    email = StringField('Email', validators=[DataRequired(), Email()])
+    password = PasswordField('Password', validators=[DataRequired(), Length(min=6)])
+    password2 = PasswordField(
+        'Repeat Password', validators=[DataRequired(), EqualTo('password')])
+    submit = SubmitField('Register')
+
+    def _taken(self):
+        """(usernames, emails) already registered, looked up once for both validators."""
+        if not hasattr(self, "_taken_values"):
+            rows = db.session.query(User.username, User.email).filter(
+                or_(User.username == self.username.data, User.email == self.email.data)
+            ).all()
+            self._taken_values = ({row.username for row in rows}, {row.email for row in rows})
+        return self._taken_values
+
+    def validate_username(self, username):
+        usernames, _ = self._taken()
+        if username.data in usernames:
+            raise ValidationError('Please use a different username.')
+
+    def validate_email(self, email):
+        _, emails = self._taken()
+        if email.data in emails:
+            raise ValidationError('Please use a different email address.')
+
+class LoginForm(FlaskForm):
+    username = StringField('Username', validators=[DataRequired()])
+    password = PasswordField('Password', validators=[DataRequired()])
+    submit = SubmitField('Log In')
+
+
+class ListingForm(FlaskForm):
+    """Form for creating or editing a new Trip listing and associated SkillSwap."""
+    destination = StringField('Destination', validators=[DataRequired()])
+    start_date = StringField('Start Date', validators=[DataRequired()]) 
+    end_date = StringField('End Date', validators=[DataRequired()])
+    # NEW: Added description field
+    description = TextAreaField('Description', validators=[Length(max=500)], render_kw={"rows": 4})
+    is_accommodation_offer = BooleanField('I am offering accommodation/hosting')
+    
+    offered_skill = StringField('Skill Offered', validators=[DataRequired()])
+    desired_skill = StringField('Skill Wanted', validators=[DataRequired()])
+    submit = SubmitField('Update Listing')
+
+
+class InteractionForm(FlaskForm):
+    """Simple form for a user to initiate contact about a listing."""
+    message = StringField('Your Message', validators=[DataRequired()])
+    submit = SubmitField('Send Request')
+
+
+class BulkStatusForm(FlaskForm):
+    """Accept or reject many requests at once: the chosen ids, or every pending request on a trip."""
+    status = StringField('Status', validators=[DataRequired(), AnyOf(["Accepted", "Rejected"])])
+    interaction_ids = SelectMultipleField('Requests', coerce=int, validate_choice=False)
+    trip_id = IntegerField('Trip', validators=[Optional()])
@@ -0,0 +1,239 @@
+"""
+Cache for rendered HTML fragments (marketplace listing cards).
+
+Only the shared, user-independent part of a card is cached; anything that
+depends on who is looking ("Your Listing" vs. "Send Swap Request") is
+rendered per request around it. Each entry remembers the version (the
+row's updated_at) it was rendered from and is only served for that version;
+the listing routes also drop entries as soon as a card's content changes.
+
+Backends:
+  * "lru"    - in-process LRU bounded by entry count and total bytes.
+               Invalidations are only seen by the worker that made them.
+  * "sqlite" - a small SQLite file shared by every worker on the host.
+  * "redis"  - shared across hosts; needs the optional `redis` package.
+  * "null"   - disables caching.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class NullCacheBackend:
+    def get_many(self, keys):
+        return {}
+
+    def set_many(self, mapping):
+        pass
+
+    def delete_many(self, keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+class LRUCacheBackend:
+    """Thread-safe in-process LRU with entry-count and byte-size limits."""
+
+    def __init__(self, max_entries=10000, max_bytes=32 * 1024 * 1024, ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[0] is not None and entry[0] < now:
+                    self._pop(key)
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = entry[1]
+        return found
+
+    def set_many(self, mapping):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            for key, value in mapping.items():
+                if len(value) > self.max_bytes:
+                    continue
+                self._pop(key)
+                self._entries[key] = (expires_at, value)
+                self._bytes += len(value)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._pop(next(iter(self._entries)))
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+
+class SQLiteCacheBackend:
+    """
+    Cache stored in a local SQLite file, so every gunicorn worker on the host
+    shares entries and sees the same invalidations.
+    """
+
+    def __init__(self, path, ttl=None):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fragment (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        placeholders = ", ".join("?" * len(keys))
+        rows = self._connect().execute(
+            f"SELECT key, value FROM fragment WHERE key IN ({placeholders}) "
+            f"AND (expires_at IS NULL OR expires_at >= ?)",
+            (*keys, time.time()),
+        )
+        return dict(rows.fetchall())
+
+    def set_many(self, mapping):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO fragment (key, value, expires_at) VALUES (?, ?, ?)",
+                [(key, value, expires_at) for key, value in mapping.items()],
+            )
+
+    def delete_many(self, keys):
+        conn = self._connect()
+        with conn:
+            conn.executemany("DELETE FROM fragment WHERE key = ?", [(key,) for key in keys])
+
+    def clear(self):
+        self._connect().execute("DELETE FROM fragment")
+
+
+class RedisCacheBackend:
+    """Cache shared across hosts through Redis (optional `redis` dependency)."""
+
+    def __init__(self, url, ttl=None, prefix="globeswap:"):
+        import redis  # Optional dependency, only needed for this backend
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.client.mget([self.prefix + key for key in keys])
+        return {key: value.decode() for key, value in zip(keys, values) if value is not None}
+
+    def set_many(self, mapping):
+        pipe = self.client.pipeline()
+        for key, value in mapping.items():
+            pipe.set(self.prefix + key, value, ex=self.ttl)
+        pipe.execute()
+
+    def delete_many(self, keys):
+        keys = [self.prefix + key for key in keys]
+        if keys:
+            self.client.delete(*keys)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class FragmentCache:
+    # Bump when the card template changes so stale HTML is never served
+    VERSION = 2
+
+    def __init__(self, app=None):
+        self.backend = NullCacheBackend()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("FRAGMENT_CACHE_BACKEND", "lru")
+        app.config.setdefault("FRAGMENT_CACHE_MAX_ENTRIES", 10000)
+        app.config.setdefault("FRAGMENT_CACHE_MAX_BYTES", 32 * 1024 * 1024)
+        app.config.setdefault("FRAGMENT_CACHE_TTL", 3600)
+        app.config.setdefault("FRAGMENT_CACHE_PATH", f"{app.instance_path}/fragments.db")
+        app.config.setdefault("FRAGMENT_CACHE_URL", "redis://localhost:6379/0")
+
+        kind = app.config["FRAGMENT_CACHE_BACKEND"]
+        ttl = app.config["FRAGMENT_CACHE_TTL"]
+        if kind == "lru":
+            self.backend = LRUCacheBackend(
+                app.config["FRAGMENT_CACHE_MAX_ENTRIES"], app.config["FRAGMENT_CACHE_MAX_BYTES"], ttl
+            )
+        elif kind == "sqlite":
+            os.makedirs(app.instance_path, exist_ok=True)
+            self.backend = SQLiteCacheBackend(app.config["FRAGMENT_CACHE_PATH"], ttl)
+        elif kind == "redis":
+            self.backend = RedisCacheBackend(app.config["FRAGMENT_CACHE_URL"], ttl)
+        elif kind == "null":
+            self.backend = NullCacheBackend()
+        else:
+            raise ValueError(f"Unknown FRAGMENT_CACHE_BACKEND: {kind!r}")
+        app.extensions["fragment_cache"] = self
+
+    def _key(self, name, ident):
+        return f"{name}:v{self.VERSION}:{ident}"
+
+    def get_many(self, name, versions):
+        """
+        `versions` maps ident -> current version (e.g. the row's updated_at).
+        Returns {ident: html} for fragments cached at exactly that version, so
+        a worker whose local entry missed an invalidation still never serves it.
+        """
+        keys = {self._key(name, ident): ident for ident in versions}
+        found = {}
+        for key, value in self.backend.get_many(keys).items():
+            ident = keys[key]
+            stored_version, _, html = value.partition("\n")
+            if stored_version == str(versions[ident]):
+                found[ident] = html
+        return found
+
+    def set_many(self, name, fragments):
+        """`fragments` maps ident -> (version, html)."""
+        self.backend.set_many({
+            self._key(name, ident): f"{version}\n{html}" for ident, (version, html) in fragments.items()
+        })
+
+    def invalidate(self, name, *idents):
+        self.backend.delete_many([self._key(name, ident) for ident in idents])
@@ -0,0 +1,79 @@
+"""
+Short-lived cache of the logged-in user for Flask-Login.
+
+Flask-Login reloads the user on every authenticated request. Pages only
+need the id and username, so load_user returns a small immutable
+UserSnapshot kept in a per-process TTL cache. A warm authenticated page view
+then costs no user query at all. Entries are dropped whenever the User row
+changes (see invalidate), but only in the process that made the change.
+Other workers catch up when their entry expires after IDENTITY_CACHE_TTL
+seconds (5 by default), or on the user's next write: load_user reloads the
+row for anything but GET/HEAD/OPTIONS (see `get_or_load(fresh=True)`).
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from flask_login import UserMixin
+
+
+@dataclass(frozen=True, eq=False)
+class UserSnapshot(UserMixin):
+    """Read-only stand-in for User as current_user (no password hash, no relationships)."""
+    id: int
+    username: str
+    email: str
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(id=user.id, username=user.username, email=user.email)
+
+
+class IdentityCache:
+    def __init__(self, app=None):
+        self._entries = OrderedDict()  # user_id -> (expires_at, snapshot)
+        self._lock = threading.Lock()
+        self.ttl = 5
+        self.max_entries = 10000
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("IDENTITY_CACHE_TTL", 5)
+        app.config.setdefault("IDENTITY_CACHE_MAX_ENTRIES", 10000)
+        self.ttl = app.config["IDENTITY_CACHE_TTL"]
+        self.max_entries = app.config["IDENTITY_CACHE_MAX_ENTRIES"]
+        app.extensions["identity_cache"] = self
+
+    def get_or_load(self, user_id, loader, fresh=False):
+        """
+        Returns a cached snapshot, or builds one from `loader(user_id)` (None if
+        no such user). `fresh` skips the cached entry and replaces it.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if not fresh and entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+
+        user = loader(user_id)
+        if user is None:
+            self.invalidate(user_id)
+            return None
+        snapshot = UserSnapshot.from_user(user)
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, snapshot)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
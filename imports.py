@@ -0,0 +1,272 @@
+"""
+Bulk import of listings (Trip + SkillSwap pairs) from CSV or JSONL.
+
+Records are read as a stream and validated with the same rules as the
+/list form. Valid records are written with Core executemany inserts, one
+transaction per batch: missing users first, then the trips (ids come back
+through RETURNING), then their skill swaps.
+
+After each committed batch a small JSON checkpoint records how many input
+records are done. Re-running the same import resumes after the last
+committed batch. Rejected records go to a CSV error report with their record
+number, the reason and the raw record.
+
+Input columns (the `listings` export is valid input):
+
+  username or user_id, destination, start_date, end_date (YYYY-MM-DD),
+  skill_offered, skill_wanted, and optionally description,
+  is_accommodation_offer and email (used to create unknown users, who get
+  no password and cannot log in until one is set).
+"""
+import csv
+import json
+import os
+from contextlib import nullcontext
+from datetime import datetime
+from functools import lru_cache
+
+from sqlalchemy import insert, select
+
+TRUE_VALUES = {"1", "true", "t", "yes", "y", "on"}
+FALSE_VALUES = {"0", "false", "f", "no", "n", "off", ""}
+DESCRIPTION_MAX_LENGTH = 500  # ListingForm.description
+
+
+class InvalidRecord(ValueError):
+    """A record that can't be imported; the message goes to the error report."""
+
+
+def read_records(stream, fmt):
+    """Yields dicts from a CSV (with header) or JSONL text stream."""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield {"_raw": line.rstrip("\n")}
+
+
+def _text(record, key, required=True):
+    value = record.get(key)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise InvalidRecord(f"{key} is required")
+    return value
+
+
+def _flag(record, key):
+    value = record.get(key)
+    if isinstance(value, bool):
+        return value
+    value = "" if value is None else str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise InvalidRecord(f"{key} must be true or false")
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(value):
+    # Listings cluster on a few thousand dates; strptime is the slowest part of validation
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def _date(record, key):
+    try:
+        return _parse_date(_text(record, key))
+    except ValueError:
+        raise InvalidRecord(f"{key} must be a date in YYYY-MM-DD format")
+
+
+def validate(record):
+    """Returns the cleaned listing for one record, or raises InvalidRecord."""
+    if "_raw" in record:
+        raise InvalidRecord("not valid JSON")
+    start_date = _date(record, "start_date")
+    end_date = _date(record, "end_date")
+    # Same rule as create_listing
+    if end_date <= start_date:
+        raise InvalidRecord("end_date must be after start_date")
+    description = _text(record, "description", required=False)
+    if len(description) > DESCRIPTION_MAX_LENGTH:
+        raise InvalidRecord(f"description is longer than {DESCRIPTION_MAX_LENGTH} characters")
+
+    user_id = _text(record, "user_id", required=False)
+    username = _text(record, "username", required=False)
+    if not (user_id or username):
+        raise InvalidRecord("username or user_id is required")
+    if user_id and not user_id.isdigit():
+        raise InvalidRecord("user_id must be a number")
+
+    return {
+        "user_id": int(user_id) if user_id else None,
+        "username": username,
+        "email": _text(record, "email", required=False),
+        "destination": _text(record, "destination"),
+        "start_date": start_date,
+        "end_date": end_date,
+        "description": description or None,
+        "is_accommodation_offer": _flag(record, "is_accommodation_offer"),
+        "skill_offered": _text(record, "skill_offered"),
+        "skill_wanted": _text(record, "skill_wanted"),
+    }
+
+
+class ListingImporter:
+    def __init__(self, engine, user_table, trip_table, swap_table, search=None, batch_size=5000, create_users=False):
+        self.engine = engine
+        self.users, self.trips, self.swaps = user_table, trip_table, swap_table
+        self.search = search  # ListingSearch, to index each batch in one go
+        self.batch_size = batch_size
+        self.create_users = create_users
+        self._user_ids = {}    # username -> id
+        self._known_ids = set()
+        self.imported_this_run = 0
+
+    def run(self, records, checkpoint_path, report_path, progress=None):
+        """
+        Imports `records`, resuming from `checkpoint_path` if it exists.
+        Returns the final checkpoint: records done, listings imported, errors.
+        """
+        state = {"done": 0, "imported": 0, "errors": 0}
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                state.update(json.load(f))
+
+        with open(report_path, "a", newline="") as report_file:
+            report = csv.writer(report_file)
+            if report_file.tell() == 0:
+                report.writerow(["record", "error", "data"])
+
+            batch = []
+            number = state["done"]
+            for number, record in enumerate(records, start=1):
+                if number <= state["done"]:
+                    continue
+                try:
+                    batch.append((number, record, validate(record)))
+                except InvalidRecord as e:
+                    self._reject(report, state, number, record, str(e))
+                if len(batch) >= self.batch_size:
+                    self._commit_batch(batch, report_file, report, state, number, checkpoint_path)
+                    batch = []
+                    if progress:
+                        progress(state)
+            self._commit_batch(batch, report_file, report, state, max(number, state["done"]), checkpoint_path)
+        return state
+
+    def _reject(self, report, state, number, record, error):
+        report.writerow([number, error, json.dumps(record, default=str)])
+        state["errors"] += 1
+
+    def _commit_batch(self, batch, report_file, report, state, done, checkpoint_path):
+        with self.engine.begin() as conn:
+            rows = self._resolve_users(conn, batch, report, state)
+            if rows:
+                with self.search.bulk_insert(conn) if self.search else nullcontext():
+                    now = datetime.utcnow()
+                    trip_ids = self._insert_trips(conn, [
+                        {
+                            "destination": row["destination"],
+                            "start_date": row["start_date"],
+                            "end_date": row["end_date"],
+                            "description": row["description"],
+                            "is_accommodation_offer": row["is_accommodation_offer"],
+                            "user_id": row["user_id"],
+                            "created_at": now,
+                            "updated_at": now,
+                        }
+                        for row in rows
+                    ])
+                    conn.execute(
+                        insert(self.swaps),
+                        [
+                            {
+                                "skill_offered": row["skill_offered"],
+                                "skill_wanted": row["skill_wanted"],
+                                "user_id": row["user_id"],
+                                "trip_id": trip_id,
+                                "created_at": now,
+                                "updated_at": now,
+                            }
+                            for row, trip_id in zip(rows, trip_ids)
+                        ],
+                    )
+        state["done"] = done
+        state["imported"] += len(rows)
+        self.imported_this_run += len(rows)
+        report_file.flush()
+        # Written right after the commit: a crash in between re-imports this one batch on resume
+        tmp_path = checkpoint_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, checkpoint_path)
+
+    def _insert_trips(self, conn, params):
+        """Inserts the trips and returns their ids in parameter order."""
+        if conn.dialect.name != "sqlite":
+            # Batched INSERT ... RETURNING with a sentinel on PostgreSQL and friends
+            return conn.execute(
+                insert(self.trips).returning(self.trips.c.id, sort_by_parameter_order=True), params
+            ).scalars().all()
+        # SQLite has no insert sentinel, so an ordered RETURNING falls back to one
+        # statement per row. A plain executemany is many times faster, and its ids are
+        # consecutive: the transaction holds the database write lock and every new
+        # rowid is max(rowid) + 1.
+        conn.execute(insert(self.trips), params)
+        last_id = conn.exec_driver_sql("SELECT last_insert_rowid()").scalar()
+        return list(range(last_id - len(params) + 1, last_id + 1))
+
+    def _resolve_users(self, conn, batch, report, state):
+        """Fills in user ids (creating users if allowed); rejects rows whose user is unknown."""
+        wanted_names = {row["username"] for _, _, row in batch if row["user_id"] is None} - self._user_ids.keys()
+        wanted_ids = {row["user_id"] for _, _, row in batch if row["user_id"] is not None} - self._known_ids
+        if wanted_names:
+            self._user_ids.update(conn.execute(
+                select(self.users.c.username, self.users.c.id).where(self.users.c.username.in_(wanted_names))
+            ).all())
+        if wanted_ids:
+            self._known_ids.update(conn.execute(
+                select(self.users.c.id).where(self.users.c.id.in_(wanted_ids))
+            ).scalars())
+
+        if self.create_users:
+            new_users = {}
+            for _, _, row in batch:
+                name = row["username"]
+                if row["user_id"] is None and name not in self._user_ids and row["email"]:
+                    new_users.setdefault(name, row["email"])
+            # An email that is already taken would fail the whole batch on the unique constraint
+            taken = set(conn.execute(
+                select(self.users.c.email).where(self.users.c.email.in_(set(new_users.values())))
+            ).scalars())
+            claimed = {}
+            for name, email in new_users.items():
+                if email not in taken:
+                    claimed.setdefault(email, name)
+            new_users = {name: email for email, name in claimed.items()}
+            if new_users:
+                conn.execute(
+                    insert(self.users),
+                    [{"username": name, "email": email, "created_at": datetime.utcnow()} for name, email in new_users.items()],
+                )
+                self._user_ids.update(conn.execute(
+                    select(self.users.c.username, self.users.c.id).where(self.users.c.username.in_(new_users))
+                ).all())
+
+        rows = []
+        for number, record, row in batch:
+            if row["user_id"] is None:
+                row["user_id"] = self._user_ids.get(row["username"])
+                if row["user_id"] is None:
+                    self._reject(report, state, number, record, f"unknown user {row['username']}")
+                    continue
+            elif row["user_id"] not in self._known_ids:
+                self._reject(report, state, number, record, f"unknown user id {row['user_id']}")
+                continue
+            rows.append(row)
+        return rows
@@ -0,0 +1,72 @@
+"""
+In-memory interval index for date-range overlap queries.
+
+Intervals are kept in a list sorted by start, together with the longest
+span currently in the index. Everything overlapping [start, end] must begin inside
+[start - max_span, end], so a query is two bisections plus a walk over that
+window instead of a scan of every interval. Adds and removes keep the list
+sorted in place, so the index can be updated incrementally as listings change.
+"""
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+
+
+class IntervalIndex:
+    def __init__(self):
+        self._starts = []      # sorted [(start, key)]
+        self._intervals = {}   # key -> (start, end)
+        self._spans = Counter()  # span -> number of intervals with it
+        self._max_span = 0
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def __contains__(self, key):
+        return key in self._intervals
+
+    def add(self, key, start, end):
+        """Adds or replaces the closed interval [start, end] for `key` (ordinals)."""
+        if key in self._intervals:
+            self.remove(key)
+        self._intervals[key] = (start, end)
+        insort(self._starts, (start, key))
+        self._spans[end - start] += 1
+        self._max_span = max(self._max_span, end - start)
+
+    def remove(self, key):
+        interval = self._intervals.pop(key, None)
+        if interval is None:
+            return
+        position = bisect_left(self._starts, (interval[0], key))
+        del self._starts[position]
+        span = interval[1] - interval[0]
+        self._spans[span] -= 1
+        if not self._spans[span]:
+            del self._spans[span]
+            if span == self._max_span:
+                # The longest interval left: one long listing must not widen every query forever
+                self._max_span = max(self._spans, default=0)
+
+    def get(self, key):
+        return self._intervals.get(key)
+
+    def overlaps(self, key, start, end):
+        interval = self._intervals.get(key)
+        return interval is not None and interval[0] <= end and interval[1] >= start
+
+    def _window(self, start, end):
+        low = bisect_left(self._starts, (start - self._max_span,))
+        high = bisect_right(self._starts, (end, float("inf")))
+        return low, high
+
+    def estimate(self, start, end):
+        """Upper bound on the number of intervals overlapping [start, end], in O(log n)."""
+        low, high = self._window(start, end)
+        return high - low
+
+    def overlapping(self, start, end):
+        """Yields the keys whose interval overlaps [start, end]."""
+        low, high = self._window(start, end)
+        for interval_start, key in self._starts[low:high]:
+            if self._intervals[key][1] >= start:
+                yield key
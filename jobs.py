@@ -0,0 +1,185 @@
+"""
+Database-backed background jobs with a transactional outbox.
+
+Views call `jobs.enqueue(...)` before their commit. The job row is inserted
+in the same transaction as the domain rows, so a job exists if and only if
+the change it describes was committed (the `job` table is the outbox). The
+side effects then run in `flask jobs-worker`, and a request costs one extra
+INSERT however many of them are attached.
+
+  * Idempotency: jobs with an idempotency key are inserted with ON CONFLICT
+    DO NOTHING, so enqueueing the same key twice leaves one job.
+  * Claiming: a worker flips a batch of due jobs to "running" with one
+    UPDATE ... RETURNING (FOR UPDATE SKIP LOCKED on PostgreSQL). On SQLite
+    the write lock serializes competing workers. A job whose worker died
+    becomes claimable again once its lease (JOBS_LEASE_SECONDS) runs out.
+  * Retries: a failed job is retried with exponential backoff
+    (JOBS_BACKOFF_BASE * 2^attempt, capped at JOBS_BACKOFF_MAX). After
+    `max_attempts` it is left as "dead" with its last error.
+
+Delivery is at least once: a handler may run again after a crash or an
+expired lease, so handlers must be idempotent (the key is passed along).
+"""
+import json
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+log = logging.getLogger("globeswap.jobs")
+
+QUEUED, RUNNING, DONE, DEAD = "queued", "running", "done", "dead"
+
+
+class JobQueue:
+    def __init__(self, app=None, db=None, job_model=None):
+        self.tasks = {}
+        if app is not None:
+            self.init_app(app, db, job_model)
+
+    def init_app(self, app, db, job_model):
+        app.config.setdefault("JOBS_MAX_ATTEMPTS", 5)
+        app.config.setdefault("JOBS_BACKOFF_BASE", 5)        # seconds
+        app.config.setdefault("JOBS_BACKOFF_MAX", 3600)
+        app.config.setdefault("JOBS_LEASE_SECONDS", 300)
+        app.config.setdefault("JOBS_KEEP_DONE_DAYS", 7)
+        self.app = app
+        self.db = db
+        self.Job = job_model
+        self.table = job_model.__table__
+        app.extensions["jobs"] = self
+
+    def task(self, name):
+        """Registers `func(payload, key)` as the handler of jobs called `name`."""
+        def decorator(func):
+            self.tasks[name] = func
+            return func
+        return decorator
+
+    # --- Producer side ---
+
+    def enqueue(self, name, payload=None, key=None, delay=0, session=None):
+        """
+        Adds a job to the current transaction of `session` (db.session by
+        default). Nothing runs until that transaction commits.
+        """
+        if name not in self.tasks:
+            raise KeyError(f"unknown job {name!r}")
+        session = session or self.db.session
+        now = datetime.utcnow()
+        values = {
+            "name": name,
+            "payload": json.dumps(payload or {}),
+            "idempotency_key": key,
+            "status": QUEUED,
+            "attempts": 0,
+            "max_attempts": self.app.config["JOBS_MAX_ATTEMPTS"],
+            "run_at": now + timedelta(seconds=delay),
+            "created_at": now,
+        }
+        dialect = session.get_bind(clause=insert(self.table)).dialect.name
+        if key is not None and dialect in ("sqlite", "postgresql"):
+            insert_ = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            statement = insert_(self.table).values(values).on_conflict_do_nothing(index_elements=["idempotency_key"])
+        else:
+            if key is not None and session.execute(
+                select(self.table.c.id).where(self.table.c.idempotency_key == key)
+            ).first():
+                return
+            statement = insert(self.table).values(values)
+        session.execute(statement)
+
+    # --- Worker side ---
+
+    def claim(self, worker_id, limit):
+        """Marks up to `limit` due jobs as running for this worker and returns them."""
+        Job, now = self.table.c, datetime.utcnow()
+        lease_expired = now - timedelta(seconds=self.app.config["JOBS_LEASE_SECONDS"])
+        claimable = or_(
+            and_(Job.status == QUEUED, Job.run_at <= now),
+            and_(Job.status == RUNNING, Job.locked_at < lease_expired),
+        )
+        due = (
+            select(Job.id).where(claimable).order_by(Job.run_at, Job.id).limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        with self.db.engine.begin() as conn:
+            ids = conn.execute(due).scalars().all()
+            if not ids:
+                return []
+            # Re-check the state: on SQLite another worker may have claimed them meanwhile
+            return conn.execute(
+                update(self.table)
+                .where(Job.id.in_(ids), claimable)
+                .values(status=RUNNING, locked_by=worker_id, locked_at=now, attempts=Job.attempts + 1)
+                .returning(Job.id, Job.name, Job.payload, Job.idempotency_key, Job.attempts, Job.max_attempts)
+            ).all()
+
+    def run(self, job):
+        """Runs one claimed job and records the outcome."""
+        Job = self.table.c
+        handler = self.tasks.get(job.name)
+        try:
+            if handler is None:
+                raise KeyError(f"no handler registered for job {job.name!r}")
+            handler(json.loads(job.payload), job.idempotency_key)
+            self.db.session.commit()
+        except Exception as e:
+            self.db.session.rollback()
+            error = "".join(traceback.format_exception_only(e)).strip()
+            if job.attempts >= job.max_attempts:
+                values = {"status": DEAD, "finished_at": datetime.utcnow()}
+                log.error("job %s (%s) failed for good after %s attempts: %s", job.id, job.name, job.attempts, error)
+            else:
+                values = {"status": QUEUED, "run_at": datetime.utcnow() + timedelta(seconds=self.backoff(job.attempts))}
+                log.warning("job %s (%s) failed, attempt %s: %s", job.id, job.name, job.attempts, error)
+            values.update(last_error=error[:2000], locked_by=None, locked_at=None)
+            outcome = False
+        else:
+            values = {"status": DONE, "finished_at": datetime.utcnow(), "locked_by": None, "locked_at": None}
+            outcome = True
+        finally:
+            self.db.session.remove()
+        with self.db.engine.begin() as conn:
+            conn.execute(update(self.table).where(Job.id == job.id).values(values))
+        return outcome
+
+    def backoff(self, attempts):
+        """Seconds before retry number `attempts` + 1, with jitter so failed batches spread out."""
+        base = self.app.config["JOBS_BACKOFF_BASE"] * 2 ** (attempts - 1)
+        return min(base, self.app.config["JOBS_BACKOFF_MAX"]) * random.uniform(0.8, 1.2)
+
+    def purge(self):
+        """Deletes finished jobs older than JOBS_KEEP_DONE_DAYS."""
+        cutoff = datetime.utcnow() - timedelta(days=self.app.config["JOBS_KEEP_DONE_DAYS"])
+        with self.db.engine.begin() as conn:
+            return conn.execute(
+                delete(self.table).where(self.table.c.status == DONE, self.table.c.finished_at < cutoff)
+            ).rowcount
+
+    def work(self, batch_size=10, idle_sleep=1.0, once=False, should_stop=lambda: False):
+        """The worker loop behind `flask jobs-worker`. Returns (done, failed) counts."""
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        done = failed = 0
+        last_purge = 0.0
+        while not should_stop():
+            jobs = self.claim(worker_id, batch_size)
+            for job in jobs:
+                if self.run(job):
+                    done += 1
+                else:
+                    failed += 1
+            if once and not jobs:
+                break
+            if not jobs:
+                if time.monotonic() - last_purge > 3600:
+                    self.purge()
+                    last_purge = time.monotonic()
+                time.sleep(idle_sleep)
+        return done, failed
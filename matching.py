@@ -0,0 +1,241 @@
+"""
+Skill-swap matching engine.
+
+A host listing (accommodation offer) and a traveler listing match when they
+are for the same destination, their dates overlap and their skills are
+complementary: the traveler offers what the host wants and the host offers
+what the traveler wants.
+
+The engine keeps, per process:
+  * an inverted index (side, destination, skill) -> trip ids, separately for
+    skills offered and skills wanted, and
+  * an IntervalIndex of date ranges per (side, destination).
+
+Finding the matches of one listing reads two posting lists and the date
+window instead of every listing. The index is built lazily from the DB and
+updated in place by the listing routes. Other workers pick up those changes
+on their next periodic rebuild (MATCHING_REBUILD_INTERVAL seconds), which
+runs in a background thread while requests keep reading the previous index.
+"""
+import heapq
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from intervals import IntervalIndex
+
+IndexedListing = namedtuple(
+    "IndexedListing",
+    "trip_id user_id destination is_offer skill_offered skill_wanted start end",
+)
+
+Match = namedtuple("Match", "trip_id overlap_days")
+
+log = logging.getLogger("globeswap.matching")
+
+
+def normalize(value):
+    """Case- and whitespace-insensitive key for skills and destinations."""
+    return " ".join((value or "").lower().split())
+
+
+class _Index:
+    """The posting lists and date indexes of one build; a rebuild swaps in a whole new one."""
+
+    def __init__(self):
+        self.listings = {}   # trip_id -> IndexedListing
+        self.offered = {}    # (is_offer, destination, skill) -> set(trip_id)
+        self.wanted = {}
+        self.dates = {}      # (is_offer, destination) -> IntervalIndex
+
+    def add(self, listing):
+        side = listing.is_offer
+        self.listings[listing.trip_id] = listing
+        self.offered.setdefault((side, listing.destination, listing.skill_offered), set()).add(listing.trip_id)
+        self.wanted.setdefault((side, listing.destination, listing.skill_wanted), set()).add(listing.trip_id)
+        self.dates.setdefault((side, listing.destination), IntervalIndex()).add(
+            listing.trip_id, listing.start, listing.end
+        )
+
+    def discard(self, trip_id):
+        listing = self.listings.pop(trip_id, None)
+        if listing is None:
+            return
+        side = listing.is_offer
+        for index, skill in ((self.offered, listing.skill_offered), (self.wanted, listing.skill_wanted)):
+            key = (side, listing.destination, skill)
+            postings = index.get(key)
+            if postings is not None:
+                postings.discard(trip_id)
+                if not postings:
+                    del index[key]
+        dates = self.dates.get((side, listing.destination))
+        if dates is not None:
+            dates.remove(trip_id)
+            if not len(dates):
+                del self.dates[(side, listing.destination)]
+
+    def replace(self, trip_id, listing):
+        self.discard(trip_id)
+        if listing is not None:
+            self.add(listing)
+
+
+class SkillMatcher:
+    def __init__(self, app=None, db=None, trip_model=None, swap_model=None):
+        self._lock = threading.RLock()          # guards _index, _pending and _rebuilding
+        self._rebuild_lock = threading.Lock()   # one rebuild at a time
+        self._index = _Index()
+        self._loaded_at = None
+        self._rebuilding = False
+        # Changes made while a rebuild reads the table, replayed onto the new index
+        self._pending = None
+        if app is not None:
+            self.init_app(app, db, trip_model, swap_model)
+
+    def init_app(self, app, db, trip_model, swap_model):
+        app.config.setdefault("MATCHING_TOP_N", 5)
+        app.config.setdefault("MATCHING_REBUILD_INTERVAL", 300)
+        self.app = app
+        self.db = db
+        self.Trip = trip_model
+        self.SkillSwap = swap_model
+        app.extensions["skill_matcher"] = self
+
+    # --- Index maintenance ---
+
+    def rebuild(self):
+        """
+        Reloads every listing that has a SkillSwap from the database into a new
+        index, then swaps it in. Queries keep using the old index meanwhile.
+        """
+        with self._rebuild_lock:
+            self._build()
+
+    def _build(self):
+        # Called with _rebuild_lock held
+        with self._lock:
+            self._pending = []
+        try:
+            Trip, SkillSwap = self.Trip, self.SkillSwap
+            rows = self.db.session.query(
+                Trip.id, Trip.user_id, Trip.destination, Trip.is_accommodation_offer,
+                SkillSwap.skill_offered, SkillSwap.skill_wanted, Trip.start_date, Trip.end_date
+            ).join(SkillSwap, SkillSwap.trip_id == Trip.id).yield_per(1000)
+            index = _Index()
+            for row in rows:
+                index.add(self._make_listing(*row))
+            with self._lock:
+                # Changes made while the query ran; replaying one the query already saw is harmless
+                for trip_id, listing in self._pending:
+                    index.replace(trip_id, listing)
+                self._index = index
+                self._loaded_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None:
+            # Nothing to serve yet: the first request builds the index, concurrent ones wait for it
+            with self._rebuild_lock:
+                if self._loaded_at is None:
+                    self._build()
+            return
+        if time.monotonic() - self._loaded_at <= self.app.config["MATCHING_REBUILD_INTERVAL"]:
+            return
+        # Expired: one thread refreshes it in the background, requests keep serving the current index
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_in_background, name="skill-matcher-rebuild", daemon=True).start()
+
+    def _rebuild_in_background(self):
+        try:
+            with self.app.app_context():
+                self.rebuild()
+        except Exception:
+            log.exception("Rebuilding the skill matching index failed")
+            # Retry after another interval rather than on the next request
+            self._loaded_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    @staticmethod
+    def _make_listing(trip_id, user_id, destination, is_offer, skill_offered, skill_wanted, start, end):
+        return IndexedListing(
+            trip_id, user_id, normalize(destination), bool(is_offer),
+            normalize(skill_offered), normalize(skill_wanted),
+            start.toordinal(), end.toordinal()
+        )
+
+    def _apply(self, trip_id, listing):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((trip_id, listing))
+            if self._loaded_at is not None:
+                self._index.replace(trip_id, listing)
+
+    def index_listing(self, trip, swap):
+        """Adds or refreshes one listing after it was created or edited."""
+        listing = None
+        if swap is not None:
+            listing = self._make_listing(
+                trip.id, trip.user_id, trip.destination, trip.is_accommodation_offer,
+                swap.skill_offered, swap.skill_wanted, trip.start_date, trip.end_date
+            )
+        self._apply(trip.id, listing)
+
+    def remove_listing(self, trip_id):
+        """Drops a deleted listing from the index."""
+        self._apply(trip_id, None)
+
+    # --- Queries ---
+
+    def matches_for(self, trip_id, limit=None):
+        """
+        Returns up to `limit` Match tuples for the listing, best first:
+        the longest date overlap wins, then the most recent listing.
+        """
+        limit = limit or self.app.config["MATCHING_TOP_N"]
+        self._ensure_loaded()
+        with self._lock:
+            index = self._index
+            listing = index.listings.get(trip_id)
+            if listing is None:
+                return []
+
+            other_side = not listing.is_offer
+            # They must offer what this listing wants, and want what it offers
+            they_offer = index.offered.get((other_side, listing.destination, listing.skill_wanted), set())
+            they_want = index.wanted.get((other_side, listing.destination, listing.skill_offered), set())
+            dates = index.dates.get((other_side, listing.destination))
+            if not they_offer or not they_want or dates is None:
+                return []
+
+            smaller, larger = sorted((they_offer, they_want), key=len)
+            if dates.estimate(listing.start, listing.end) < len(smaller):
+                # Few listings in the date window: walk those, check skills
+                candidates = (
+                    tid for tid in dates.overlapping(listing.start, listing.end)
+                    if tid in they_offer and tid in they_want
+                )
+            else:
+                # Rare skill pair: walk the smaller posting list, check dates
+                candidates = (
+                    tid for tid in smaller
+                    if tid in larger and dates.overlaps(tid, listing.start, listing.end)
+                )
+
+            scored = []
+            for candidate_id in candidates:
+                candidate = index.listings[candidate_id]
+                if candidate.user_id == listing.user_id:
+                    continue
+                overlap = min(listing.end, candidate.end) - max(listing.start, candidate.start) + 1
+                scored.append(Match(candidate_id, overlap))
+
+        return heapq.nlargest(limit, scored, key=lambda match: (match.overlap_days, match.trip_id))
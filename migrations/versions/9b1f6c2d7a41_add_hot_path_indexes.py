@@ -0,0 +1,44 @@
+"""add indexes for marketplace and dashboard queries
+
+Revision ID: 9b1f6c2d7a41
+Revises: 4e827438e604
+Create Date: 2026-10-16 10:12:44.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b1f6c2d7a41'
+down_revision = '4e827438e604'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('trip', schema=None) as batch_op:
+        batch_op.create_index('ix_trip_offer_created', ['is_accommodation_offer', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_trip_user_created', ['user_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('skillswap', schema=None) as batch_op:
+        batch_op.create_index('ix_skillswap_user_id', ['user_id'], unique=False)
+
+    with op.batch_alter_table('interaction', schema=None) as batch_op:
+        batch_op.create_index('ix_interaction_recipient_created', ['recipient_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_interaction_sender_created', ['sender_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_interaction_trip_id', ['trip_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('interaction', schema=None) as batch_op:
+        batch_op.drop_index('ix_interaction_trip_id')
+        batch_op.drop_index('ix_interaction_sender_created')
+        batch_op.drop_index('ix_interaction_recipient_created')
+
+    with op.batch_alter_table('skillswap', schema=None) as batch_op:
+        batch_op.drop_index('ix_skillswap_user_id')
+
+    with op.batch_alter_table('trip', schema=None) as batch_op:
+        batch_op.drop_index('ix_trip_user_created')
+        batch_op.drop_index('ix_trip_offer_created')
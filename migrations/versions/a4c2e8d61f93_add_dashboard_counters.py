@@ -0,0 +1,52 @@
+"""add user_summary and trip.interaction_count (dashboard counters)
+
+Revision ID: a4c2e8d61f93
+Revises: f7d3a9c1b286
+Create Date: 2026-10-17 09:12:37.520416
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c2e8d61f93'
+down_revision = 'f7d3a9c1b286'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_summary',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('listing_count', sa.Integer(), nullable=False),
+    sa.Column('received_pending', sa.Integer(), nullable=False),
+    sa.Column('received_accepted', sa.Integer(), nullable=False),
+    sa.Column('received_rejected', sa.Integer(), nullable=False),
+    sa.Column('sent_pending', sa.Integer(), nullable=False),
+    sa.Column('sent_accepted', sa.Integer(), nullable=False),
+    sa.Column('sent_rejected', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Plain ADD COLUMN rather than batch mode: recreating trip would drop the search index triggers
+    op.add_column('trip', sa.Column('interaction_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill from the existing rows (same queries as DashboardCounters.rebuild)
+    def count(table, condition):
+        return f'(SELECT count(*) FROM {table} WHERE {condition})'
+
+    columns = {'listing_count': count('trip', 'trip.user_id = "user".id')}
+    for status in ('Pending', 'Accepted', 'Rejected'):
+        columns[f'received_{status.lower()}'] = count('interaction', f"interaction.recipient_id = \"user\".id AND interaction.status = '{status}'")
+        columns[f'sent_{status.lower()}'] = count('interaction', f"interaction.sender_id = \"user\".id AND interaction.status = '{status}'")
+    op.execute(
+        f'INSERT INTO user_summary (user_id, {", ".join(columns)}) '
+        f'SELECT "user".id, {", ".join(columns.values())} FROM "user"'
+    )
+    op.execute(f"UPDATE trip SET interaction_count = {count('interaction', 'interaction.trip_id = trip.id')}")
+
+
+def downgrade():
+    op.drop_column('trip', 'interaction_count')
+    op.drop_table('user_summary')
@@ -0,0 +1,26 @@
+"""add interaction (created_at, id) index for streaming exports
+
+Revision ID: a7e3c5b1d049
+Revises: f1c6d9e2a874
+Create Date: 2026-10-18 11:37:09.842615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7e3c5b1d049'
+down_revision = 'f1c6d9e2a874'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('interaction', schema=None) as batch_op:
+        batch_op.create_index('ix_interaction_created', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('interaction', schema=None) as batch_op:
+        batch_op.drop_index('ix_interaction_created')
@@ -0,0 +1,26 @@
+"""add interaction (recipient_id, status, created_at) index for inbox triage
+
+Revision ID: b8e1f4a27c05
+Revises: a4c2e8d61f93
+Create Date: 2026-10-17 11:40:03.118274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e1f4a27c05'
+down_revision = 'a4c2e8d61f93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('interaction', schema=None) as batch_op:
+        batch_op.create_index('ix_interaction_recipient_status_created', ['recipient_id', 'status', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('interaction', schema=None) as batch_op:
+        batch_op.drop_index('ix_interaction_recipient_status_created')
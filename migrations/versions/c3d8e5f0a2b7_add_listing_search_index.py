@@ -0,0 +1,71 @@
+"""add listing full-text search index
+
+Revision ID: c3d8e5f0a2b7
+Revises: 9b1f6c2d7a41
+Create Date: 2026-10-16 11:40:02.913377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d8e5f0a2b7'
+down_revision = '9b1f6c2d7a41'
+branch_labels = None
+depends_on = None
+
+
+TRIGGERS = {
+    'trip_fts_insert': """CREATE TRIGGER trip_fts_insert AFTER INSERT ON trip BEGIN
+        INSERT INTO listing_fts (rowid, destination, description, skill_offered, skill_wanted)
+        VALUES (new.id, new.destination, coalesce(new.description, ''), '', '');
+    END""",
+    'trip_fts_update': """CREATE TRIGGER trip_fts_update AFTER UPDATE OF destination, description ON trip BEGIN
+        UPDATE listing_fts SET destination = new.destination, description = coalesce(new.description, '')
+        WHERE rowid = new.id;
+    END""",
+    'trip_fts_delete': """CREATE TRIGGER trip_fts_delete AFTER DELETE ON trip BEGIN
+        DELETE FROM listing_fts WHERE rowid = old.id;
+    END""",
+    'skillswap_fts_insert': """CREATE TRIGGER skillswap_fts_insert AFTER INSERT ON skillswap BEGIN
+        UPDATE listing_fts SET skill_offered = new.skill_offered, skill_wanted = new.skill_wanted
+        WHERE rowid = new.trip_id;
+    END""",
+    'skillswap_fts_update': """CREATE TRIGGER skillswap_fts_update AFTER UPDATE OF skill_offered, skill_wanted ON skillswap BEGIN
+        UPDATE listing_fts SET skill_offered = new.skill_offered, skill_wanted = new.skill_wanted
+        WHERE rowid = new.trip_id;
+    END""",
+    'skillswap_fts_delete': """CREATE TRIGGER skillswap_fts_delete AFTER DELETE ON skillswap BEGIN
+        UPDATE listing_fts SET skill_offered = '', skill_wanted = ''
+        WHERE rowid = old.trip_id;
+    END""",
+}
+
+
+def upgrade():
+    # FTS5 is SQLite-only; other databases use the LIKE search backend
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("""CREATE VIRTUAL TABLE listing_fts USING fts5(
+        destination, description, skill_offered, skill_wanted,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )""")
+    for ddl in TRIGGERS.values():
+        op.execute(ddl)
+
+    # Backfill existing listings
+    op.execute("""INSERT INTO listing_fts (rowid, destination, description, skill_offered, skill_wanted)
+        SELECT trip.id, trip.destination, coalesce(trip.description, ''),
+               coalesce(skillswap.skill_offered, ''), coalesce(skillswap.skill_wanted, '')
+        FROM trip LEFT OUTER JOIN skillswap ON skillswap.trip_id = trip.id""")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.execute("DROP TABLE IF EXISTS listing_fts")
@@ -0,0 +1,32 @@
+"""add trip and skillswap (created_at, id) indexes for the JSON API pages
+
+Revision ID: d2f6a8b3c915
+Revises: b8e1f4a27c05
+Create Date: 2026-10-17 15:22:47.604193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f6a8b3c915'
+down_revision = 'b8e1f4a27c05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('trip', schema=None) as batch_op:
+        batch_op.create_index('ix_trip_created', ['created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('skillswap', schema=None) as batch_op:
+        batch_op.create_index('ix_skillswap_created', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('skillswap', schema=None) as batch_op:
+        batch_op.drop_index('ix_skillswap_created')
+
+    with op.batch_alter_table('trip', schema=None) as batch_op:
+        batch_op.drop_index('ix_trip_created')
@@ -0,0 +1,45 @@
+"""add updated_at to trip, skillswap and interaction
+
+Revision ID: e5a1b7c94d20
+Revises: c3d8e5f0a2b7
+Create Date: 2026-10-16 13:05:51.602114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a1b7c94d20'
+down_revision = 'c3d8e5f0a2b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('trip', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_trip_updated_at'), ['updated_at'], unique=False)
+
+    with op.batch_alter_table('skillswap', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_skillswap_updated_at'), ['updated_at'], unique=False)
+
+    with op.batch_alter_table('interaction', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    # Existing rows were last modified no later than they were created
+    for table in ('trip', 'skillswap', 'interaction'):
+        op.execute(f'UPDATE {table} SET updated_at = created_at WHERE updated_at IS NULL')
+
+
+def downgrade():
+    # Plain ALTER TABLE ... DROP COLUMN (SQLite >= 3.35) rather than batch mode:
+    # recreating trip/skillswap would silently drop the search index triggers.
+    op.drop_column('interaction', 'updated_at')
+
+    op.drop_index(op.f('ix_skillswap_updated_at'), table_name='skillswap')
+    op.drop_column('skillswap', 'updated_at')
+
+    op.drop_index(op.f('ix_trip_updated_at'), table_name='trip')
+    op.drop_column('trip', 'updated_at')
@@ -0,0 +1,71 @@
+"""add listing availability R*Tree (destination x dates)
+
+Revision ID: e9b4c7d1f362
+Revises: d2f6a8b3c915
+Create Date: 2026-10-17 17:05:31.228416
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9b4c7d1f362'
+down_revision = 'd2f6a8b3c915'
+branch_labels = None
+depends_on = None
+
+
+def _day(column):
+    return f"CAST(julianday({column}) AS INTEGER)"
+
+
+def _box(row):
+    # Days, destination key (first four characters in base 128), offer flag
+    start, end = _day(f"{row}.start_date"), _day(f"{row}.end_date")
+    name = f"lower(trim({row}.destination))"
+    key = " + ".join(
+        f"min(coalesce(unicode(substr({name}, {i}, 1)), 0), 127) * {128 ** (4 - i)}" for i in range(1, 5)
+    )
+    return (
+        f"min({start}, {end}), max({start}, {end}), {key}, {key}, "
+        f"{row}.is_accommodation_offer, {row}.is_accommodation_offer"
+    )
+
+
+TRIGGERS = {
+    'trip_availability_insert': f"""CREATE TRIGGER trip_availability_insert AFTER INSERT ON trip BEGIN
+        INSERT INTO trip_availability VALUES (new.id, {_box('new')});
+    END""",
+    'trip_availability_update': f"""CREATE TRIGGER trip_availability_update
+        AFTER UPDATE OF destination, start_date, end_date, is_accommodation_offer ON trip BEGIN
+        INSERT OR REPLACE INTO trip_availability VALUES (new.id, {_box('new')});
+    END""",
+    'trip_availability_delete': """CREATE TRIGGER trip_availability_delete AFTER DELETE ON trip BEGIN
+        DELETE FROM trip_availability WHERE id = old.id;
+    END""",
+}
+
+
+def upgrade():
+    # R*Tree is SQLite-only; other databases use the range availability backend
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("""CREATE VIRTUAL TABLE trip_availability USING rtree_i32(
+        id, first_day, last_day, destination_min, destination_max, offer_min, offer_max
+    )""")
+    for ddl in TRIGGERS.values():
+        op.execute(ddl)
+
+    # Backfill existing listings
+    op.execute(f"INSERT INTO trip_availability SELECT trip.id, {_box('trip')} FROM trip")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.execute("DROP TABLE IF EXISTS trip_availability")
@@ -0,0 +1,27 @@
+"""add trip.counted_at (when interaction_count last changed)
+
+Revision ID: f1c6d9e2a874
+Revises: e9b4c7d1f362
+Create Date: 2026-10-18 10:04:51.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c6d9e2a874'
+down_revision = 'e9b4c7d1f362'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plain ADD COLUMN rather than batch mode: recreating trip would drop the search and availability triggers
+    op.add_column('trip', sa.Column('counted_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_trip_counted_at', 'trip', ['counted_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_trip_counted_at', table_name='trip')
+    op.drop_column('trip', 'counted_at')
@@ -1,67 +1,168 @@
-from flask_sqlalchemy import SQLAlchemy
+"""
+The database models. `db` and the extensions the models use live in
+extensions.py; create_app() in app.py binds them to an application.
+"""
 from datetime import datetime
 
-db = SQLAlchemy()
+from flask_login import UserMixin
+from sqlalchemy import event
 
-# ------------------------
-# User Model
-# ------------------------
-class User(db.Model):
+from extensions import db, identity_cache, password_hasher
+
+
+class User(db.Model, UserMixin):
     __tablename__ = "user"
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
+    password_hash = db.Column(db.String(128))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationships
     trips = db.relationship("Trip", backref="user", cascade="all, delete-orphan")
     skillswaps = db.relationship("SkillSwap", backref="user", cascade="all, delete-orphan")
+    sent_interactions = db.relationship("Interaction", foreign_keys='Interaction.sender_id', backref="sender", lazy='dynamic', cascade="all, delete-orphan")
+    received_interactions = db.relationship("Interaction", foreign_keys='Interaction.recipient_id', backref="recipient", lazy='dynamic', cascade="all, delete-orphan")
+
+    def set_password(self, password):
+        self.password_hash = password_hasher.hash(password)
+
+    def check_password(self, password):
+        return password_hasher.verify(self.password_hash, password)
 
     def __repr__(self):
         return f"<User {self.username}>"
 
 
-# ------------------------
-# Trip Model (Now supports Accommodation Offers)
-# ------------------------
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def forget_cached_identity(mapper, connection, user):
+    """Profile or password changes must not be served from a stale snapshot."""
+    identity_cache.invalidate(user.id)
+
+
 class Trip(db.Model):
     __tablename__ = "trip"
+    __table_args__ = (
+        # Marketplace sections: filter on the flag, keyset-sort on (created_at, id)
+        db.Index("ix_trip_offer_created", "is_accommodation_offer", "created_at", "id"),
+        # Dashboard "My Active Listings"
+        db.Index("ix_trip_user_created", "user_id", "created_at"),
+        # Unfiltered /api/v1/trips pages: walk the index instead of sorting every trip
+        db.Index("ix_trip_created", "created_at", "id"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     destination = db.Column(db.String(120), nullable=False)
     start_date = db.Column(db.Date, nullable=False)
     end_date = db.Column(db.Date, nullable=False)
+    # NEW: Added description field
+    description = db.Column(db.Text, nullable=True) 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    # NEW COLUMN: True if a local is offering their home; False if a user is traveling.
-    is_accommodation_offer = db.Column(db.Boolean, default=False, nullable=False) 
-
-    # Foreign key to user
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    is_accommodation_offer = db.Column(db.Boolean, default=False, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    # Requests received on this listing, maintained by counters.py
+    interaction_count = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    # When interaction_count last changed (the /api/v1/trips ETag); a new count is not an edit, so not updated_at
+    counted_at = db.Column(db.DateTime, nullable=True, index=True)
 
-    # FIX APPLIED: Defines the one-to-one relationship from Trip to SkillSwap.
-    # uselist=False is essential for telling SQLAlchemy this is a one-to-one link.
+    interactions = db.relationship("Interaction", backref="trip", lazy='dynamic', cascade="all, delete-orphan")
     skillswap = db.relationship("SkillSwap", backref="trip", uselist=False, cascade="all, delete-orphan") 
 
     def __repr__(self):
         return f"<Trip {self.destination}>"
 
 
-# ------------------------
-# SkillSwap Model
-# ------------------------
 class SkillSwap(db.Model):
     __tablename__ = "skillswap"
+    __table_args__ = (
+        db.Index("ix_skillswap_user_id", "user_id"),
+        # /api/v1/skillswaps pages
+        db.Index("ix_skillswap_created", "created_at", "id"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     skill_offered = db.Column(db.String(120), nullable=False)
     skill_wanted = db.Column(db.String(120), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-    # Foreign key to user
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    
-    # FIX APPLIED: This is the missing column! It links SkillSwap back to the Trip.
-    # unique=True enforces the one-to-one relationship.
     trip_id = db.Column(db.Integer, db.ForeignKey("trip.id"), unique=True, nullable=False)
-
+    
     def __repr__(self):
         return f"<SkillSwap {self.skill_offered} for {self.skill_wanted}>"
+
+
+class Interaction(db.Model):
+    __tablename__ = "interaction"
+    __table_args__ = (
+        # Dashboard inbox/outbox, newest first
+        db.Index("ix_interaction_recipient_created", "recipient_id", "created_at"),
+        db.Index("ix_interaction_sender_created", "sender_id", "created_at"),
+        # Inbox triage: one status of a user's received requests, newest first
+        db.Index("ix_interaction_recipient_status_created", "recipient_id", "status", "created_at"),
+        # Cascade deletes and trip.interactions lookups
+        db.Index("ix_interaction_trip_id", "trip_id"),
+        # Streaming exports walk (created_at, id) from `since` instead of sorting the table
+        db.Index("ix_interaction_created", "created_at", "id"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    trip_id = db.Column(db.Integer, db.ForeignKey("trip.id"), nullable=False)
+    sender_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    recipient_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    
+    message = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(50), default="Pending", nullable=False) # e.g., Pending, Accepted, Rejected
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Interaction {self.id} for Trip {self.trip_id} from {self.sender_id} to {self.recipient_id}>"
+
+
+class UserSummary(db.Model):
+    """Dashboard counters of one user, kept in sync by counters.py (views never write it)."""
+    __tablename__ = "user_summary"
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    listing_count = db.Column(db.Integer, default=0, nullable=False)
+    received_pending = db.Column(db.Integer, default=0, nullable=False)
+    received_accepted = db.Column(db.Integer, default=0, nullable=False)
+    received_rejected = db.Column(db.Integer, default=0, nullable=False)
+    sent_pending = db.Column(db.Integer, default=0, nullable=False)
+    sent_accepted = db.Column(db.Integer, default=0, nullable=False)
+    sent_rejected = db.Column(db.Integer, default=0, nullable=False)
+
+    @property
+    def received_total(self):
+        return self.received_pending + self.received_accepted + self.received_rejected
+
+    @property
+    def sent_total(self):
+        return self.sent_pending + self.sent_accepted + self.sent_rejected
+
+    def __repr__(self):
+        return f"<UserSummary {self.user_id}>"
+
+
+class Job(db.Model):
+    """A background job, inserted in the same transaction as the change it follows (see jobs.py)."""
+    __tablename__ = "job"
+    __table_args__ = (
+        # The worker's "next due jobs" query
+        db.Index("ix_job_status_run_at", "status", "run_at"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(80), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default="{}")
+    idempotency_key = db.Column(db.String(200), unique=True, nullable=True)
+    status = db.Column(db.String(20), default="queued", nullable=False) # queued, running, done, dead
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=5, nullable=False)
+    run_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_by = db.Column(db.String(120), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.name} {self.status}>"
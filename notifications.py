@@ -0,0 +1,183 @@
+"""
+Real-time interaction notifications over Server-Sent Events.
+
+Views publish small events after they commit: a new request goes to the
+listing owner, an Accept/Reject goes to the sender. Every open
+/notifications/stream connection holds one bounded queue. Publishing
+puts the event on the queues of the target user's connections in this
+process.
+
+Backends (NOTIFICATIONS_BACKEND):
+  * "local" - in-process fan-out. Enough for one worker, or when a user's
+              connections and writes land on the same worker.
+  * "redis" - publishes through Redis pub/sub. One listener thread per
+              process fans events out to its local connections, so every
+              worker sees every event. Needs the optional `redis` package.
+
+The stream is opt-in (NOTIFICATIONS_STREAM). A connection never ends while
+the dashboard tab stays open, so on gunicorn's default sync workers every
+tab would hold a whole worker. An idle SSE connection is only a blocked
+generator waiting on its queue: run the app on an async worker (`gunicorn
+-k gevent --worker-connections 1000 'app:create_app()'`) to hold thousands
+of them cheaply. With gevent's monkey patching the queue waits below become
+greenlet switches, not OS threads. With more than one worker (WEB_WORKERS)
+the "local" backend would lose most events, so it refuses to start.
+"""
+import json
+import queue
+import threading
+from collections import defaultdict
+
+try:
+    import redis
+except ImportError:  # Optional: only needed for NOTIFICATIONS_BACKEND=redis
+    redis = None
+
+CHANNEL_PREFIX = "globeswap:notify:"
+
+
+class Subscription:
+    def __init__(self, broker, user_id, max_pending):
+        self.broker = broker
+        self.user_id = user_id
+        self.events = queue.Queue(maxsize=max_pending)
+
+    def get(self, timeout):
+        """The next event, or None after `timeout` seconds without one."""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """Fans events out to the subscriptions open in this process."""
+
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self._subscriptions = defaultdict(set)  # user_id -> {Subscription}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = Subscription(self, user_id, self.max_pending)
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id, event):
+        self.deliver(user_id, event)
+
+    def deliver(self, user_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.events.put_nowait(event)
+            except queue.Full:
+                # A stalled client: tell it to reload instead of growing without bound
+                with subscription.events.mutex:
+                    subscription.events.queue.clear()
+                subscription.events.put_nowait({"type": "resync"})
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+class RedisBroker(LocalBroker):
+    """Local fan-out fed by Redis pub/sub, so events reach every worker."""
+
+    def __init__(self, url, max_pending=100):
+        if redis is None:
+            raise RuntimeError("NOTIFICATIONS_BACKEND=redis needs the `redis` package")
+        super().__init__(max_pending)
+        self.client = redis.Redis.from_url(url)
+        self._listener = None
+
+    def subscribe(self, user_id):
+        self._ensure_listener()
+        return super().subscribe(user_id)
+
+    def publish(self, user_id, event):
+        self.client.publish(f"{CHANNEL_PREFIX}{user_id}", json.dumps(event))
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(target=self._listen, name="notifications-redis", daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+        for message in pubsub.listen():
+            channel = message["channel"].decode()
+            user_id = int(channel[len(CHANNEL_PREFIX):])
+            self.deliver(user_id, json.loads(message["data"]))
+
+
+def format_event(event):
+    """One SSE frame: the event type as `event:`, the payload as JSON `data:`."""
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+class Notifications:
+    def __init__(self, app=None):
+        self.broker = None
+        self.enabled = False
+        self.heartbeat = 25
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("NOTIFICATIONS_STREAM", False)
+        app.config.setdefault("NOTIFICATIONS_BACKEND", "local")
+        app.config.setdefault("NOTIFICATIONS_REDIS_URL", "redis://localhost:6379/0")
+        app.config.setdefault("NOTIFICATIONS_MAX_PENDING", 100)
+        # Comment frames keep proxies from closing idle streams (most time out at 30-60s)
+        app.config.setdefault("NOTIFICATIONS_HEARTBEAT", 25)
+
+        self.enabled = bool(app.config["NOTIFICATIONS_STREAM"])
+        max_pending = app.config["NOTIFICATIONS_MAX_PENDING"]
+        if app.config["NOTIFICATIONS_BACKEND"] == "redis":
+            self.broker = RedisBroker(app.config["NOTIFICATIONS_REDIS_URL"], max_pending)
+        else:
+            if self.enabled and app.config.get("WEB_WORKERS", 1) > 1:
+                # Events only reach the connections of the worker that published them
+                raise RuntimeError(
+                    "NOTIFICATIONS_STREAM with more than one worker needs NOTIFICATIONS_BACKEND=redis"
+                )
+            self.broker = LocalBroker(max_pending)
+        self.heartbeat = app.config["NOTIFICATIONS_HEARTBEAT"]
+        app.extensions["notifications"] = self
+
+    def publish(self, user_id, event):
+        self.broker.publish(user_id, event)
+
+    def stream(self, user_id):
+        """
+        Generator of SSE frames for one connection. It touches neither the
+        request nor the database, so the view can return it without
+        stream_with_context and keep no DB connection while it idles.
+        """
+        subscription = self.broker.subscribe(user_id)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                event = subscription.get(timeout=self.heartbeat)
+                yield format_event(event) if event is not None else ": keep-alive\n\n"
+        finally:
+            # Runs when the server closes the generator after the client goes away
+            subscription.close()
@@ -0,0 +1,56 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Listings are ordered newest first on (created_at, id). Instead of OFFSET,
+each page remembers the sort key of its last row in an opaque cursor and the
+next page asks for rows strictly "after" it, so page N costs the same as
+page 1 and a saved link keeps pointing at the same position even when new
+listings are posted or the anchor row is deleted.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(created_at, row_id):
+    """Packs the sort key of a row into a URL-safe token."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Unpacks a token built by encode_cursor. Returns (created_at, id),
+    or None when the token is missing or malformed (callers fall back to
+    the first page rather than erroring on a mangled link).
+    """
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_raw, id_raw = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        return datetime.fromisoformat(created_raw), int(id_raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def keyset_page(query, created_col, id_col, cursor, per_page):
+    """
+    Returns (items, next_cursor) for one page of `query`, newest first.
+    next_cursor is None on the last page. One extra row is fetched to find
+    out whether another page exists without issuing a COUNT.
+    """
+    position = decode_cursor(cursor)
+    if position is not None:
+        query = query.filter(tuple_(created_col, id_col) < tuple_(*position))
+
+    rows = query.order_by(created_col.desc(), id_col.desc()).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
@@ -0,0 +1,109 @@
+"""
+Password hashing off the request thread.
+
+Hashing and verifying are CPU-bound on purpose, so a login spike would pin
+every web worker. PasswordHasher runs them in a small process pool and caps
+how many may be queued. When the queue is full, callers get HashingBusy
+straight away (the app turns it into a 503) instead of adding to the backlog.
+A hash that times out keeps its queue slot until it really finishes, since
+a running hash can't be cancelled.
+
+Every web worker has its own pool. PASSWORD_HASH_WORKERS defaults to the
+CPU count divided by the number of web workers (WEB_WORKERS, at least one
+each), so the pools of all workers together fit the machine's cores.
+
+The hash method and its cost come from PASSWORD_HASH_METHOD (any werkzeug
+method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000"; short
+forms such as "scrypt" get werkzeug's defaults). Hashes made with other
+parameters are reported by needs_rehash(), so they can be upgraded on the
+next successful login.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+class HashingBusy(RuntimeError):
+    """Raised when the hashing queue is full or a hash took too long."""
+
+
+def normalize_method(method):
+    """The method as werkzeug writes it into a hash ("scrypt" -> "scrypt:32768:8:1")."""
+    name, *args = method.split(":")
+    if name == "scrypt" and not args:
+        return "scrypt:32768:8:1"
+    if name == "pbkdf2" and len(args) < 2:
+        return f"pbkdf2:{args[0] if args else 'sha256'}:{DEFAULT_PBKDF2_ITERATIONS}"
+    return method
+
+
+class PasswordHasher:
+    def __init__(self, app=None):
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+        self._slots = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+        # 0 hashes inline on the request thread (development and tests)
+        app.config.setdefault(
+            "PASSWORD_HASH_WORKERS", max(1, (os.cpu_count() or 1) // max(1, app.config.get("WEB_WORKERS", 1)))
+        )
+        app.config.setdefault("PASSWORD_HASH_MAX_PENDING", 4 * app.config["PASSWORD_HASH_WORKERS"])
+        app.config.setdefault("PASSWORD_HASH_TIMEOUT", 5.0)
+
+        self.method = normalize_method(app.config["PASSWORD_HASH_METHOD"])
+        self.workers = app.config["PASSWORD_HASH_WORKERS"]
+        self.timeout = app.config["PASSWORD_HASH_TIMEOUT"]
+        self._slots = threading.BoundedSemaphore(max(app.config["PASSWORD_HASH_MAX_PENDING"], 1))
+        app.extensions["password_hasher"] = self
+
+    def _executor(self):
+        # Created lazily and per process: a pool inherited through a fork
+        # (e.g. gunicorn --preload) belongs to the parent and can't be used.
+        with self._pool_lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy("Too many password checks in progress")
+        try:
+            future = self._executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # Released when the hash is really done: after a timeout it keeps running in the pool
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()  # Only helps if it hasn't started yet
+            raise HashingBusy("Password check timed out")
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        if not password_hash:
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True when the stored hash was made with a different method or cost."""
+        return bool(password_hash) and password_hash.split("$", 1)[0] != self.method
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,241 @@
+"""
+Always-on request profiling and SQL instrumentation.
+
+When PROFILING_ENABLED is set, every request records its wall time,
+template render time (Flask's template signals), and its SQL statement
+count and SQL time (engine cursor events). Totals per route feed a
+Prometheus text endpoint (see `prometheus_text`), served only to requests
+bearing METRICS_TOKEN. The last
+PROFILING_RECENT_REQUESTS requests are kept for the admin page of slow
+requests, along with per-statement totals to find the slowest SQL.
+
+cProfile is far too expensive to leave on, so only PROFILING_SAMPLE_RATE of
+requests run under it. Their trace is kept only when the request took
+longer than PROFILING_SLOW_MS. Everything else costs a few perf_counter()
+calls and one short lock per request.
+
+Numbers are per process: with several gunicorn workers, scrape each of
+them, or read the admin page as one worker's sample.
+"""
+import cProfile
+import io
+import itertools
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Request duration histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_TEXT_LIMIT = 500
+
+
+class RouteStats:
+    __slots__ = ("requests", "seconds", "template_seconds", "sql_statements", "sql_seconds", "buckets", "statuses")
+
+    def __init__(self):
+        self.requests = 0
+        self.seconds = 0.0
+        self.template_seconds = 0.0
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.statuses = {}
+
+
+class RequestProfiler:
+    def __init__(self, app=None):
+        self.routes = {}             # (endpoint, method) -> RouteStats
+        self.statements = {}         # SQL text -> [count, total seconds, max seconds]
+        self.recent = deque()        # dicts describing recent requests
+        self.profiles = {}           # request id -> pstats text, for slow sampled requests
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.enabled = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("PROFILING_ENABLED", False)
+        app.config.setdefault("METRICS_TOKEN", "")
+        app.config.setdefault("PROFILING_SLOW_MS", 500)
+        app.config.setdefault("PROFILING_SAMPLE_RATE", 0.01)
+        app.config.setdefault("PROFILING_RECENT_REQUESTS", 1000)
+        app.config.setdefault("PROFILING_MAX_PROFILES", 20)
+        app.config.setdefault("PROFILING_MAX_STATEMENTS", 500)
+        app.extensions["request_profiler"] = self
+
+        self.enabled = bool(app.config["PROFILING_ENABLED"])
+        if not self.enabled:
+            return
+        self.slow_seconds = app.config["PROFILING_SLOW_MS"] / 1000
+        self.sample_rate = app.config["PROFILING_SAMPLE_RATE"]
+        self.recent = deque(maxlen=app.config["PROFILING_RECENT_REQUESTS"])
+        self.max_profiles = app.config["PROFILING_MAX_PROFILES"]
+        self.max_statements = app.config["PROFILING_MAX_STATEMENTS"]
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        before_render_template.connect(self._template_started, app)
+        template_rendered.connect(self._template_finished, app)
+        if not event.contains(Engine, "before_cursor_execute", self._statement_started):
+            event.listen(Engine, "before_cursor_execute", self._statement_started)
+            event.listen(Engine, "after_cursor_execute", self._statement_finished)
+
+    # --- Per-request hooks ---
+
+    def _start(self):
+        g._profile_sql_count = 0
+        g._profile_sql_seconds = 0.0
+        g._profile_template_seconds = 0.0
+        g._profile_cprofile = None
+        if self.sample_rate and random.random() < self.sample_rate:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                g._profile_cprofile = profile
+            except ValueError:
+                pass  # Another profiler is active in this process (e.g. a concurrent sample)
+        g._profile_started = time.perf_counter()
+
+    def _finish(self, response):
+        if "_profile_started" not in g:
+            return response
+        elapsed = time.perf_counter() - g._profile_started
+        profile = g._profile_cprofile
+        if profile is not None:
+            profile.disable()
+
+        endpoint = request.endpoint or "<unmatched>"
+        record = {
+            "id": next(self._ids),
+            "at": datetime.utcnow(),
+            "method": request.method,
+            "path": request.full_path.rstrip("?"),
+            "endpoint": endpoint,
+            "status": response.status_code,
+            "ms": elapsed * 1000,
+            "template_ms": g._profile_template_seconds * 1000,
+            "sql_count": g._profile_sql_count,
+            "sql_ms": g._profile_sql_seconds * 1000,
+            "profiled": False,
+        }
+        profile_text = None
+        if profile is not None and elapsed >= self.slow_seconds:
+            out = io.StringIO()
+            pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(40)
+            profile_text = out.getvalue()
+            record["profiled"] = True
+
+        with self._lock:
+            stats = self.routes.get((endpoint, request.method))
+            if stats is None:
+                stats = self.routes[(endpoint, request.method)] = RouteStats()
+            stats.requests += 1
+            stats.seconds += elapsed
+            stats.template_seconds += g._profile_template_seconds
+            stats.sql_statements += g._profile_sql_count
+            stats.sql_seconds += g._profile_sql_seconds
+            for i, bound in enumerate(BUCKETS):
+                if elapsed <= bound:
+                    stats.buckets[i] += 1
+            stats.statuses[response.status_code] = stats.statuses.get(response.status_code, 0) + 1
+            self.recent.append(record)
+            if profile_text is not None:
+                self.profiles[record["id"]] = profile_text
+                while len(self.profiles) > self.max_profiles:
+                    del self.profiles[next(iter(self.profiles))]
+        return response
+
+    def _template_started(self, sender, template, context, **extra):
+        g._profile_template_started = time.perf_counter()
+
+    def _template_finished(self, sender, template, context, **extra):
+        started = g.pop("_profile_template_started", None)
+        if started is not None and "_profile_template_seconds" in g:
+            g._profile_template_seconds += time.perf_counter() - started
+
+    def _statement_started(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["_profile_started"] = time.perf_counter()
+
+    def _statement_finished(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("_profile_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if has_request_context() and "_profile_sql_count" in g:
+            g._profile_sql_count += 1
+            g._profile_sql_seconds += elapsed
+        key = statement[:STATEMENT_TEXT_LIMIT]
+        with self._lock:
+            totals = self.statements.get(key)
+            if totals is None:
+                if len(self.statements) >= self.max_statements:
+                    return
+                totals = self.statements[key] = [0, 0.0, 0.0]
+            totals[0] += 1
+            totals[1] += elapsed
+            totals[2] = max(totals[2], elapsed)
+
+    # --- Reporting ---
+
+    def slowest_requests(self, limit=50):
+        with self._lock:
+            records = list(self.recent)
+        return sorted(records, key=lambda record: record["ms"], reverse=True)[:limit]
+
+    def slowest_statements(self, limit=20):
+        """(statement, count, total ms, mean ms, max ms), most total time first."""
+        with self._lock:
+            items = [(text, *totals) for text, totals in self.statements.items()]
+        items.sort(key=lambda item: item[2], reverse=True)
+        return [
+            (text, count, total * 1000, total * 1000 / count, worst * 1000)
+            for text, count, total, worst in items[:limit]
+        ]
+
+    def profile(self, request_id):
+        with self._lock:
+            return self.profiles.get(request_id)
+
+    def prometheus_text(self):
+        """Metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            routes = sorted(self.routes.items())
+            family("globeswap_http_requests_total", "counter", "Requests handled, by route and status.")
+            for (endpoint, method), stats in routes:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'globeswap_http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+            family("globeswap_http_request_duration_seconds", "histogram", "Wall time per request.")
+            for (endpoint, method), stats in routes:
+                labels = f'endpoint="{endpoint}",method="{method}"'
+                for bound, count in zip(BUCKETS, stats.buckets):
+                    lines.append(f'globeswap_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'globeswap_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.requests}')
+                lines.append(f"globeswap_http_request_duration_seconds_sum{{{labels}}} {stats.seconds:.6f}")
+                lines.append(f"globeswap_http_request_duration_seconds_count{{{labels}}} {stats.requests}")
+
+            for name, attribute, kind, help_text in (
+                ("globeswap_template_render_seconds_total", "template_seconds", "counter", "Time spent rendering templates."),
+                ("globeswap_sql_statements_total", "sql_statements", "counter", "SQL statements executed."),
+                ("globeswap_sql_seconds_total", "sql_seconds", "counter", "Time spent executing SQL."),
+            ):
+                family(name, kind, help_text)
+                for (endpoint, method), stats in routes:
+                    value = getattr(stats, attribute)
+                    value = f"{value:.6f}" if isinstance(value, float) else value
+                    lines.append(f'{name}{{endpoint="{endpoint}",method="{method}"}} {value}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,57 @@
+"""
+Debug-mode guard against N+1 query regressions.
+
+Counts the SQL statements issued while handling a request and raises
+QueryBudgetExceeded as soon as a request goes over its budget, so the
+traceback points straight at the lazy load (or loop) that caused it.
+Only active when the app runs in debug or testing mode.
+"""
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised when a request issues more SQL statements than its budget allows."""
+
+
+def query_budget(limit):
+    """Overrides SQL_QUERY_BUDGET for a single view."""
+    def decorator(view):
+        view._query_budget = limit
+        return view
+    return decorator
+
+
+class QueryBudget:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("SQL_QUERY_BUDGET", 15)
+
+        @app.before_request
+        def _start_counting():
+            if not (app.debug or app.testing) or not app.config["SQL_QUERY_BUDGET"]:
+                return
+            view = app.view_functions.get(request.endpoint)
+            g._query_budget = getattr(view, "_query_budget", app.config["SQL_QUERY_BUDGET"])
+            g._query_count = 0
+
+        # Listening on the Engine class covers every engine (and bind) the app creates
+        if not event.contains(Engine, "before_cursor_execute", _count_statement):
+            event.listen(Engine, "before_cursor_execute", _count_statement)
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context() or "_query_budget" not in g:
+        return
+    if statement.startswith("BEGIN"):
+        return  # Transaction control emitted by the SQLite profile, not a query
+    g._query_count += 1
+    if g._query_count > g._query_budget:
+        raise QueryBudgetExceeded(
+            f"{request.endpoint} issued more than {g._query_budget} SQL statements; "
+            f"last one was: {statement}"
+        )
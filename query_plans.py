@@ -0,0 +1,27 @@
+"""
+EXPLAIN QUERY PLAN checks for the hot query paths (SQLite).
+
+Used by the `flask check-query-plans` command to catch a query that falls
+back to a full table scan, or sorts in a temp B-tree instead of walking an
+index, before it reaches production.
+"""
+
+
+def explain_query_plan(connection, statement):
+    """Returns the detail column of SQLite's EXPLAIN QUERY PLAN for `statement`."""
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={"render_postcompile": True})
+    # The plan does not depend on the bound values, only on their positions
+    params = (None,) * len(compiled.positiontup or ())
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+    return [row[-1] for row in rows]
+
+
+def plan_problems(plan):
+    """Lists the plan steps that read a whole table or sort without an index."""
+    problems = []
+    for step in plan:
+        if step.startswith("SCAN ") and " USING " not in step:
+            problems.append(step)
+        elif step.startswith("USE TEMP B-TREE FOR ORDER BY"):
+            problems.append(step)
+    return problems
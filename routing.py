@@ -0,0 +1,92 @@
+"""
+Read/write routing between a primary database and read replicas.
+
+Replicas are ordinary Flask-SQLAlchemy binds listed in DATABASE_REPLICAS
+(bind keys in SQLALCHEMY_BINDS). RoutingSession sends a query to a replica
+only when all of these hold:
+
+  * it runs inside a read-only request (GET/HEAD/OPTIONS whose view is not
+    marked @use_primary);
+  * it is not part of a flush and is not a Core INSERT/UPDATE/DELETE;
+  * the current request hasn't written anything yet;
+  * the browser session hasn't written in the last
+    DATABASE_READ_YOUR_WRITES_SECONDS, so users see their own writes even
+    while replicas lag behind.
+
+Everything else, including CLI commands, uses the primary. One replica is
+picked per request, so a page reads from a single consistent source.
+"""
+import random
+import time
+
+import sqlalchemy as sa
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+_SESSION_KEY = "_db_primary_until"
+
+
+def use_primary(view):
+    """Keeps a GET view on the primary (it writes, or must read its own writes)."""
+    view._use_primary = True
+    return view
+
+
+def _replica_key():
+    """The replica bind key for this request, or None to use the primary."""
+    if not has_request_context():
+        return None
+    if "_db_replica" in g:
+        return g._db_replica
+
+    replicas = current_app.config["DATABASE_REPLICAS"]
+    key = None
+    view = current_app.view_functions.get(request.endpoint)
+    if (
+        replicas
+        and request.method in READ_METHODS
+        and not getattr(view, "_use_primary", False)
+        and session.get(_SESSION_KEY, 0) < time.time()
+    ):
+        key = random.choice(replicas)
+    g._db_replica = key
+    return key
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or self._flushing or isinstance(clause, sa.UpdateBase):
+            return primary
+        # Models with their own bind key are not replicated here
+        if primary is not self._db.engines.get(None):
+            return primary
+        key = _replica_key()
+        return self._db.engines[key] if key is not None else primary
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _pin_to_primary(db_session, flush_context):
+    if has_request_context():
+        # Reads later in this request, and for a while afterwards, see this write
+        g._db_replica = None
+        g._db_wrote = True
+
+
+class DatabaseRouter:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("DATABASE_REPLICAS", [])
+        app.config.setdefault("DATABASE_READ_YOUR_WRITES_SECONDS", 5)
+        app.extensions["database_router"] = self
+
+        @app.after_request
+        def _remember_write(response):
+            if g.get("_db_wrote") and app.config["DATABASE_REPLICAS"]:
+                session[_SESSION_KEY] = time.time() + app.config["DATABASE_READ_YOUR_WRITES_SECONDS"]
+            return response
@@ -0,0 +1,214 @@
+"""
+Full-text search over listings.
+
+The default backend keeps an SQLite FTS5 table, `listing_fts`, with one row
+per Trip (rowid = trip.id) holding the destination, description and the
+skills of its SkillSwap. Triggers on `trip` and `skillswap` keep it in sync,
+so ORM writes, Core bulk inserts and cascade deletes are all covered without
+any application code. Results are ranked with BM25.
+
+Non-SQLite databases fall back to a LIKE backend with the same interface
+until a native full-text backend is configured.
+"""
+import re
+from contextlib import contextmanager, nullcontext
+
+from sqlalchemy import DDL, event, func, or_, text
+
+FTS_TABLE = "listing_fts"
+
+# Column weights for bm25(): a hit on the destination or a skill matters more
+# than one buried in the free-text description.
+BM25_WEIGHTS = (10.0, 2.0, 5.0, 5.0)
+
+FTS5_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        destination, description, skill_offered, skill_wanted,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS trip_fts_insert AFTER INSERT ON trip BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, destination, description, skill_offered, skill_wanted)
+        VALUES (new.id, new.destination, coalesce(new.description, ''), '', '');
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trip_fts_update AFTER UPDATE OF destination, description ON trip BEGIN
+        UPDATE {FTS_TABLE} SET destination = new.destination, description = coalesce(new.description, '')
+        WHERE rowid = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trip_fts_delete AFTER DELETE ON trip BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS skillswap_fts_insert AFTER INSERT ON skillswap BEGIN
+        UPDATE {FTS_TABLE} SET skill_offered = new.skill_offered, skill_wanted = new.skill_wanted
+        WHERE rowid = new.trip_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS skillswap_fts_update AFTER UPDATE OF skill_offered, skill_wanted ON skillswap BEGIN
+        UPDATE {FTS_TABLE} SET skill_offered = new.skill_offered, skill_wanted = new.skill_wanted
+        WHERE rowid = new.trip_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS skillswap_fts_delete AFTER DELETE ON skillswap BEGIN
+        UPDATE {FTS_TABLE} SET skill_offered = '', skill_wanted = ''
+        WHERE rowid = old.trip_id;
+    END""",
+]
+
+REBUILD_SQL = [
+    f"DELETE FROM {FTS_TABLE}",
+    f"""INSERT INTO {FTS_TABLE} (rowid, destination, description, skill_offered, skill_wanted)
+        SELECT trip.id, trip.destination, coalesce(trip.description, ''),
+               coalesce(skillswap.skill_offered, ''), coalesce(skillswap.skill_wanted, '')
+        FROM trip LEFT OUTER JOIN skillswap ON skillswap.trip_id = trip.id""",
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')",
+]
+
+# Suspended by bulk_insert(), which indexes a whole batch in one statement instead
+INSERT_TRIGGERS = ("trip_fts_insert", "skillswap_fts_insert")
+
+INDEX_NEW_SQL = f"""INSERT INTO {FTS_TABLE} (rowid, destination, description, skill_offered, skill_wanted)
+    SELECT trip.id, trip.destination, coalesce(trip.description, ''),
+           coalesce(skillswap.skill_offered, ''), coalesce(skillswap.skill_wanted, '')
+    FROM trip LEFT OUTER JOIN skillswap ON skillswap.trip_id = trip.id
+    WHERE trip.id > ?"""
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(query):
+    """Splits free text from the search box into plain word tokens."""
+    return _TOKEN_RE.findall(query or "")
+
+
+def to_fts_query(tokens):
+    """
+    Builds an FTS5 MATCH expression from user tokens. Every token is quoted
+    (so FTS5 operators typed by users are treated as text) and the last one
+    is a prefix match to behave like type-ahead.
+    """
+    terms = [f'"{token}"' for token in tokens]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+class FTS5SearchBackend:
+    """BM25-ranked search through the listing_fts virtual table."""
+
+    def install(self, connection):
+        for statement in FTS5_SCHEMA:
+            connection.exec_driver_sql(statement)
+
+    def rebuild(self, connection):
+        for statement in REBUILD_SQL:
+            connection.exec_driver_sql(statement)
+
+    @contextmanager
+    def bulk_insert(self, connection):
+        """
+        For bulk loads of new trips and swaps in the caller's transaction.
+        The per-row insert triggers cost more than the inserts themselves (each
+        skill swap rewrites its FTS row), so they are dropped for the block and
+        the new trips are indexed in one INSERT ... SELECT at the end. DDL is
+        transactional in SQLite: other connections never see the triggers
+        missing, and a rollback restores them.
+        """
+        # Clears index rows left over from deleted trips whose ids SQLite may reuse. Being
+        # DML, it also makes pysqlite open the transaction, which it doesn't do for DDL.
+        connection.exec_driver_sql(f"DELETE FROM {FTS_TABLE} WHERE rowid > (SELECT coalesce(max(id), 0) FROM trip)")
+        for name in INSERT_TRIGGERS:
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+        last_id = connection.exec_driver_sql("SELECT coalesce(max(id), 0) FROM trip").scalar()
+        yield
+        connection.exec_driver_sql(INDEX_NEW_SQL, (last_id,))
+        for statement in FTS5_SCHEMA:
+            if any(f"EXISTS {name} " in statement for name in INSERT_TRIGGERS):
+                connection.exec_driver_sql(statement)
+
+    def search(self, session, query, limit, offset=0):
+        """Returns the ids of matching trips, best match first."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+        rows = session.execute(
+            text(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match "
+                f"ORDER BY bm25({FTS_TABLE}, {weights}), rowid DESC LIMIT :limit OFFSET :offset"
+            ),
+            {"match": to_fts_query(tokens), "limit": limit, "offset": offset},
+        )
+        return [row[0] for row in rows]
+
+
+class LikeSearchBackend:
+    """
+    Portable fallback: every token must appear in one of the indexed columns.
+    No ranking beyond recency; fine for small databases and for engines
+    without a native full-text backend configured yet.
+    """
+
+    def __init__(self, trip_model, swap_model):
+        self.Trip = trip_model
+        self.SkillSwap = swap_model
+
+    def install(self, connection):
+        pass
+
+    def rebuild(self, connection):
+        pass
+
+    def bulk_insert(self, connection):
+        return nullcontext()
+
+    def search(self, session, query, limit, offset=0):
+        Trip, SkillSwap = self.Trip, self.SkillSwap
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        statement = session.query(Trip.id).outerjoin(SkillSwap, SkillSwap.trip_id == Trip.id)
+        for token in tokens:
+            pattern = f"%{token}%"
+            statement = statement.filter(or_(
+                Trip.destination.ilike(pattern),
+                func.coalesce(Trip.description, "").ilike(pattern),
+                SkillSwap.skill_offered.ilike(pattern),
+                SkillSwap.skill_wanted.ilike(pattern),
+            ))
+        rows = statement.order_by(Trip.created_at.desc(), Trip.id.desc()).limit(limit).offset(offset)
+        return [row[0] for row in rows]
+
+
+class ListingSearch:
+    """Picks a backend for the app's database and wires up schema creation."""
+
+    def __init__(self, app=None, db=None, trip_model=None, swap_model=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app, db, trip_model, swap_model)
+
+    def init_app(self, app, db, trip_model, swap_model):
+        uri = app.config["SQLALCHEMY_DATABASE_URI"]
+        app.config.setdefault("SEARCH_BACKEND", "fts5" if uri.startswith("sqlite") else "like")
+        app.config.setdefault("SEARCH_PAGE_SIZE", 20)
+
+        if app.config["SEARCH_BACKEND"] == "fts5":
+            self.backend = FTS5SearchBackend()
+            # Let `db.create_all()` (the init-db command) create the index too
+            for statement in FTS5_SCHEMA:
+                event.listen(db.metadata, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+        else:
+            self.backend = LikeSearchBackend(trip_model, swap_model)
+        app.extensions["listing_search"] = self
+
+    def search(self, session, query, limit, offset=0):
+        return self.backend.search(session, query, limit, offset)
+
+    def rebuild(self, connection):
+        self.backend.install(connection)
+        self.backend.rebuild(connection)
+
+    def bulk_insert(self, connection):
+        return self.backend.bulk_insert(connection)
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Alembic autogenerate filter: the FTS table and its shadow tables are not models."""
+    return not (type_ == "table" and reflected and compare_to is None and name.startswith(FTS_TABLE))
@@ -0,0 +1,199 @@
+"""
+Reproducible synthetic data for load tests (`flask seed`).
+
+Generates users, trips with their skill swaps, and interactions with Core
+executemany inserts. The same seed always gives the same rows. The shape
+mimics what a busy marketplace looks like rather than uniform noise:
+
+  * destination popularity follows a Zipf curve (`destination_skew`), so a
+    handful of hot destinations hold most listings;
+  * listings per user are skewed the same way, so a few power users own many;
+  * `hot_share` of all interactions go to the listings of the first
+    `hot_users` users, who end up with thousands of received requests;
+  * most requests are still Pending, the rest Accepted or Rejected.
+
+Every seeded user is `user<N>` / `user<N>@example.com` with SEED_PASSWORD.
+"""
+import itertools
+import random
+from array import array
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+SEED_PASSWORD = "password123"
+
+DESTINATIONS = [
+    "Lisbon", "Barcelona", "Berlin", "Paris", "Rome", "Amsterdam", "Prague", "Vienna",
+    "Budapest", "Bucharest", "Chisinau", "Krakow", "Athens", "Istanbul", "London",
+    "Dublin", "Edinburgh", "Copenhagen", "Stockholm", "Oslo", "Helsinki", "Tallinn",
+    "Riga", "Vilnius", "Warsaw", "Sofia", "Belgrade", "Zagreb", "Ljubljana", "Porto",
+    "Seville", "Valencia", "Madrid", "Milan", "Naples", "Florence", "Munich", "Zurich",
+    "Geneva", "Brussels", "Tbilisi", "Yerevan", "Tokyo", "Kyoto", "Seoul", "Bangkok",
+    "Hanoi", "Bali", "Sydney", "Melbourne", "Auckland", "New York", "Montreal",
+    "Mexico City", "Buenos Aires", "Lima", "Cape Town", "Marrakech", "Cairo", "Dubai",
+]
+
+SKILLS = [
+    "cooking", "guitar", "piano", "photography", "web development", "yoga", "surfing",
+    "gardening", "carpentry", "painting", "spanish lessons", "english lessons",
+    "french lessons", "german lessons", "baking", "cycling repairs", "video editing",
+    "graphic design", "bookkeeping", "dog walking", "babysitting", "sewing", "pottery",
+    "climbing", "diving", "chess", "math tutoring", "massage", "hairdressing",
+    "plumbing", "electrical work", "social media", "copywriting", "data analysis",
+    "dance", "singing", "knitting", "wine tasting", "hiking guide", "house cleaning",
+]
+
+DESCRIPTIONS = [
+    None,
+    "Quiet room close to the old town, good for remote work.",
+    "Looking for a few nights while I explore the area.",
+    "Happy to share meals and show you around.",
+    "Flexible dates, reply with what you can offer.",
+]
+
+STATUSES = ("Pending", "Accepted", "Rejected")
+STATUS_WEIGHTS = (0.6, 0.25, 0.15)
+
+
+def zipf_cum_weights(n, skew):
+    """Cumulative Zipf weights for random.choices over n ranked items."""
+    return list(itertools.accumulate(1.0 / (rank + 1) ** skew for rank in range(n)))
+
+
+def _batches(total, size):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+class DataSeeder:
+    def __init__(self, engine, user_table, trip_table, swap_table, interaction_table,
+                 search=None, seed=42, batch_size=10000):
+        self.engine = engine
+        self.users, self.trips, self.swaps, self.interactions = user_table, trip_table, swap_table, interaction_table
+        self.search = search  # ListingSearch, to index each batch of trips in one go
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+
+    def _next_id(self, conn, table):
+        return conn.execute(select(func.coalesce(func.max(table.c.id), 0))).scalar() + 1
+
+    def run(self, users, trips, interactions, password_hash, destination_skew=1.1,
+            hot_users=10, hot_share=0.3, now=None, progress=None):
+        """Inserts the rows and returns the id ranges it used."""
+        rng = self.rng
+        now = now or datetime(2026, 1, 1)
+        with self.engine.connect() as conn:
+            first_user = self._next_id(conn, self.users)
+            first_trip = self._next_id(conn, self.trips)
+            first_interaction = self._next_id(conn, self.interactions)
+        hot_users = min(hot_users, users)
+        user_weights = zipf_cum_weights(users, 1.0)
+        destination_weights = zipf_cum_weights(len(DESTINATIONS), destination_skew)
+
+        for start, count in _batches(users, self.batch_size):
+            with self.engine.begin() as conn:
+                conn.execute(insert(self.users), [
+                    {
+                        "id": first_user + n,
+                        "username": f"user{first_user + n}",
+                        "email": f"user{first_user + n}@example.com",
+                        "password_hash": password_hash,
+                        "created_at": now - timedelta(days=rng.uniform(30, 730)),
+                    }
+                    for n in range(start, start + count)
+                ])
+            if progress:
+                progress("users", start + count, users)
+
+        # Owner of every seeded trip, to address interactions to the right recipient
+        owners = array("l")
+        hot_trips = array("l")
+        for start, count in _batches(trips, self.batch_size):
+            owner_ranks = rng.choices(range(users), cum_weights=user_weights, k=count)
+            destinations = rng.choices(DESTINATIONS, cum_weights=destination_weights, k=count)
+            trip_rows, swap_rows = [], []
+            for n in range(count):
+                trip_id = first_trip + start + n
+                # Hot users are guaranteed listings for their interactions to land on
+                rank = (start + n) % hot_users if start + n < hot_users * 5 else owner_ranks[n]
+                user_id = first_user + rank
+                starts_on = date(2026, 1, 1) + timedelta(days=rng.randrange(365))
+                created_at = now - timedelta(seconds=rng.uniform(0, 365 * 86400))
+                offered, wanted = rng.sample(SKILLS, 2)
+                owners.append(user_id)
+                if rank < hot_users:
+                    hot_trips.append(trip_id)
+                trip_rows.append({
+                    "id": trip_id,
+                    "destination": destinations[n],
+                    "start_date": starts_on,
+                    "end_date": starts_on + timedelta(days=rng.randint(2, 30)),
+                    "description": rng.choice(DESCRIPTIONS),
+                    "is_accommodation_offer": rng.random() < 0.4,
+                    "user_id": user_id,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                })
+                swap_rows.append({
+                    "skill_offered": offered,
+                    "skill_wanted": wanted,
+                    "user_id": user_id,
+                    "trip_id": trip_id,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                })
+            with self.engine.begin() as conn:
+                with self.search.bulk_insert(conn) if self.search else nullcontext():
+                    conn.execute(insert(self.trips), trip_rows)
+                    conn.execute(insert(self.swaps), swap_rows)
+            if progress:
+                progress("trips", start + count, trips)
+
+        for start, count in _batches(interactions if trips else 0, self.batch_size):
+            statuses = rng.choices(STATUSES, weights=STATUS_WEIGHTS, k=count)
+            rows = []
+            for n in range(count):
+                if hot_trips and rng.random() < hot_share:
+                    trip_id = rng.choice(hot_trips)
+                else:
+                    trip_id = first_trip + rng.randrange(trips)
+                recipient_id = owners[trip_id - first_trip]
+                sender_id = first_user + rng.randrange(users)
+                if sender_id == recipient_id:
+                    sender_id = first_user + (sender_id - first_user + 1) % users
+                created_at = now - timedelta(seconds=rng.uniform(0, 180 * 86400))
+                rows.append({
+                    "id": first_interaction + start + n,
+                    "trip_id": trip_id,
+                    "sender_id": sender_id,
+                    "recipient_id": recipient_id,
+                    "message": "Hi! Is this still available?",
+                    "status": statuses[n],
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                })
+            with self.engine.begin() as conn:
+                conn.execute(insert(self.interactions), rows)
+            if progress:
+                progress("interactions", start + count, interactions)
+
+        with self.engine.begin() as conn:
+            _sync_sequences(conn, [self.users, self.trips, self.swaps, self.interactions])
+        return {
+            "users": (first_user, first_user + users - 1),
+            "trips": (first_trip, first_trip + trips - 1),
+            "hot_users": (first_user, first_user + hot_users - 1),
+        }
+
+
+def _sync_sequences(conn, tables):
+    """Explicit ids bypass PostgreSQL sequences; move them past the new rows."""
+    if conn.dialect.name != "postgresql":
+        return
+    for table in tables:
+        conn.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', 'id'), "
+            f"(SELECT coalesce(max(id), 1) FROM \"{table.name}\"))"
+        )
@@ -0,0 +1,110 @@
+"""
+SQLite production profile.
+
+SQLite's defaults are tuned for a single-process desktop app. With several
+gunicorn workers we want:
+
+  * WAL journal mode, so readers never block the writer and vice versa;
+  * synchronous=NORMAL (safe with WAL), a larger page cache and mmap;
+  * busy_timeout, so a writer waits for the lock instead of failing;
+  * a single-writer path. Transactions start deferred (plain BEGIN), so pure
+    reads never take the write lock. The first write or DDL statement of a
+    transaction first takes this process's writer lock, then ends the read
+    snapshot and reopens the transaction with BEGIN IMMEDIATE. A deferred
+    transaction that has already read can't safely upgrade its lock: SQLite
+    fails it at once with "database is locked" (SQLITE_BUSY_SNAPSHOT) and never
+    calls the busy handler. Taking the write lock up front lets busy_timeout
+    queue writers behind each other across workers. The in-process lock makes
+    threads of one worker wait in line instead of polling the file.
+
+Reads before the first write see a snapshot taken earlier, which gives read
+committed semantics rather than serializable ones. The views re-check
+ownership and state on the objects they write, which is all they rely on.
+"""
+import threading
+
+from sqlalchemy import event
+
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,        # ms
+    "cache_size": -64000,        # KiB (negative = size, not pages): ~64 MB
+    "mmap_size": 268435456,      # 256 MB
+    "temp_store": "MEMORY",
+}
+
+# Schema changes take the write lock too (migrations, bulk loads suspending triggers)
+WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER")
+
+
+def configure_engine(engine, pragmas):
+    """Applies the pragmas and the single-writer path to an SQLite engine."""
+    writer_lock = threading.Lock()
+
+    def release(info):
+        if info.pop("sqlite_writer", False):
+            writer_lock.release()
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        # Take over transaction control from pysqlite so the events below decide
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get("sqlite_writer") or not statement.lstrip()[:7].upper().startswith(WRITE_PREFIXES):
+            return
+        if not conn.in_transaction():
+            return
+        writer_lock.acquire()
+        conn.info["sqlite_writer"] = True
+        try:
+            # Straight to the DBAPI connection: these must not re-enter SQLAlchemy events
+            raw = conn.connection.dbapi_connection
+            raw.execute("COMMIT")
+            raw.execute("BEGIN IMMEDIATE")
+        except Exception:
+            release(conn.info)
+            raise
+
+    @event.listens_for(engine, "commit")
+    def _on_commit(conn):
+        release(conn.info)
+
+    @event.listens_for(engine, "rollback")
+    def _on_rollback(conn):
+        release(conn.info)
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        # Safety net: never keep the writer lock once the connection is returned
+        release(connection_record.info)
+
+    return engine
+
+
+class SQLiteProfile:
+    def __init__(self, app=None, db=None):
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.config.setdefault("SQLITE_PROFILE", "production")
+        app.config.setdefault("SQLITE_PRAGMAS", {})
+
+        if app.config["SQLITE_PROFILE"] != "production":
+            return
+        pragmas = {**DEFAULT_PRAGMAS, **app.config["SQLITE_PRAGMAS"]}
+        with app.app_context():
+            for engine in db.engines.values():
+                if engine.dialect.name == "sqlite":
+                    configure_engine(engine, pragmas)
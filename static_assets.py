@@ -0,0 +1,282 @@
+"""
+Self-hosted, fingerprinted and pre-compressed static assets.
+
+`flask vendor-assets` downloads the third-party files in VENDOR once, checks
+them against their pinned SRI hashes, and writes them to static/vendor/
+(commit them for offline or air-gapped builds). `flask build-assets` runs at
+deploy time. It vendors whatever is missing first, and fails the build if an
+asset can't be built, so a deploy never falls back to the CDN. For every
+entry in ASSETS it:
+
+  * purges CSS: drops every rule whose class selectors never appear in
+    templates/ (the way Tailwind scans its `content` files), keeping the
+    classes that scripts add at runtime (PURGE_SAFELIST);
+  * fingerprints the file name with a content hash (marketplace.3f9c2a1be07d.css);
+  * writes .gz and, when the optional `brotli` package is installed, .br
+    copies next to it;
+  * records logical name -> built file in static/dist/manifest.json.
+
+Templates call `asset_url("marketplace.css")`. With a manifest it points at
+the fingerprinted file. That file is served pre-compressed according to
+Accept-Encoding, with a one-year immutable Cache-Control: a new build
+changes the URL rather than the content. Without a build (development),
+`asset_url` falls back to the unprocessed source, or to the pinned CDN URL
+while a vendor file has not been downloaded yet.
+"""
+import base64
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import urllib.request
+from collections import namedtuple
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only .gz copies are written
+    brotli = None
+
+Asset = namedtuple("Asset", "source purge cdn")
+
+# Third-party files: path under static/ -> (URL, SRI hash)
+VENDOR = {
+    "vendor/bootstrap.min.css": (
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css",
+        "sha384-T3c6CoIi6uLrA9TneNEoa7RxnatzjcDSCmG1MXxSR1GAsXEV/Dwwykc2MPK8M2HN",
+    ),
+    "vendor/bootstrap.bundle.min.js": (
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js",
+        "sha384-C6RzsynM9kWDrMNeT87bh95OGNyZPhcTNXj1NW7RuBCsyN/o0jlpcV8Qyq46cDfL",
+    ),
+}
+
+# Logical name (what templates ask for) -> source under static/
+ASSETS = {
+    "bootstrap.css": Asset("vendor/bootstrap.min.css", purge=True, cdn=VENDOR["vendor/bootstrap.min.css"][0]),
+    "bootstrap.js": Asset("vendor/bootstrap.bundle.min.js", purge=False, cdn=VENDOR["vendor/bootstrap.bundle.min.js"][0]),
+    "marketplace.css": Asset("src/marketplace.css", purge=True, cdn=None),
+}
+
+# Classes that Bootstrap's JavaScript (collapse navbar, dismissible alerts)
+# and our own scripts add at runtime, so they never appear in a template
+PURGE_SAFELIST = {
+    "show", "showing", "hiding", "collapse", "collapsing", "collapsed", "fade", "active", "disabled",
+    "alert-dismissible", "alert-info", "alert-success", "alert-warning", "alert-danger", "alert-link",
+    "bg-success", "bg-danger", "bg-warning", "text-dark", "opacity-50",
+}
+
+COMPRESSIBLE = (".css", ".js", ".svg", ".json")
+DIST = "dist"
+MANIFEST = "manifest.json"
+
+_CLASS_CANDIDATE = re.compile(r"[A-Za-z0-9_:/.\-]+")
+_CLASS_SELECTOR = re.compile(r"\.((?:\\.|[A-Za-z0-9_\-])+)")
+_FUNCTIONAL_PSEUDO = re.compile(r":(?:not|is|where|has)\((?:[^()]|\([^()]*\))*\)")
+_STRING = re.compile(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')")
+
+
+# --- Build ---
+
+def template_classes(template_folder):
+    """Every token in the templates that could be a class name (over-inclusive on purpose)."""
+    found = set()
+    for root, _dirs, files in os.walk(template_folder):
+        for name in files:
+            if name.endswith((".html", ".jinja", ".js")):
+                with open(os.path.join(root, name), encoding="utf-8") as f:
+                    found.update(_CLASS_CANDIDATE.findall(f.read()))
+    return found
+
+
+def _split_top_level(text, separator=","):
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(text):
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def _selector_used(selector, used):
+    # :not(.x) / :is(.x, .y) never make a rule depend on a class being present
+    classes = _CLASS_SELECTOR.findall(_FUNCTIONAL_PSEUDO.sub("", selector))
+    return all(re.sub(r"\\(.)", r"\1", name) in used for name in classes)
+
+
+def _blocks(css):
+    """Yields (prelude, body) for each top-level statement; body is None for `@import ...;` style ones."""
+    i, length = 0, len(css)
+    while i < length:
+        start = i
+        while i < length and css[i] not in "{;":
+            if css[i] in "\"'":
+                i = css.index(css[i], i + 1)
+            i += 1
+        if i >= length:
+            break
+        prelude = css[start:i].strip()
+        if css[i] == ";":
+            yield prelude, None
+            i += 1
+            continue
+        depth, body_start = 1, i + 1
+        i += 1
+        while depth:
+            if css[i] in "\"'":
+                i = css.index(css[i], i + 1)
+            elif css[i] == "{":
+                depth += 1
+            elif css[i] == "}":
+                depth -= 1
+            i += 1
+        yield prelude, css[body_start:i - 1]
+
+
+def purge_css(css, used):
+    """Removes the rules (and selectors) that reference classes not in `used`, and minifies what is left."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    out = []
+    for prelude, body in _blocks(css):
+        if body is None:
+            out.append(prelude + ";")
+        elif prelude.startswith(("@media", "@supports", "@container", "@layer")):
+            inner = purge_css(body, used)
+            if inner:
+                out.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith("@"):
+            # @keyframes, @font-face, @page, ...: no class selectors to check
+            out.append(f"{prelude}{{{body.strip()}}}")
+        else:
+            selectors = [s.strip() for s in _split_top_level(prelude) if _selector_used(s, used)]
+            if selectors:
+                out.append(f"{','.join(selectors)}{{{_minify_declarations(body)}}}")
+    return "".join(out)
+
+
+def _minify_declarations(body):
+    # Quoted strings (content: "...", font names) are left untouched
+    parts = _STRING.split(body.strip())
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r"\s*([:;,])\s*", r"\1", re.sub(r"\s+", " ", parts[i]))
+    return "".join(parts).rstrip(";")
+
+
+def fingerprint(name, content):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def build(static_folder, template_folder, safelist=PURGE_SAFELIST):
+    """Builds every available asset into static/dist/ and returns the new manifest."""
+    dist = os.path.join(static_folder, DIST)
+    os.makedirs(dist, exist_ok=True)
+    used = template_classes(template_folder) | set(safelist)
+    manifest = {}
+    for name, asset in ASSETS.items():
+        source = os.path.join(static_folder, asset.source)
+        if not os.path.exists(source):
+            continue  # Not vendored yet: asset_url keeps using the CDN
+        with open(source, "rb") as f:
+            content = f.read()
+        if asset.purge:
+            content = purge_css(content.decode("utf-8"), used).encode("utf-8")
+        built = fingerprint(name, content)
+        _write(os.path.join(dist, built), content)
+        if built.endswith(COMPRESSIBLE):
+            # mtime=0: the same input always gives byte-identical output
+            _write(os.path.join(dist, built + ".gz"), gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write(os.path.join(dist, built + ".br"), brotli.compress(content, quality=11))
+        manifest[name] = built
+    _write(os.path.join(dist, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+
+def vendor(static_folder):
+    """Downloads the VENDOR files that are missing and checks them against their SRI hashes."""
+    fetched = []
+    for path, (url, integrity) in VENDOR.items():
+        target = os.path.join(static_folder, path)
+        if os.path.exists(target):
+            continue
+        with urllib.request.urlopen(url, timeout=30) as response:
+            content = response.read()
+        algorithm, expected = integrity.split("-", 1)
+        actual = base64.b64encode(hashlib.new(algorithm, content).digest()).decode()
+        if actual != expected:
+            raise ValueError(f"{url}: integrity mismatch (expected {integrity}, got {algorithm}-{actual})")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        _write(target, content)
+        fetched.append(path)
+    return fetched
+
+
+def _write(path, content):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+# --- Serving ---
+
+class StaticAssets:
+    def __init__(self, app=None):
+        self.manifest = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("ASSETS_MANIFEST", os.path.join(app.static_folder, DIST, MANIFEST))
+        app.config.setdefault("ASSETS_MAX_AGE", 365 * 24 * 3600)
+        self.app = app
+        self.dist = os.path.join(app.static_folder, DIST)
+        self.max_age = app.config["ASSETS_MAX_AGE"]
+        self.reload()
+        # More specific than Flask's /static/<path:filename>, so it wins for dist/
+        app.add_url_rule(f"{app.static_url_path}/{DIST}/<path:filename>", "assets", self.send_asset)
+        app.add_template_global(self.asset_url)
+        app.extensions["static_assets"] = self
+
+    def reload(self):
+        try:
+            with open(self.app.config["ASSETS_MANIFEST"], encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {}
+
+    def asset_url(self, name):
+        """URL of a logical asset: the built file if there is one, else its source or CDN."""
+        built = self.manifest.get(name)
+        if built is not None:
+            return url_for("assets", filename=built)
+        asset = ASSETS[name]
+        if asset.cdn and not os.path.exists(os.path.join(self.app.static_folder, asset.source)):
+            return asset.cdn
+        return url_for("static", filename=asset.source)
+
+    def send_asset(self, filename):
+        """A built file, pre-compressed when the client accepts it, cached for good."""
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        encoding = None
+        for candidate, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if candidate in request.accept_encodings and os.path.exists(os.path.join(self.dist, filename + suffix)):
+                encoding = candidate
+                filename += suffix
+                break
+        response = send_from_directory(self.dist, filename, mimetype=mimetype, max_age=self.max_age)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.headers["Vary"] = "Accept-Encoding"
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
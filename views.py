@@ -0,0 +1,1043 @@
+"""
+The pages and JSON endpoints, on the `main` blueprint that create_app()
+registers. Endpoints are named `main.<view>` (url_for('main.trips')).
+"""
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify, abort, Response, stream_with_context
+from datetime import datetime, date
+from collections import namedtuple
+from functools import wraps
+import hmac
+import json
+import logging
+
+from markupsafe import Markup
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.orm import joinedload
+from flask_login import login_user, login_required, logout_user, current_user
+
+from pagination import keyset_page
+from routing import READ_METHODS, use_primary
+from passwords import HashingBusy
+from conditional import conditional
+from exports import EXPORT_FORMATS
+from counters import STATUS_COLUMNS
+from extensions import (
+    db, login_manager, password_hasher, request_profiler, identity_cache, listing_search, skill_matcher,
+    fragment_cache, bulk_exporter, notifications, jobs, dashboard_counters,
+)
+from models import User, Trip, SkillSwap, Interaction
+from forms import RegistrationForm, LoginForm, ListingForm, InteractionForm, BulkStatusForm
+
+bp = Blueprint("main", __name__)
+
+
+# --- USER LOADER FOR FLASK-LOGIN ---
+@login_manager.user_loader
+def load_user(user_id):
+    """
+    Callback function used by Flask-Login to reload the user object from the session.
+    Returns an immutable UserSnapshot, served from the identity cache when warm.
+    A user deleted or changed through another worker can still read pages here
+    for up to IDENTITY_CACHE_TTL seconds (5); writes always check the current row.
+    """
+    return identity_cache.get_or_load(
+        int(user_id), lambda uid: db.session.get(User, uid), fresh=request.method not in READ_METHODS
+    )
+
+
+# --- BACKGROUND JOBS ---
+audit_log = logging.getLogger("globeswap.audit")
+
+@jobs.task("audit")
+def audit_job(payload, key):
+    """Writes one structured audit log line per listing or interaction change."""
+    audit_log.info(json.dumps(payload, sort_keys=True))
+
+def audit(event, key=None, **fields):
+    """Queues an audit entry in the current transaction (commits with the change itself)."""
+    payload = {"event": event, "user_id": current_user.id, "at": datetime.utcnow().isoformat(), **fields}
+    jobs.enqueue("audit", payload, key=key)
+
+def audit_status_change(interaction_id, old_status, new_status, changed_at):
+    """
+    Audits one status transition. The key names the transition and the
+    updated_at it wrote, so a replayed enqueue collapses into one job while
+    a later transition to the same status (Accepted -> Rejected -> Accepted)
+    gets its own.
+    """
+    audit(
+        "interaction.status_changed",
+        key=f"interaction:{interaction_id}:{old_status}->{new_status}:{changed_at.isoformat()}",
+        interaction_id=interaction_id, old_status=old_status, status=new_status
+    )
+
+
+# --- APPLICATION ROUTES ---
+
+# Error Handlers
+@bp.app_errorhandler(404)
+def not_found_error(error):
+    return render_template('404.html'), 404
+
+@bp.app_errorhandler(500)
+def internal_error(error):
+    db.session.rollback()
+    return render_template('500.html'), 500
+
+@bp.app_errorhandler(HashingBusy)
+def hashing_busy_error(error):
+    # Shed load quickly instead of queueing behind a login spike
+    return render_template('503.html'), 503, {"Retry-After": "2"}
+
+@bp.route("/")
+def home():
+    """Renders the home page."""
+    return render_template("index.html")
+
+# --- AUTHENTICATION ROUTES ---
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    """Handles user registration."""
+    if current_user.is_authenticated:
+        return redirect(url_for('main.home'))
+    
+    form = RegistrationForm()
+    if form.validate_on_submit():
+        user = User(username=form.username.data, email=form.email.data)
+        user.set_password(form.password.data)
+        db.session.add(user)
+        db.session.commit()
+        flash('Congratulations, you are now a registered user!', 'success')
+        return redirect(url_for('main.login'))
+    
+    return render_template('register.html', form=form)
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    """Handles user login."""
+    if current_user.is_authenticated:
+        return redirect(url_for('main.home'))
+    
+    form = LoginForm()
+    if form.validate_on_submit():
+        user = User.query.filter_by(username=form.username.data).first()
+        
+        if user is None or not user.check_password(form.password.data):
+            flash('Invalid username or password', 'danger')
+            return redirect(url_for('main.login'))
+
+        # Upgrade hashes made with an older method or cost while we have the password
+        if password_hasher.needs_rehash(user.password_hash):
+            user.set_password(form.password.data)
+            db.session.commit()
+        
+        login_user(user)
+        flash('Login successful!', 'success')
+        
+        next_page = request.args.get('next')
+        return redirect(next_page or url_for('main.dashboard'))
+    
+    return render_template('login.html', form=form)
+
+@bp.route('/logout')
+@login_required
+def logout():
+    """Logs the current user out."""
+    logout_user()
+    flash('You have been logged out.', 'info')
+    return redirect(url_for('main.home'))
+
+# --- PERSONAL CABINET (DASHBOARD) ROUTE ---
+
+DASHBOARD_SECTIONS = ("listings", "received", "sent")
+
+def dashboard_page(section, cursor=None, status=None):
+    """
+    One page of a dashboard section for the current user, newest first:
+    (rows, next_cursor). `status` narrows the received/sent sections.
+    """
+    per_page = current_app.config["DASHBOARD_PAGE_SIZE"]
+    if section == "listings":
+        query = Trip.query.options(joinedload(Trip.skillswap)).filter_by(user_id=current_user.id)
+        return keyset_page(query, Trip.created_at, Trip.id, cursor, per_page)
+
+    # The cards show the trip and the other party for every interaction,
+    # so load them in the same query instead of one lazy SELECT per row.
+    query = Interaction.query.options(
+        joinedload(Interaction.trip),
+        joinedload(Interaction.sender),
+        joinedload(Interaction.recipient)
+    )
+    if section == "received":
+        # Requests made on the user's listings
+        query = query.filter_by(recipient_id=current_user.id)
+    else:
+        # Requests the user has made on others' listings
+        query = query.filter_by(sender_id=current_user.id)
+    if status:
+        query = query.filter_by(status=status)
+    return keyset_page(query, Interaction.created_at, Interaction.id, cursor, per_page)
+
+def dashboard_total(summary, section, status=None):
+    """Size of a (filtered) dashboard section, read from the user's summary row."""
+    if section == "listings":
+        return summary.listing_count
+    if status:
+        return getattr(summary, f"{section}_{STATUS_COLUMNS[status]}")
+    return getattr(summary, f"{section}_total")
+
+def listing_matches(trips):
+    """Suggested swap partners for each listing, with the matched trips loaded in a single query."""
+    matches = {trip.id: skill_matcher.matches_for(trip.id) for trip in trips}
+    matched_ids = {match.trip_id for found in matches.values() for match in found}
+    matched_trips = {}
+    if matched_ids:
+        matched_trips = {
+            trip.id: trip
+            for trip in Trip.query.options(joinedload(Trip.user)).filter(Trip.id.in_(matched_ids))
+        }
+    return matches, matched_trips
+
+def interaction_to_dict(interaction):
+    """JSON representation of an interaction (expects trip, sender and recipient to be loaded)."""
+    return {
+        "id": interaction.id,
+        "trip_id": interaction.trip_id,
+        "destination": interaction.trip.destination,
+        "sender": interaction.sender.username,
+        "recipient": interaction.recipient.username,
+        "message": interaction.message,
+        "status": interaction.status,
+        "created_at": interaction.created_at.isoformat(),
+        "updated_at": interaction.updated_at.isoformat() if interaction.updated_at else None,
+    }
+
+@bp.route("/dashboard")
+@login_required
+def dashboard():
+    """
+    Personal Cabinet: Displays the user's trips, skill swaps, 
+    and received/sent interactions.
+
+    Only the first page of each section is rendered here; the page fetches
+    the rest from /dashboard/<section>.json. The links also work without
+    JavaScript: each section keeps its own cursor (`listings_after` /
+    `received_after` / `sent_after`) and status filter (`received_status` /
+    `sent_status`). Section totals come from the user's summary row.
+    """
+    summary = dashboard_counters.for_user(current_user.id)
+    sections = {}
+    for section in DASHBOARD_SECTIONS:
+        status = request.args.get(f"{section}_status")
+        if section == "listings" or status not in STATUS_COLUMNS:
+            status = None
+        rows, next_cursor = dashboard_page(section, request.args.get(f"{section}_after"), status)
+        next_url = None
+        if next_cursor:
+            # Keep the other sections' position and filters in the link
+            args = request.args.to_dict()
+            args[f"{section}_after"] = next_cursor
+            next_url = url_for("main.dashboard", **args)
+        sections[section] = {
+            "rows": rows,
+            "status": status,
+            "total": dashboard_total(summary, section, status),
+            "next": next_cursor,
+            "next_url": next_url,
+        }
+    matches, matched_trips = listing_matches(sections["listings"]["rows"])
+
+    return render_template(
+        "dashboard.html",
+        summary=summary,
+        sections=sections,
+        statuses=list(STATUS_COLUMNS),
+        bulk_form=BulkStatusForm(),
+        matches=matches,
+        matched_trips=matched_trips,
+        live_notifications=notifications.enabled
+    )
+
+@bp.route("/dashboard/<section>.json")
+@login_required
+def dashboard_json(section):
+    """
+    Keyset-paginated feed of one dashboard section (`listings`, `received`
+    or `sent`) with an `after` cursor. `status` (Pending, Accepted or
+    Rejected) narrows the received and sent sections. Each item carries its
+    data and its rendered card (`html`).
+    """
+    if section not in DASHBOARD_SECTIONS:
+        abort(404)
+    status = request.args.get("status") or None
+    if status is not None and (section == "listings" or status not in STATUS_COLUMNS):
+        return jsonify(error=f"Invalid status. Use one of: {', '.join(STATUS_COLUMNS)}."), 400
+
+    rows, next_cursor = dashboard_page(section, request.args.get("after"), status)
+    bulk_form = BulkStatusForm()
+    if section == "listings":
+        matches, matched_trips = listing_matches(rows)
+        items = [
+            {
+                "id": trip.id,
+                "destination": trip.destination,
+                "start_date": trip.start_date.isoformat(),
+                "end_date": trip.end_date.isoformat(),
+                "is_accommodation_offer": trip.is_accommodation_offer,
+                "interaction_count": trip.interaction_count,
+                "created_at": trip.created_at.isoformat(),
+                "html": render_template(
+                    "_dashboard_listing.html", trip=trip, matches=matches, matched_trips=matched_trips, bulk_form=bulk_form
+                ),
+            }
+            for trip in rows
+        ]
+    else:
+        template = f"_dashboard_{section}.html"
+        items = [
+            {**interaction_to_dict(interaction), "html": render_template(template, interaction=interaction)}
+            for interaction in rows
+        ]
+    total = dashboard_total(dashboard_counters.for_user(current_user.id), section, status)
+    return jsonify(items=items, next=next_cursor, total=total)
+
+# --- INTERACTION/BOOKING ROUTES ---
+
+@bp.route("/notifications/stream")
+@login_required
+def notification_stream():
+    """Server-Sent Events: new requests on the user's listings and status changes of their requests."""
+    if not notifications.enabled:
+        return render_template('404.html'), 404
+    return Response(
+        notifications.stream(current_user.id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@bp.route("/interact/<int:trip_id>", methods=["GET", "POST"])
+@login_required
+def interact_with_listing(trip_id):
+    """Handles a user sending an interaction/booking request for a trip."""
+    trip = db.session.get(Trip, trip_id)
+    
+    if not trip:
+        return render_template('404.html'), 404
+    
+    # Prevent users from interacting with their own listing
+    if trip.user_id == current_user.id:
+        flash("You cannot send a request for your own listing!", "warning")
+        return redirect(url_for('main.trips'))
+
+    form = InteractionForm()
+    if form.validate_on_submit():
+        try:
+            new_interaction = Interaction(
+                trip_id=trip.id,
+                sender_id=current_user.id,
+                recipient_id=trip.user_id,
+                message=form.message.data,
+                status="Pending"
+            )
+            db.session.add(new_interaction)
+            db.session.flush()
+            audit("interaction.created", interaction_id=new_interaction.id, trip_id=trip.id, recipient_id=trip.user_id)
+            db.session.commit()
+            notifications.publish(trip.user_id, {
+                "type": "interaction",
+                "id": new_interaction.id,
+                "trip_id": trip.id,
+                "destination": trip.destination,
+                "sender": current_user.username,
+                "message": new_interaction.message
+            })
+            flash("Your request has been sent! Check your Dashboard for updates.", "success")
+            return redirect(url_for('main.trips'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Error sending request: {e}", "danger")
+            return redirect(url_for('main.trips'))
+
+    return render_template("interact.html", trip=trip, form=form)
+
+
+@bp.route("/interaction/update/<int:interaction_id>/<new_status>")
+@login_required
+@use_primary
+def update_interaction_status(interaction_id, new_status):
+    """Allows the recipient of a request to update its status (Accept/Reject)."""
+    interaction = db.session.get(Interaction, interaction_id)
+    
+    if not interaction:
+        return render_template('404.html'), 404
+
+    # Security check: Only the recipient can update the status
+    if interaction.recipient_id != current_user.id:
+        flash("Unauthorized action.", "danger")
+        return redirect(url_for('main.dashboard'))
+
+    # Validate status
+    if new_status in ["Accepted", "Rejected"] and interaction.status == new_status:
+        flash(f"Request is already {new_status}.", "info")
+    elif new_status in ["Accepted", "Rejected"]:
+        try:
+            old_status = interaction.status
+            interaction.status = new_status
+            db.session.flush()  # Sets updated_at, part of the audit key
+            audit_status_change(interaction.id, old_status, new_status, interaction.updated_at)
+            db.session.commit()
+            notifications.publish(interaction.sender_id, {
+                "type": "status",
+                "id": interaction.id,
+                "status": new_status,
+                "destination": interaction.trip.destination
+            })
+            flash(f"Request status updated to {new_status}!", "success")
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Error updating status: {e}", "danger")
+    else:
+        flash("Invalid status update.", "danger")
+
+    return redirect(url_for('main.dashboard'))
+
+def set_interaction_statuses(new_status, interaction_ids=(), trip_id=None):
+    """
+    Moves the current user's received requests to `new_status` with one
+    set-based UPDATE: the given ids, or every pending request on `trip_id`.
+    Returns ({id: outcome}, [(id, sender_id, destination)] of changed rows).
+    Rows are only updated while they still have the status read beforehand,
+    so the counter deltas stay exact under concurrent changes ("conflict").
+    Each change is audited like a single update.
+    """
+    interactions, trips = Interaction.__table__, Trip.__table__
+    results = {}
+    if trip_id is not None:
+        candidates = {}
+        guard = (interactions.c.trip_id == trip_id) & (interactions.c.status == "Pending")
+    else:
+        rows = db.session.execute(
+            select(
+                interactions.c.id, interactions.c.sender_id, interactions.c.recipient_id,
+                interactions.c.status, trips.c.destination
+            )
+            .join(trips, trips.c.id == interactions.c.trip_id)
+            .where(interactions.c.id.in_(interaction_ids))
+        ).all()
+        found = {row.id: row for row in rows}
+        candidates = {}
+        for interaction_id in interaction_ids:
+            row = found.get(interaction_id)
+            if row is None:
+                results[interaction_id] = "not_found"
+            # Security check: Only the recipient can update the status
+            elif row.recipient_id != current_user.id:
+                results[interaction_id] = "forbidden"
+            elif row.status == new_status:
+                results[interaction_id] = "unchanged"
+            else:
+                candidates[interaction_id] = row
+        if not candidates:
+            return results, []
+        guard = tuple_(interactions.c.id, interactions.c.status).in_([(row.id, row.status) for row in candidates.values()])
+
+    changed = db.session.execute(
+        update(interactions)
+        .where(guard, interactions.c.recipient_id == current_user.id)
+        .values(status=new_status)
+        .returning(interactions.c.id, interactions.c.sender_id, interactions.c.updated_at)
+    ).all()
+    if trip_id is not None:
+        destination = db.session.execute(select(trips.c.destination).where(trips.c.id == trip_id)).scalar()
+        old_statuses = {row.id: "Pending" for row in changed}
+        destinations = {row.id: destination for row in changed}
+    else:
+        old_statuses = {row.id: candidates[row.id].status for row in changed}
+        destinations = {row.id: candidates[row.id].destination for row in changed}
+
+    # A Core UPDATE fires no flush events: adjust the dashboard counters here
+    dashboard_counters.record_status_changes(db.session, [
+        (row.sender_id, current_user.id, old_statuses[row.id], new_status) for row in changed
+    ])
+    for row in changed:
+        results[row.id] = "updated"
+        audit_status_change(row.id, old_statuses[row.id], new_status, row.updated_at)
+    for interaction_id in candidates:
+        # Changed by another request between the read and the UPDATE
+        results.setdefault(interaction_id, "conflict")
+    return results, [(row.id, row.sender_id, destinations[row.id]) for row in changed]
+
+@bp.route("/interactions/status", methods=["POST"])
+@login_required
+@use_primary
+def bulk_update_interaction_status():
+    """
+    Accepts or rejects many requests in one transaction: the ids in
+    `interaction_ids`, or every pending request on `trip_id`. Only the
+    recipient may change a request. JSON clients (Accept: application/json)
+    get a per-id outcome: updated, unchanged, conflict, forbidden or
+    not_found. Dashboard form posts get a flash message and a redirect.
+    """
+    form = BulkStatusForm()
+    wants_json = request.accept_mimetypes.best == "application/json"
+
+    def fail(message, code=400):
+        if wants_json:
+            return jsonify(error=message, fields=form.errors), code
+        flash(message, "danger")
+        return redirect(url_for('main.dashboard'))
+
+    if not form.validate_on_submit():
+        return fail("Invalid status update.")
+    interaction_ids = list(dict.fromkeys(form.interaction_ids.data or []))
+    trip_id = form.trip_id.data
+    if bool(interaction_ids) == (trip_id is not None):
+        return fail("Select some requests or one listing.")
+    if len(interaction_ids) > current_app.config["BULK_STATUS_MAX_IDS"]:
+        return fail(f"At most {current_app.config['BULK_STATUS_MAX_IDS']} requests can be updated at once.")
+    if trip_id is not None:
+        trip = db.session.get(Trip, trip_id)
+        if trip is None:
+            return fail("Listing not found.", 404)
+        if trip.user_id != current_user.id:
+            return fail("Unauthorized action.", 403)
+
+    new_status = form.status.data
+    try:
+        results, changed = set_interaction_statuses(new_status, interaction_ids, trip_id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return fail(f"Error updating status: {e}", 500)
+
+    for interaction_id, sender_id, destination in changed:
+        notifications.publish(sender_id, {
+            "type": "status",
+            "id": interaction_id,
+            "status": new_status,
+            "destination": destination
+        })
+    if wants_json:
+        return jsonify(
+            status=new_status,
+            updated=len(changed),
+            results={str(interaction_id): outcome for interaction_id, outcome in results.items()}
+        )
+    skipped = len(results) - len(changed)
+    flash(
+        f"{len(changed)} request{'' if len(changed) == 1 else 's'} updated to {new_status}!"
+        + (f" {skipped} skipped." if skipped else ""),
+        "success" if changed else "info"
+    )
+    return redirect(url_for('main.dashboard'))
+
+# --- CRUD ROUTES: UPDATE (EDIT) ---
+
+@bp.route("/listing/edit/<int:trip_id>", methods=["GET", "POST"])
+@login_required
+def edit_listing(trip_id):
+    """Handles the editing of an existing Trip listing and its associated SkillSwap."""
+    trip = db.session.get(Trip, trip_id)
+    
+    if not trip:
+        return render_template('404.html'), 404
+
+    # Security check: Only the owner can edit the listing
+    if trip.user_id != current_user.id:
+        flash("You are not authorized to edit this listing.", "danger")
+        return redirect(url_for('main.dashboard'))
+
+    # Access SkillSwap directly using the one-to-one relationship
+    swap = trip.skillswap
+    
+    # Pre-populate the form fields
+    # We pass the 'trip' object to populate the Trip-related fields
+    form = ListingForm(obj=trip)
+    
+    # Handle GET request: Pre-populate skill fields manually
+    if request.method == "GET" and swap:
+        # Pre-populate skills based on the stored SkillSwap record.
+        if trip.is_accommodation_offer:
+            # Host Offer: Host's WANT (skill_wanted) -> Form Input 1 ('offered_skill')
+            # Host's OFFER (skill_offered) -> Form Input 2 ('desired_skill')
+            form.offered_skill.data = swap.skill_wanted 
+            form.desired_skill.data = swap.skill_offered 
+        else: 
+            # Traveler Seek: Traveler's OFFER (skill_offered) -> Form Input 1 ('offered_skill')
+            # Traveler's WANT (skill_wanted) -> Form Input 2 ('desired_skill')
+            form.offered_skill.data = swap.skill_offered 
+            form.desired_skill.data = swap.skill_wanted
+
+
+    if request.method == "POST":
+        
+        if form.validate_on_submit():
+            try:
+                # 1. Update Trip details
+                trip.destination = form.destination.data
+                
+                # NEW: Update description
+                trip.description = form.description.data or None 
+
+                # Date fields still rely on manual parsing from string field data
+                start_date_str = form.start_date.data
+                end_date_str = form.end_date.data
+
+                start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
+                end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
+
+                if end_date <= start_date:
+                    flash("End date must be after the start date.", "danger")
+                    return render_template("edit_listing.html", form=form, trip=trip)
+                
+                trip.start_date = start_date
+                trip.end_date = end_date
+                
+                is_offer = form.is_accommodation_offer.data
+                trip.is_accommodation_offer = is_offer
+                
+                # 2. Update SkillSwap details
+                if swap: 
+                    if is_offer: # Host is OFFERING accommodation
+                        # Input 1 (form.offered_skill) holds Host's WANT
+                        # Input 2 (form.desired_skill) holds Host's OFFER
+                        swap.skill_offered = form.desired_skill.data 
+                        swap.skill_wanted = form.offered_skill.data  
+                    else: # Traveler is SEEKING accommodation
+                        # Input 1 (form.offered_skill) holds Traveler's OFFER
+                        # Input 2 (form.desired_skill) holds Traveler's WANT
+                        swap.skill_offered = form.offered_skill.data
+                        swap.skill_wanted = form.desired_skill.data 
+
+                # The card shows trip and swap together: any edit is a new version
+                trip.updated_at = datetime.utcnow()
+                audit("listing.updated", trip_id=trip.id)
+                db.session.commit()
+                skill_matcher.index_listing(trip, swap)
+                fragment_cache.invalidate("listing-card", trip.id)
+                flash("Listing updated successfully!", "success")
+                return redirect(url_for("main.dashboard"))
+
+            except ValueError:
+                flash("Invalid date format. Please use YYYY-MM-DD.", "danger")
+            except Exception as e:
+                db.session.rollback()
+                flash(f"An unexpected error occurred: {e}", "danger")
+                
+    
+    # GET request or POST failure
+    if isinstance(trip.start_date, date): 
+        form.start_date.data = trip.start_date.isoformat()
+    if isinstance(trip.end_date, date):
+        form.end_date.data = trip.end_date.isoformat()
+    
+    return render_template("edit_listing.html", form=form, trip=trip)
+
+# --- CRUD ROUTES: DELETE ---
+
+@bp.route("/listing/delete/<int:trip_id>", methods=["POST"])
+@login_required
+def delete_listing(trip_id):
+    """
+    Handles the deletion of a Trip listing. 
+    Associated SkillSwap and Interactions are automatically deleted due to cascade rules.
+    """
+    trip = db.session.get(Trip, trip_id)
+    
+    if not trip:
+        flash("Listing not found.", "danger")
+        return redirect(url_for('main.dashboard'))
+
+    # Security check: Only the owner can delete the listing
+    if trip.user_id != current_user.id:
+        flash("You are not authorized to delete this listing.", "danger")
+        return redirect(url_for('main.dashboard'))
+
+    try:
+        db.session.delete(trip)
+        audit("listing.deleted", trip_id=trip_id)
+        db.session.commit()
+        skill_matcher.remove_listing(trip_id)
+        fragment_cache.invalidate("listing-card", trip_id)
+        
+        flash("Listing and associated data successfully deleted.", "success")
+        return redirect(url_for('main.dashboard'))
+        
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Error deleting listing: {e}", "danger")
+        return redirect(url_for('main.dashboard'))
+
+
+# --- MARKETPLACE & LISTING ROUTES ---
+
+ListingCard = namedtuple("ListingCard", "id user_id html")
+
+def listings_watermark(*args, **kwargs):
+    """
+    Version of everything the marketplace shows: the trip count (catches
+    deletions) and the newest trip/swap updated_at, all answered from indexes.
+    """
+    count, trips_changed, swaps_changed = db.session.query(
+        func.count(Trip.id),
+        func.max(Trip.updated_at),
+        db.session.query(func.max(SkillSwap.updated_at)).scalar_subquery()
+    ).one()
+    last_modified = max(filter(None, (trips_changed, swaps_changed)), default=None)
+    return f"{count}|{trips_changed}|{swaps_changed}", last_modified
+
+def listing_watermark(trip_id):
+    """Version of a single listing, or None if it doesn't exist."""
+    row = db.session.query(Trip.updated_at, SkillSwap.updated_at).outerjoin(
+        SkillSwap, SkillSwap.trip_id == Trip.id
+    ).filter(Trip.id == trip_id).first()
+    if row is None:
+        return None
+    last_modified = max(filter(None, row), default=None)
+    return f"{row[0]}|{row[1]}", last_modified
+
+def listing_cards(rows):
+    """
+    Builds marketplace cards for a page of (id, user_id, updated_at) rows. The
+    shared card body comes from the fragment cache, keyed by trip id and
+    updated_at; only the missing ones are loaded and rendered. The per-user
+    action buttons are rendered by marketplace.html.
+    """
+    versions = {row.id: row.updated_at for row in rows}
+    bodies = fragment_cache.get_many("listing-card", versions)
+    missing = [trip_id for trip_id in versions if trip_id not in bodies]
+    if missing:
+        # Every card shows the swap and the poster's username: load them with the trips
+        fresh = {
+            trip.id: render_template("_listing_card.html", trip=trip)
+            for trip in Trip.query.options(joinedload(Trip.skillswap), joinedload(Trip.user)).filter(Trip.id.in_(missing))
+        }
+        fragment_cache.set_many("listing-card", {trip_id: (versions[trip_id], html) for trip_id, html in fresh.items()})
+        bodies.update(fresh)
+    return [ListingCard(row.id, row.user_id, Markup(bodies[row.id])) for row in rows if row.id in bodies]
+
+def listing_filters(args):
+    """Reads the marketplace filters from the query string."""
+    return {
+        "destination": args.get("destination", "").strip(),
+        "date_from": args.get("date_from", "").strip(),
+        "date_to": args.get("date_to", "").strip(),
+        "type": args.get("type", ""),
+    }
+
+def without_invalid_dates(filters):
+    """The filters with any malformed date left out, and whether there was one."""
+    valid, invalid = dict(filters), False
+    for key in ("date_from", "date_to"):
+        try:
+            if valid[key]:
+                datetime.strptime(valid[key], "%Y-%m-%d")
+        except ValueError:
+            valid[key], invalid = "", True
+    return valid, invalid
+
+def filter_listings(query, filters):
+    """Applies the marketplace filters to a Trip query. Raises ValueError on a malformed date."""
+    if filters["destination"]:
+        query = query.filter(Trip.destination.istartswith(filters["destination"], autoescape=True))
+    # A listing matches the window when its date range overlaps it
+    if filters["date_from"]:
+        date_from = datetime.strptime(filters["date_from"], "%Y-%m-%d").date()
+        query = query.filter(Trip.end_date >= date_from)
+    if filters["date_to"]:
+        date_to = datetime.strptime(filters["date_to"], "%Y-%m-%d").date()
+        query = query.filter(Trip.start_date <= date_to)
+    return query
+
+def trip_to_dict(trip):
+    """JSON representation of a listing (expects skillswap and user to be loaded)."""
+    swap = trip.skillswap
+    return {
+        "id": trip.id,
+        "destination": trip.destination,
+        "start_date": trip.start_date.isoformat(),
+        "end_date": trip.end_date.isoformat(),
+        "description": trip.description,
+        "is_accommodation_offer": trip.is_accommodation_offer,
+        "skill_offered": swap.skill_offered if swap else None,
+        "skill_wanted": swap.skill_wanted if swap else None,
+        "posted_by": trip.user.username,
+        "created_at": trip.created_at.isoformat(),
+        "updated_at": trip.updated_at.isoformat() if trip.updated_at else None,
+        "url": url_for("main.listing_detail", trip_id=trip.id, _external=True),
+    }
+
+@bp.route("/trips")
+@conditional(listings_watermark)
+def trips():
+    """
+    The marketplace route. Fetches and displays both trip requests and 
+    accommodation offers (SkillShares).
+
+    Each section is keyset-paginated on (created_at, id) with its own cursor
+    (`offers_after` / `requests_after`), so deep pages cost the same as the
+    first one. Optional filters: `destination` (prefix match), `date_from` /
+    `date_to` (listings overlapping the window) and `type` (offers/requests).
+    """
+    per_page = current_app.config["MARKETPLACE_PAGE_SIZE"]
+    # A malformed date is ignored on its own; the other filters still apply
+    filters, invalid_date = without_invalid_dates(listing_filters(request.args))
+    if invalid_date:
+        flash("Invalid date filter. Please use YYYY-MM-DD.", "danger")
+
+    # The page query only needs ids; card bodies come from the fragment cache
+    base_query = filter_listings(
+        db.session.query(Trip.id, Trip.user_id, Trip.created_at, Trip.updated_at), filters
+    )
+
+    def section(is_offer, cursor_arg):
+        cursor = request.args.get(cursor_arg)
+        rows, next_cursor = keyset_page(
+            base_query.filter(Trip.is_accommodation_offer == is_offer),
+            Trip.created_at, Trip.id, cursor, per_page
+        )
+        items = listing_cards(rows)
+        next_url = None
+        if next_cursor:
+            # Keep the filters and the other section's position in the link
+            args = request.args.to_dict()
+            args[cursor_arg] = next_cursor
+            next_url = url_for("main.trips", **args)
+        return items, next_url
+
+    # 1. Trip requests (is_accommodation_offer = False)
+    trip_requests, next_requests_url = [], None
+    if filters["type"] != "offers":
+        trip_requests, next_requests_url = section(False, "requests_after")
+
+    # 2. Accommodation offers (is_accommodation_offer = True)
+    accommodation_offers, next_offers_url = [], None
+    if filters["type"] != "requests":
+        accommodation_offers, next_offers_url = section(True, "offers_after")
+
+    return render_template(
+        "marketplace.html", 
+        requests=trip_requests,
+        accommodation_offers=accommodation_offers,
+        next_requests_url=next_requests_url,
+        next_offers_url=next_offers_url,
+        filters=filters
+    )
+
+@bp.route("/trips.json")
+@conditional(listings_watermark)
+def trips_json():
+    """
+    JSON feed of one marketplace section (`type=offers` or `type=requests`,
+    default offers), with the same filters as /trips and an `after` cursor.
+    """
+    filters = listing_filters(request.args)
+    is_offer = filters["type"] != "requests"
+    query = Trip.query.options(joinedload(Trip.skillswap), joinedload(Trip.user)).filter(
+        Trip.is_accommodation_offer == is_offer
+    )
+    try:
+        query = filter_listings(query, filters)
+    except ValueError:
+        return jsonify(error="Invalid date filter. Please use YYYY-MM-DD."), 400
+
+    items, next_cursor = keyset_page(
+        query, Trip.created_at, Trip.id, request.args.get("after"), current_app.config["MARKETPLACE_PAGE_SIZE"]
+    )
+    return jsonify(items=[trip_to_dict(trip) for trip in items], next=next_cursor)
+
+@bp.route("/listing/<int:trip_id>")
+@conditional(listing_watermark)
+def listing_detail(trip_id):
+    """Public detail page of a single listing."""
+    trip = Trip.query.options(joinedload(Trip.skillswap), joinedload(Trip.user)).filter_by(id=trip_id).first()
+
+    if not trip:
+        return render_template('404.html'), 404
+
+    return render_template("listing_detail.html", trip=trip)
+
+@bp.route("/search")
+def search():
+    """Full-text search over destinations, descriptions and skills, best match first."""
+    query = request.args.get("q", "").strip()
+    page = request.args.get("page", 1, type=int)
+    page = max(page, 1)
+    per_page = current_app.config["SEARCH_PAGE_SIZE"]
+
+    results, has_next = [], False
+    if query:
+        # One extra id tells us whether a next page exists
+        ids = listing_search.search(db.session, query, per_page + 1, (page - 1) * per_page)
+        has_next = len(ids) > per_page
+        ids = ids[:per_page]
+        if ids:
+            found = Trip.query.options(joinedload(Trip.skillswap), joinedload(Trip.user)).filter(Trip.id.in_(ids)).all()
+            by_id = {trip.id: trip for trip in found}
+            results = [by_id[trip_id] for trip_id in ids if trip_id in by_id]
+
+    return render_template(
+        "search.html",
+        query=query,
+        results=results,
+        page=page,
+        has_next=has_next
+    )
+
+@bp.route("/list", methods=["GET", "POST"])
+@login_required # Ensure user is logged in to post a listing
+def create_listing():
+    """Handles the creation of a new Trip listing and a corresponding SkillSwap."""
+    
+    form = ListingForm() 
+
+    if request.method == "POST":
+        
+        if form.validate_on_submit():
+            
+            # 2. Get data from form.data (validated fields)
+            destination = form.destination.data
+            start_date_str = form.start_date.data
+            end_date_str = form.end_date.data
+            description = form.description.data # NEW: Get description
+            is_offer = form.is_accommodation_offer.data
+            offered_skill = form.offered_skill.data
+            desired_skill = form.desired_skill.data
+
+            user_id = current_user.id 
+
+            try:
+                start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
+                end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
+                
+                # Input validation: End date must be after start date
+                if end_date <= start_date:
+                    flash("End date must be after the start date.", "danger")
+                    return render_template("list.html", form=form)
+                
+                # 3. Create the Trip/Accommodation Listing
+                new_trip = Trip(
+                    destination=destination,
+                    start_date=start_date,
+                    end_date=end_date,
+                    description=description or None, # NEW: Save description
+                    is_accommodation_offer=is_offer,
+                    user_id=user_id
+                )
+                db.session.add(new_trip)
+                
+                db.session.flush() 
+                
+                # 4. Create the corresponding SkillSwap
+                
+                if not is_offer: # Traveler is SEEKING accommodation
+                    skill_offer = offered_skill
+                    skill_want = desired_skill
+                else: # Host is OFFERING accommodation
+                    # Input 1 (offered_skill) holds Host's WANT
+                    # Input 2 (desired_skill) holds Host's OFFER
+                    skill_offer = desired_skill 
+                    skill_want = offered_skill  
+
+                new_swap = SkillSwap(
+                    skill_offered=skill_offer,
+                    skill_wanted=skill_want,
+                    user_id=user_id,
+                    trip_id=new_trip.id # Link the swap to the newly created trip
+                )
+                db.session.add(new_swap)
+                audit("listing.created", trip_id=new_trip.id)
+                
+                db.session.commit()
+                skill_matcher.index_listing(new_trip, new_swap)
+                # SQLite can reuse the id of a deleted last row: never serve its old card
+                fragment_cache.invalidate("listing-card", new_trip.id)
+                flash("Listing posted successfully to the Marketplace!", "success")
+                return redirect(url_for("main.trips"))
+
+            except ValueError:
+                flash("Invalid date format. Please use YYYY-MM-DD.", "danger")
+            except Exception as e:
+                db.session.rollback()
+                flash(f"An unexpected error occurred: {e}", "danger")
+            
+        # If POST failed validation or hit an exception, re-render the template with the form (which contains errors)
+        return render_template("list.html", form=form)
+
+
+    # GET request: render the template with the empty form
+    return render_template("list.html", form=form)
+
+# --- ADMIN ROUTES ---
+
+def admin_required(view):
+    """Like login_required, but only for users listed in ADMIN_USERNAMES."""
+    @wraps(view)
+    @login_required
+    def wrapper(*args, **kwargs):
+        if current_user.username not in current_app.config["ADMIN_USERNAMES"]:
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapper
+
+def parse_since(value):
+    """Parses an ISO date/datetime for incremental exports (None if empty)."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
+
+@bp.route("/admin/export/<dataset>.<fmt>")
+@admin_required
+def admin_export(dataset, fmt):
+    """Streams `listings` or `interactions` as CSV or JSONL, optionally only rows created after `since`."""
+    if dataset not in bulk_exporter.datasets or fmt not in EXPORT_FORMATS:
+        return render_template('404.html'), 404
+    try:
+        since = parse_since(request.args.get("since"))
+    except ValueError:
+        return jsonify(error="Invalid since. Please use an ISO date or datetime."), 400
+
+    chunks = bulk_exporter.stream(db.session, dataset, fmt, since)
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={dataset}.{fmt}"}
+    )
+
+@bp.route("/admin/slow-requests")
+@admin_required
+def admin_slow_requests():
+    """Slowest recent requests and SQL statements of this worker process."""
+    if not request_profiler.enabled:
+        return render_template('404.html'), 404
+    return render_template(
+        "admin_slow_requests.html",
+        requests=request_profiler.slowest_requests(),
+        statements=request_profiler.slowest_statements(),
+        slow_ms=current_app.config["PROFILING_SLOW_MS"]
+    )
+
+@bp.route("/admin/slow-requests/<int:request_id>/profile")
+@admin_required
+def admin_request_profile(request_id):
+    """cProfile output of one slow sampled request."""
+    profile = request_profiler.profile(request_id)
+    if profile is None:
+        return render_template('404.html'), 404
+    return Response(profile, mimetype="text/plain")
+
+@bp.route("/metrics")
+def metrics():
+    """
+    Prometheus scrape endpoint (per process). The scraper sends
+    `Authorization: Bearer <METRICS_TOKEN>`; without a token configured
+    the endpoint is off.
+    """
+    token = current_app.config["METRICS_TOKEN"]
+    if not request_profiler.enabled or not token:
+        return render_template('404.html'), 404
+    sent = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(sent.encode(), f"Bearer {token}".encode()):
+        return Response("Unauthorized\n", 401, {"WWW-Authenticate": 'Bearer realm="metrics"'}, mimetype="text/plain")
+    return Response(request_profiler.prometheus_text(), mimetype="text/plain; version=0.0.4")